@@ -2,8 +2,8 @@
 
 import sqlalchemy
 from sqlalchemy import (
-    MetaData, Table, Column, func,
-    Integer, String, Text, Float, DateTime, Boolean, Enum, ForeignKey
+    MetaData, Table, Column, Index, func, event, DDL, and_, false,
+    Integer, BigInteger, String, Text, Float, DateTime, Boolean, Enum, ForeignKey
 )
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -45,4 +45,85 @@ tickets = Table('tickets', metadata,
     Column('final_priority', String(50), nullable=True),
     Column('reviewed_at', DateTime, nullable=True),
     Column('used_for_retraining', Boolean, server_default=sqlalchemy.sql.false())
-)
\ No newline at end of file
+)
+
+# --- Indexes for the hot read paths of 'tickets' ---
+# Newest-first keyset pages of /tickets/recent. A b-tree rather than BRIN, since the pages are
+# read in (created_at, ticket_id) order; BRIN can only narrow down ranges, not return rows sorted.
+Index('ix_tickets_created_at_ticket_id', tickets.c.created_at, tickets.c.ticket_id)
+# Oldest-first pages of /review-queue. Partial, so it only holds the (small) review backlog.
+Index('ix_tickets_pending_review_created_at', tickets.c.created_at, tickets.c.ticket_id,
+      postgresql_where=tickets.c.status == 'PENDING_REVIEW')
+# /tickets/recent?final_category=... without walking the whole created_at index
+Index('ix_tickets_final_category_created_at', tickets.c.final_category, tickets.c.created_at, tickets.c.ticket_id)
+# Human-reviewed tickets the retraining pipeline hasn't consumed yet (see retraining_pipeline/data.py)
+Index('ix_tickets_unconsumed_reviews', tickets.c.reviewed_at,
+      postgresql_where=and_(tickets.c.used_for_retraining == false(), tickets.c.reviewed_at.isnot(None)))
+
+# Table 4: Running ticket counts for the dashboard, so /stats never scans 'tickets'.
+# dimension is 'total' (value ''), 'status' or 'final_category'.
+ticket_stats = Table('ticket_stats', metadata,
+    Column('dimension', String(20), primary_key=True),
+    Column('value', String(50), primary_key=True),
+    Column('count', BigInteger, nullable=False, server_default='0')
+)
+
+# Table 5: Tickets created per second, for the last-minute throughput. Old buckets are pruned.
+ticket_throughput = Table('ticket_throughput', metadata,
+    Column('bucket', DateTime, primary_key=True),
+    Column('count', BigInteger, nullable=False, server_default='0')
+)
+
+# --- Triggers keeping ticket_stats and ticket_throughput up to date ---
+# Statement-level triggers see every row a statement changed through transition tables, so a
+# batch write applies one aggregated delta per counter, in the writer's own transaction.
+# Updates count as -1 for the old row and +1 for the new one; deltas that net out (e.g. an
+# update of used_for_retraining) skip the counter tables entirely.
+_TICKET_STATS_CHANGES = {
+    "insert": ("REFERENCING NEW TABLE AS new_rows",
+               "SELECT 1 AS sign, status, final_category, created_at FROM new_rows"),
+    "update": ("REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+               "SELECT 1 AS sign, status, final_category, created_at FROM new_rows "
+               "UNION ALL SELECT -1, status, final_category, created_at FROM old_rows"),
+    "delete": ("REFERENCING OLD TABLE AS old_rows",
+               "SELECT -1 AS sign, status, final_category, created_at FROM old_rows"),
+}
+
+for _operation, (_transition_tables, _changes) in _TICKET_STATS_CHANGES.items():
+    event.listen(metadata, "after_create", DDL(f"""
+        CREATE OR REPLACE FUNCTION ticket_stats_on_{_operation}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            -- Counters are upserted in key order so concurrent writers can't deadlock on them
+            WITH changes AS ({_changes}), deltas AS (
+                SELECT 'total' AS dimension, '' AS value, sign FROM changes
+                UNION ALL SELECT 'status', CAST(status AS text), sign FROM changes
+                UNION ALL SELECT 'final_category', final_category, sign FROM changes WHERE final_category IS NOT NULL
+            )
+            INSERT INTO ticket_stats AS stats (dimension, value, count)
+            SELECT dimension, value, SUM(sign) FROM deltas
+            GROUP BY dimension, value HAVING SUM(sign) <> 0 ORDER BY dimension, value
+            ON CONFLICT (dimension, value) DO UPDATE SET count = stats.count + EXCLUDED.count;
+
+            WITH changes AS ({_changes})
+            INSERT INTO ticket_throughput AS throughput (bucket, count)
+            SELECT date_trunc('second', created_at), SUM(sign) FROM changes
+            GROUP BY 1 HAVING SUM(sign) <> 0 ORDER BY 1
+            ON CONFLICT (bucket) DO UPDATE SET count = throughput.count + EXCLUDED.count;
+            RETURN NULL;
+        END $$;
+        DROP TRIGGER IF EXISTS ticket_stats_{_operation} ON tickets;
+        CREATE TRIGGER ticket_stats_{_operation} AFTER {_operation.upper()} ON tickets
+            {_transition_tables} FOR EACH STATEMENT EXECUTE FUNCTION ticket_stats_on_{_operation}();
+    """))
+
+event.listen(metadata, "after_create", DDL("""
+    CREATE OR REPLACE FUNCTION ticket_stats_on_truncate() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        DELETE FROM ticket_stats;
+        DELETE FROM ticket_throughput;
+        RETURN NULL;
+    END $$;
+    DROP TRIGGER IF EXISTS ticket_stats_truncate ON tickets;
+    CREATE TRIGGER ticket_stats_truncate AFTER TRUNCATE ON tickets
+        FOR EACH STATEMENT EXECUTE FUNCTION ticket_stats_on_truncate();
+"""))
@@ -1,11 +1,11 @@
 # db/engine.py
 
-from sqlalchemy import create_engine
 from dotenv import load_dotenv
 import os
 
 # Import the metadata object which contains all our table definitions
 from .database_setup import metadata
+from .engine_factory import create_db_engine
 
 # Load environment variables from the root .env file
 # This helps when running scripts from the command line
@@ -22,7 +22,7 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 # The single, shared engine object for the application
-engine = create_engine(DATABASE_URL)
+engine = create_db_engine(DATABASE_URL, "scripts")
 
 # This block will ONLY run when the script is executed directly (e.g., `python -m db.engine`)
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+# db/engine_factory.py
+
+import os
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from prometheus_client import Counter, Gauge, Histogram
+
+# --- Pool Configuration (shared by every service) ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+# Seconds to wait for a free connection before failing the request
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+# Replace connections older than this, before the server or a proxy drops them
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Server-side statement timeout in milliseconds (0 disables it)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+# Prepared statements cached per connection. Only drivers that prepare statements server-side use it (asyncpg);
+# psycopg2 always sends plain statements.
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", 100))
+
+# --- Prometheus Metrics Definition ---
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections',
+    'Connections currently checked out of the pool',
+    ['application'],
+    multiprocess_mode='livesum'
+)
+DB_POOL_CONNECTIONS_OPENED = Counter(
+    'db_pool_connections_opened_total',
+    'New database connections opened by the pool (connection churn)',
+    ['application']
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting for a connection from the pool',
+    ['application'],
+    buckets=(.0001, .0005, .001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+
+
+def _instrumented_pool_class(base_class, application_name):
+    """
+    Returns a pool class that times every checkout. A class (rather than an attribute on the
+    pool) keeps the instrumentation when SQLAlchemy recreates the pool, e.g. after dispose().
+    """
+    class InstrumentedPool(base_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                DB_POOL_CHECKOUT_WAIT.labels(application=application_name).observe(time.perf_counter() - start)
+
+    return InstrumentedPool
+
+
+def _pool_kwargs(pool_base_class, application_name):
+    return {
+        "poolclass": _instrumented_pool_class(pool_base_class, application_name),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _register_pool_metrics(engine, application_name):
+    """Tracks checked-out connections and newly opened ones through SQLAlchemy pool events."""
+    checked_out = DB_POOL_CHECKED_OUT.labels(application=application_name)
+    opened = DB_POOL_CONNECTIONS_OPENED.labels(application=application_name)
+    event.listen(engine, "connect", lambda dbapi_connection, record: opened.inc())
+    event.listen(engine, "checkout", lambda dbapi_connection, record, proxy: checked_out.inc())
+    event.listen(engine, "checkin", lambda dbapi_connection, record: checked_out.dec())
+
+
+def create_db_engine(database_url, application_name):
+    """
+    Creates a pooled psycopg2 engine configured from the DB_* environment variables.
+    `application_name` labels the pool metrics and shows up in pg_stat_activity.
+    """
+    connect_args = {"application_name": application_name}
+    if DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    engine = create_engine(database_url, connect_args=connect_args, **_pool_kwargs(QueuePool, application_name))
+    _register_pool_metrics(engine, application_name)
+    return engine
+
+
+def create_async_db_engine(database_url, application_name):
+    """
+    Creates a pooled asyncpg engine (database_url must use 'postgresql+asyncpg://') with the same
+    pool settings, plus asyncpg's server-side prepared statement cache.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    server_settings = {"application_name": application_name}
+    if DB_STATEMENT_TIMEOUT_MS:
+        server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+    url = make_url(database_url).update_query_dict(
+        {"prepared_statement_cache_size": str(DB_PREPARED_STATEMENT_CACHE_SIZE)}
+    )
+    engine = create_async_engine(
+        url,
+        connect_args={"server_settings": server_settings},
+        **_pool_kwargs(AsyncAdaptedQueuePool, application_name)
+    )
+    _register_pool_metrics(engine.sync_engine, application_name)
+    return engine
@@ -0,0 +1,145 @@
+# db/migrate.py
+
+"""
+Brings an existing database up to the schema in db/database_setup.py. Safe to run repeatedly.
+
+  1. Creates missing tables, (re)installs the ticket_stats triggers and recounts ticket_stats
+     from 'tickets', so the counters are right even for rows written before the triggers existed.
+  2. Optionally converts 'tickets' into a table partitioned by month on created_at, and creates
+     the partitions for the coming months. Run it again with --partition-by-month at least
+     monthly (e.g. from cron) so new rows never fall into the default partition.
+  3. Creates missing indexes. On an unpartitioned table they are built CONCURRENTLY, so the
+     worker and the APIs can keep writing; an index left invalid by a failed build is rebuilt.
+
+Usage (from the project root):
+    python -m db.migrate [--partition-by-month] [--months-ahead 3]
+"""
+
+import argparse
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+from .engine import engine
+from .database_setup import metadata, tickets
+
+
+def _is_partitioned(connection):
+    return connection.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('tickets')")
+    ).scalar()
+
+
+def _add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def ensure_monthly_partitions(connection, first_month, months_ahead):
+    """Creates the monthly partitions from first_month up to months_ahead months from now."""
+    month = date(first_month.year, first_month.month, 1)
+    last_month = _add_months(date.today(), months_ahead)
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS tickets_y{month.year}m{month.month:02d} PARTITION OF tickets "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        ))
+        month = next_month
+
+
+def partition_tickets_by_month(connection, months_ahead):
+    """
+    Replaces the unpartitioned 'tickets' table with one partitioned by month on created_at and
+    copies every row across, in a single transaction. The primary key becomes
+    (ticket_id, created_at), since a partitioned table's unique keys must include created_at.
+    Writers are blocked until the copy commits.
+    """
+    column_names = [column.name for column in tickets.c]
+    columns = ", ".join(column_names)
+    # created_at becomes part of the primary key, so it can't be NULL
+    copied_columns = ", ".join(
+        "COALESCE(created_at, now())" if name == "created_at" else name for name in column_names
+    )
+
+    connection.execute(text("LOCK TABLE tickets IN ACCESS EXCLUSIVE MODE"))
+    first_created_at = connection.execute(text("SELECT MIN(created_at) FROM tickets")).scalar()
+    connection.execute(text("ALTER TABLE tickets RENAME TO tickets_unpartitioned"))
+    connection.execute(text("ALTER TABLE tickets_unpartitioned RENAME CONSTRAINT tickets_pkey TO tickets_unpartitioned_pkey"))
+    connection.execute(text("CREATE TABLE tickets (LIKE tickets_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"))
+    connection.execute(text("ALTER TABLE tickets ADD CONSTRAINT tickets_pkey PRIMARY KEY (ticket_id, created_at)"))
+    for column in ("category_model_id", "priority_model_id"):
+        connection.execute(text(f"ALTER TABLE tickets ADD FOREIGN KEY ({column}) REFERENCES models (model_id)"))
+    connection.execute(text("CREATE TABLE tickets_default PARTITION OF tickets DEFAULT"))
+    ensure_monthly_partitions(connection, first_created_at or date.today(), months_ahead)
+
+    # The ticket_stats triggers stay on the old table, so the copy leaves the counters untouched
+    connection.execute(text(f"INSERT INTO tickets ({columns}) SELECT {copied_columns} FROM tickets_unpartitioned"))
+    connection.execute(text("DROP TABLE tickets_unpartitioned"))
+
+
+def seed_ticket_stats(connection):
+    """
+    Replaces the ticket_stats counters with a recount of 'tickets'. Run in the transaction that
+    (re)installs the triggers: CREATE TRIGGER holds a lock that blocks writers until it commits,
+    so no write can slip between the recount and the triggers taking over.
+    """
+    connection.execute(text("DELETE FROM ticket_stats"))
+    connection.execute(text("""
+        INSERT INTO ticket_stats (dimension, value, count)
+        SELECT 'total', '', COUNT(*) FROM tickets
+        UNION ALL SELECT 'status', CAST(status AS text), COUNT(*) FROM tickets WHERE status IS NOT NULL GROUP BY status
+        UNION ALL SELECT 'final_category', final_category, COUNT(*) FROM tickets
+            WHERE final_category IS NOT NULL GROUP BY final_category
+    """))
+
+
+def _create_index(connection, index, concurrently):
+    """Creates an index if it's missing, rebuilding it if an earlier concurrent build left it invalid."""
+    valid = connection.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": index.name}
+    ).scalar()
+    if valid:
+        return False
+    if valid is False:
+        print(f"⚠️ Index {index.name} is invalid (interrupted build). Rebuilding it.")
+        connection.execute(text(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}{index.name}"))
+
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=connection.dialect))
+    if concurrently:
+        ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+    connection.execute(text(ddl))
+    return True
+
+
+def migrate(partition_by_month=False, months_ahead=3):
+    # Index builds and the partition copy can run far past the services' statement timeout
+    with engine.begin() as connection:
+        connection.execute(text("SET LOCAL statement_timeout = 0"))
+        metadata.create_all(connection)
+        if partition_by_month:
+            if not _is_partitioned(connection):
+                print("🔀 Converting 'tickets' into monthly partitions...")
+                partition_tickets_by_month(connection, months_ahead)
+                # Reinstalls the ticket_stats triggers on the new table
+                metadata.create_all(connection)
+            ensure_monthly_partitions(connection, date.today(), months_ahead)
+        seed_ticket_stats(connection)
+        partitioned = _is_partitioned(connection)
+
+    # CONCURRENTLY can't run inside a transaction, and isn't supported on partitioned tables
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("SET statement_timeout = 0"))
+        for index in sorted(tickets.indexes, key=lambda index: index.name):
+            if _create_index(connection, index, concurrently=not partitioned):
+                print(f"📇 Created index {index.name}.")
+    print("✅ Migration complete.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the schema in db/database_setup.py idempotently.")
+    parser.add_argument("--partition-by-month", action="store_true",
+                        help="Partition 'tickets' by month on created_at (converting the table if needed).")
+    parser.add_argument("--months-ahead", type=int, default=3, help="Monthly partitions to create ahead of today.")
+    args = parser.parse_args()
+    migrate(partition_by_month=args.partition_by_month, months_ahead=args.months_ahead)
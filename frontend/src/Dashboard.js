@@ -1,6 +1,6 @@
 // frontend/src/Dashboard.js (No changes to logic, just imports and structure)
 
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 import axios from 'axios';
 import { Toaster, toast } from 'react-hot-toast';
 
@@ -10,6 +10,13 @@ import TicketTable from './components/TicketTable';
 
 const RESULTS_API_URL = 'http://localhost:8002';
 const WEBSOCKET_URL = 'ws://localhost:8002/ws/ticket-updates';
+const TICKET_PAGE_SIZE = 100;
+
+// Same order as /tickets/recent: newest first, ties broken by ticket_id
+const newestFirst = (a, b) => (new Date(b.created_at) - new Date(a.created_at)) || b.ticket_id.localeCompare(a.ticket_id);
+// Same format as the API's X-Next-Cursor: the page continues after this ticket
+const cursorAfter = (ticket) =>
+    btoa(JSON.stringify([ticket.created_at, ticket.ticket_id])).replace(/\+/g, '-').replace(/\//g, '_');
 
 function Dashboard() {
     // ... (Keep all the existing state and useEffect logic from the previous step) ...
@@ -17,17 +24,22 @@ function Dashboard() {
     const [tickets, setTickets] = useState([]);
     const [searchTerm, setSearchTerm] = useState('');
     const [loading, setLoading] = useState(true);
+    // Whether the last page of /tickets/recent had an X-Next-Cursor
+    const [moreOnServer, setMoreOnServer] = useState(false);
+    const [loadingMore, setLoadingMore] = useState(false);
+    // Live updates keep at most this many tickets, dropping the oldest; each "Load More" adds a page
+    const ticketLimit = useRef(TICKET_PAGE_SIZE);
 
     useEffect(() => {
         const fetchInitialData = async () => {
             try {
                 const [statsRes, ticketsRes] = await Promise.all([
                     axios.get(`${RESULTS_API_URL}/stats`),
-                    axios.get(`${RESULTS_API_URL}/tickets/recent`)
+                    axios.get(`${RESULTS_API_URL}/tickets/recent`, { params: { limit: TICKET_PAGE_SIZE } })
                 ]);
                 setStats(statsRes.data);
-                const sortedTickets = ticketsRes.data.sort((a, b) => new Date(b.created_at) - new Date(a.created_at)).slice(0, 100);
-                setTickets(sortedTickets);
+                setTickets(ticketsRes.data);
+                setMoreOnServer(Boolean(ticketsRes.headers['x-next-cursor']));
             } catch (error) {
                 console.error("Failed to fetch initial dashboard data:", error);
                 toast.error("Could not load dashboard data.");
@@ -42,17 +54,26 @@ function Dashboard() {
         const ws = new WebSocket(WEBSOCKET_URL);
         ws.onopen = () => console.log("WebSocket connection established.");
         ws.onmessage = (event) => {
-            const updatedTicket = JSON.parse(event.data);
-            toast(`Ticket ${updatedTicket.ticket_id.substring(0, 8)}... updated to ${updatedTicket.status}`, { icon: '🔄' });
+            // A frame is one ticket, or an array of tickets when several updates arrived together
+            const payload = JSON.parse(event.data);
+            const updatedTickets = Array.isArray(payload) ? payload : [payload];
+            if (updatedTickets.length === 1) {
+                const [updatedTicket] = updatedTickets;
+                toast(`Ticket ${updatedTicket.ticket_id.substring(0, 8)}... updated to ${updatedTicket.status}`, { icon: '🔄' });
+            } else {
+                toast(`${updatedTickets.length} tickets updated`, { icon: '🔄' });
+            }
             setTickets(prevTickets => {
-                const index = prevTickets.findIndex(t => t.ticket_id === updatedTicket.ticket_id);
-                if (index > -1) {
-                    const newTickets = [...prevTickets];
-                    newTickets[index] = updatedTicket;
-                    return newTickets.sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
-                } else {
-                    return [updatedTicket, ...prevTickets].sort((a, b) => new Date(b.created_at) - new Date(a.created_at)).slice(0, 100);
-                }
+                const newTickets = [...prevTickets];
+                updatedTickets.forEach(updatedTicket => {
+                    const index = newTickets.findIndex(t => t.ticket_id === updatedTicket.ticket_id);
+                    if (index > -1) {
+                        newTickets[index] = updatedTicket;
+                    } else {
+                        newTickets.push(updatedTicket);
+                    }
+                });
+                return newTickets.sort(newestFirst).slice(0, ticketLimit.current);
             });
             axios.get(`${RESULTS_API_URL}/stats`).then(res => setStats(res.data));
         };
@@ -64,6 +85,28 @@ function Dashboard() {
         return () => ws.close();
     }, []);
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            // Continue after the oldest ticket shown, so tickets that live updates trimmed come back too
+            const cursor = cursorAfter(tickets[tickets.length - 1]);
+            const response = await axios.get(`${RESULTS_API_URL}/tickets/recent`, { params: { cursor, limit: TICKET_PAGE_SIZE } });
+            ticketLimit.current += TICKET_PAGE_SIZE;
+            setTickets(prevTickets => {
+                // Tickets updated live since the page was loaded are already in the list
+                const loadedIds = new Set(prevTickets.map(t => t.ticket_id));
+                return [...prevTickets, ...response.data.filter(t => !loadedIds.has(t.ticket_id))]
+                    .sort(newestFirst).slice(0, ticketLimit.current);
+            });
+            setMoreOnServer(Boolean(response.headers['x-next-cursor']));
+        } catch (error) {
+            console.error("Failed to fetch more tickets:", error);
+            toast.error("Could not load more tickets.");
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const filteredTickets = useMemo(() => {
         if (!searchTerm) return tickets;
         return tickets.filter(ticket =>
@@ -83,6 +126,12 @@ function Dashboard() {
             <div className="bg-white p-6 rounded-lg shadow-md">
                 <SearchBar searchTerm={searchTerm} setSearchTerm={setSearchTerm} />
                 <TicketTable tickets={filteredTickets} />
+                {/* A full list may have had its oldest tickets trimmed by live updates */}
+                {(moreOnServer || tickets.length >= ticketLimit.current) && (
+                    <button onClick={loadMore} disabled={loadingMore} className="mt-4 w-full py-2 px-4 bg-blue-600 text-white font-semibold rounded-lg hover:bg-blue-700 disabled:opacity-50">
+                        {loadingMore ? 'Loading...' : 'Load More'}
+                    </button>
+                )}
             </div>
         </div>
     );
@@ -8,6 +8,9 @@ const RESULTS_API_URL = 'http://localhost:8002';
 function ReviewDashboard() {
   const [queue, setQueue] = useState([]);
   const [loading, setLoading] = useState(true);
+  // X-Next-Cursor from the last page; null once the whole queue is loaded
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   const TICKET_CATEGORIES = ["Technical Issues & Bugs", "Sales, Product & Marketing Inquiries", "Security & Compliance", "Infrastructure & Hardware", "Finance & Billing", "User Assistance & How-To"];
   const TICKET_PRIORITIES = ["high", "low", "medium"];
@@ -17,6 +20,7 @@ function ReviewDashboard() {
     try {
       const response = await axios.get(`${RESULTS_API_URL}/review-queue`);
       setQueue(response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error("Failed to fetch review queue:", error);
     } finally {
@@ -24,6 +28,22 @@ function ReviewDashboard() {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${RESULTS_API_URL}/review-queue`, { params: { cursor: nextCursor } });
+      setQueue(prevQueue => {
+        const loadedIds = new Set(prevQueue.map(ticket => ticket.ticket_id));
+        return [...prevQueue, ...response.data.filter(ticket => !loadedIds.has(ticket.ticket_id))];
+      });
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error("Failed to fetch more of the review queue:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchQueue();
   }, []);
@@ -46,9 +66,9 @@ function ReviewDashboard() {
     <div className="bg-white p-8 rounded-lg shadow-md">
       <div className="flex justify-between items-center mb-6">
         <h2 className="text-2xl font-bold text-gray-800">Expert Review Queue</h2>
-        <span className="text-lg font-semibold text-blue-600">{queue.length} Tickets</span>
+        <span className="text-lg font-semibold text-blue-600">{queue.length}{nextCursor ? '+' : ''} Tickets</span>
       </div>
-      {queue.length === 0 ? (
+      {queue.length === 0 && !nextCursor ? (
         <p className="text-center text-gray-500 py-10">The review queue is currently empty. Great job!</p>
       ) : (
         <div className="space-y-6">
@@ -66,6 +86,11 @@ function ReviewDashboard() {
               <ReviewForm ticket={ticket} categories={TICKET_CATEGORIES} priorities={TICKET_PRIORITIES} onSubmit={handleReviewSubmit}/>
             </div>
           ))}
+          {nextCursor && (
+            <button onClick={loadMore} disabled={loadingMore} className="w-full py-2 px-4 bg-blue-600 text-white font-semibold rounded-lg hover:bg-blue-700 disabled:opacity-50">
+              {loadingMore ? 'Loading...' : 'Load More'}
+            </button>
+          )}
         </div>
       )}
     </div>
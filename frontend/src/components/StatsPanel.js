@@ -9,7 +9,6 @@ function StatsPanel({ stats }) {
     const statusData = [
         { name: 'Completed', value: stats.status_breakdown.completed || 0 },
         { name: 'Pending Review', value: stats.status_breakdown.pending_review || 0 },
-        { name: 'Processing', value: stats.status_breakdown.processing || 0 },
     ].filter(item => item.value > 0);
 
     const categoryData = Object.keys(stats.category_breakdown || {}).map(key => ({
@@ -38,7 +37,7 @@ function StatsPanel({ stats }) {
                     <h3 className="font-semibold text-gray-700">Tickets by Status</h3>
                     {statusData.length > 0 ? (
                         <ResponsiveContainer width="100%" height={200}>
-                            <PieChart><Pie data={statusData} dataKey="value" outerRadius={80} labelLine={false}><Cell fill="#00C49F"/><Cell fill="#FF8042"/><Cell fill="#0088FE"/></Pie><Tooltip /><Legend /></PieChart>
+                            <PieChart><Pie data={statusData} dataKey="value" outerRadius={80} labelLine={false}><Cell fill="#00C49F"/><Cell fill="#FF8042"/></Pie><Tooltip /><Legend /></PieChart>
                         </ResponsiveContainer>
                     ) : <p className="text-gray-500 mt-4">No status data.</p>}
                 </div>
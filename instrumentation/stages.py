@@ -0,0 +1,128 @@
+# instrumentation/stages.py
+
+import os
+import time
+import random
+import signal
+import cProfile
+import itertools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from prometheus_client import Histogram
+
+# --- Configuration ---
+# Fraction of profiled() sections run under cProfile. 0 disables sampling; SIGUSR1 still works.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+# Number of sections profiled after each SIGUSR1
+PROFILE_SAMPLES_PER_SIGNAL = int(os.getenv("PROFILE_SAMPLES_PER_SIGNAL", 10))
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "/tmp/profiles")
+# Start tracemalloc at startup, so a SIGUSR2 snapshot covers every allocation since then
+TRACEMALLOC_ENABLED = os.getenv("TRACEMALLOC_ENABLED", "false").lower() == "true"
+TRACEMALLOC_TOP_N = 25
+
+# --- Prometheus Metrics Definition ---
+STAGE_LATENCY = Histogram(
+    'pipeline_stage_latency_seconds',
+    'Time spent in each stage of ticket processing, the results API and retraining',
+    ['stage', 'model_version'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+)
+
+_signal_samples_remaining = 0
+_profiling = threading.local()
+_sample_ids = itertools.count()
+
+
+class StageTimer:
+    """Result of a stage() block; `seconds` is set once the block exits."""
+    seconds = None
+
+
+class ProfileSample:
+    """Handle for a profiled() block; set `discard` to drop the sample instead of writing it."""
+    discard = False
+
+
+@contextmanager
+def stage(name, model_version=""):
+    """Times a block of code into the pipeline_stage_latency_seconds histogram."""
+    timer = StageTimer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.seconds = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage=name, model_version=model_version).observe(timer.seconds)
+
+
+def _should_profile():
+    global _signal_samples_remaining
+    if _signal_samples_remaining > 0:
+        _signal_samples_remaining -= 1
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+@contextmanager
+def profiled(name):
+    """
+    Runs a sampled fraction of executions of a block under cProfile and writes the stats to
+    PROFILE_OUTPUT_DIR/<name>-<pid>-<ms>-<n>.prof (open with `python -m pstats` or snakeviz).
+    Nested profiled() blocks in the same thread are not profiled separately.
+    """
+    sample = ProfileSample()
+    if getattr(_profiling, "active", False) or not _should_profile():
+        yield sample
+        return
+
+    profiler = cProfile.Profile()
+    _profiling.active = True
+    profiler.enable()
+    try:
+        yield sample
+    finally:
+        profiler.disable()
+        _profiling.active = False
+        if not sample.discard:
+            os.makedirs(PROFILE_OUTPUT_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_OUTPUT_DIR, f"{name}-{os.getpid()}-{int(time.time() * 1000)}-{next(_sample_ids)}.prof")
+            profiler.dump_stats(path)
+            print(f"🔬 Wrote profile sample to {path}")
+
+
+def write_tracemalloc_snapshot():
+    """
+    Writes the top allocation sites to PROFILE_OUTPUT_DIR, plus the raw snapshot for offline
+    comparison. If tracemalloc isn't running yet it is started, and the next call writes the snapshot.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        print("🔬 tracemalloc started. Trigger another snapshot to write it.")
+        return None
+
+    snapshot = tracemalloc.take_snapshot()
+    os.makedirs(PROFILE_OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_OUTPUT_DIR, f"tracemalloc-{os.getpid()}-{int(time.time() * 1000)}-{next(_sample_ids)}")
+    snapshot.dump(f"{path}.snapshot")
+    with open(f"{path}.txt", "w") as f:
+        for statistic in snapshot.statistics("lineno")[:TRACEMALLOC_TOP_N]:
+            f.write(f"{statistic}\n")
+    print(f"🔬 Wrote tracemalloc snapshot to {path}.txt")
+    return f"{path}.txt"
+
+
+def _on_profile_signal(signum, frame):
+    global _signal_samples_remaining
+    _signal_samples_remaining = PROFILE_SAMPLES_PER_SIGNAL
+
+
+def install_profiling_hooks():
+    """
+    SIGUSR1 profiles the next PROFILE_SAMPLES_PER_SIGNAL profiled() sections and SIGUSR2 writes a
+    tracemalloc snapshot. Must be called from the main thread.
+    """
+    if TRACEMALLOC_ENABLED and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    signal.signal(signal.SIGUSR1, _on_profile_signal)
+    signal.signal(signal.SIGUSR2, lambda signum, frame: write_tracemalloc_snapshot())
@@ -1,7 +1,7 @@
 import os
 import random
 import psycopg2
-from locust import HttpUser, task, between
+from locust import HttpUser, task, between, events
 from dotenv import load_dotenv
 
 # --- 1. Load Configuration and Data ---
@@ -17,6 +17,10 @@ DB_NAME = os.getenv("DB_NAME")
 DB_HOST = "localhost" 
 DB_PORT = os.getenv("DB_PORT")
 
+# Think time between requests of a simulated user. Set both to 0 to find the API's saturation point.
+WAIT_MIN = float(os.getenv("LOCUST_WAIT_MIN", 1))
+WAIT_MAX = float(os.getenv("LOCUST_WAIT_MAX", 3))
+
 # Global list to hold our test data
 TICKET_DATA = []
 
@@ -63,7 +67,7 @@ class TicketSubmitUser(HttpUser):
     Locust will create many instances of this class to generate load.
     """
     # This makes each simulated user wait 1 to 3 seconds between submitting tickets
-    wait_time = between(1, 3)
+    wait_time = between(WAIT_MIN, WAIT_MAX)
 
     @task # This decorator marks the following method as a task for the user to perform
     def submit_ticket(self):
@@ -80,6 +84,23 @@ class TicketSubmitUser(HttpUser):
         # Send a POST request to the API endpoint
         # The 'self.client' is Locust's powerful, built-in HTTP client
         self.client.post(endpoint, json=ticket)
+
+# --- 3. Print a Before/After Comparison Summary ---
+
+@events.test_stop.add_listener
+def print_latency_summary(environment, **kwargs):
+    """
+    Prints RPS and tail latencies per endpoint when the test stops, so that runs against
+    different versions of the Ingestion API (e.g. the sync and async Redis clients)
+    can be compared side by side.
+    """
+    print(f"\n{'endpoint':<30} {'requests':>9} {'failures':>9} {'RPS':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for entry in list(environment.stats.entries.values()) + [environment.stats.total]:
+        print(
+            f"{entry.method or '':<5}{entry.name:<25} {entry.num_requests:>9} {entry.num_failures:>9} "
+            f"{entry.total_rps:>8.1f} {entry.get_response_time_percentile(0.50):>8.0f} "
+            f"{entry.get_response_time_percentile(0.95):>8.0f} {entry.get_response_time_percentile(0.99):>8.0f}"
+        )
 '''
 
 ### Step 3: How to Run the Test and Analyze the Results
@@ -117,6 +138,22 @@ Now you have two crucial dashboards to watch to see your system working under pr
     * **Response Time (ms):** How quickly your API is responding. A low, stable number is good.
     * In the **"Failures"** tab, you can see if any requests are failing.
 
+* **Comparing Before and After a Change (e.g. sync vs. async Redis client):**
+    Run the same headless, zero-think-time profile against each version of the Ingestion API and compare the
+    RPS and p99 columns printed when the test stops (the CSV files hold the same numbers):
+    ```bash
+    # 1. Baseline: check out the version to compare against and rebuild the API
+    git checkout <baseline-commit> -- services/ingestion_api && docker-compose up -d --build ingestion-api
+    LOCUST_WAIT_MIN=0 LOCUST_WAIT_MAX=0 locust -f load_testing/ingestion_test.py --headless \
+        -u 200 -r 50 -t 2m --host http://localhost:8001 --csv load_testing/results/before
+
+    # 2. After: restore the current version, rebuild and rerun the identical profile
+    git checkout HEAD -- services/ingestion_api && docker-compose up -d --build ingestion-api
+    LOCUST_WAIT_MIN=0 LOCUST_WAIT_MAX=0 locust -f load_testing/ingestion_test.py --headless \
+        -u 200 -r 50 -t 2m --host http://localhost:8001 --csv load_testing/results/after
+    ```
+    Raise `REDIS_MAX_CONNECTIONS` for the ingestion-api container if requests start queueing for a pooled connection.
+
 * **Your Worker's Logs:** In your terminal, watch the live logs from your services to see the end-to-end flow.
     ```bash
     # Watch the ML worker to see tickets being processed
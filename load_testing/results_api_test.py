@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import random
+import websocket  # websocket-client, installed with locust; gevent makes its blocking calls cooperative
+from locust import HttpUser, User, task, between, events
+
+# --- 1. Configuration ---
+
+# Think time between requests of a simulated dashboard user. Set both to 0 to find the API's saturation point.
+WAIT_MIN = float(os.getenv("LOCUST_WAIT_MIN", 1))
+WAIT_MAX = float(os.getenv("LOCUST_WAIT_MAX", 3))
+# How long a WebSocket listener waits for a message before checking whether the test is stopping
+WS_RECEIVE_TIMEOUT_SECONDS = float(os.getenv("LOCUST_WS_RECEIVE_TIMEOUT", 5))
+
+# Ticket IDs seen by the dashboard users, used for the ticket lookup task
+KNOWN_TICKET_IDS = []
+# ticket_id -> time the review was submitted, so listeners can measure the review-to-WebSocket delay
+SUBMITTED_REVIEWS = {}
+WS_MESSAGES_RECEIVED = 0
+
+# --- 2. Define the User Behavior ---
+
+class DashboardUser(HttpUser):
+    """
+    A dashboard user polling the Results API's read endpoints, and occasionally
+    submitting a review from the human-in-the-loop queue.
+    """
+    weight = 10
+    wait_time = between(WAIT_MIN, WAIT_MAX)
+
+    def on_start(self):
+        self.review_queue = []
+        self.recent_tickets()
+
+    @task(5)
+    def recent_tickets(self):
+        response = self.client.get("/tickets/recent")
+        if response.ok:
+            ticket_ids = [ticket["ticket_id"] for ticket in response.json()]
+            if ticket_ids:
+                KNOWN_TICKET_IDS[:] = ticket_ids
+
+    @task(3)
+    def stats(self):
+        self.client.get("/stats")
+
+    @task(2)
+    def ticket_lookup(self):
+        if KNOWN_TICKET_IDS:
+            self.client.get(f"/tickets/{random.choice(KNOWN_TICKET_IDS)}", name="/tickets/[id]")
+
+    @task(1)
+    def review_queue(self):
+        response = self.client.get("/review-queue")
+        if response.ok:
+            self.review_queue = response.json()
+
+    @task(1)
+    def submit_review(self):
+        if not self.review_queue:
+            return
+        ticket = self.review_queue.pop(random.randrange(len(self.review_queue)))
+        labels = {
+            "final_category": ticket["predicted_category"] or "General Inquiry",
+            "final_priority": ticket["predicted_priority"] or "P3"
+        }
+        SUBMITTED_REVIEWS[ticket["ticket_id"]] = time.time()
+        # Another user may have reviewed the ticket first, which is an expected 404
+        with self.client.post(f"/review/{ticket['ticket_id']}", json=labels, name="/review/[id]",
+                              catch_response=True) as response:
+            if response.status_code == 404:
+                SUBMITTED_REVIEWS.pop(ticket["ticket_id"], None)
+                response.success()
+
+
+class TicketUpdatesListener(User):
+    """
+    A live dashboard holding a WebSocket open to /ws/ticket-updates. Reports the connection
+    time, and for reviews submitted by DashboardUser, the delay until the update arrives.
+    """
+    weight = 1
+
+    def on_start(self):
+        url = self.host.replace("http", "ws", 1).rstrip("/") + "/ws/ticket-updates"
+        start = time.perf_counter()
+        try:
+            self.ws = websocket.create_connection(url, timeout=WS_RECEIVE_TIMEOUT_SECONDS)
+            exception = None
+        except Exception as e:
+            self.ws, exception = None, e
+        events.request.fire(
+            request_type="WS", name="connect", response_time=(time.perf_counter() - start) * 1000,
+            response_length=0, exception=exception, context={}
+        )
+
+    def on_stop(self):
+        if self.ws:
+            self.ws.close()
+
+    @task
+    def receive_updates(self):
+        global WS_MESSAGES_RECEIVED
+        if not self.ws:
+            self.on_start()
+            return
+        try:
+            message = self.ws.recv()
+        except websocket.WebSocketTimeoutException:
+            return
+        except Exception as e:
+            events.request.fire(request_type="WS", name="receive", response_time=0,
+                                response_length=0, exception=e, context={})
+            self.ws = None
+            return
+
+        # A frame holds one ticket, or an array of tickets batched together by the server
+        payload = json.loads(message)
+        for ticket in payload if isinstance(payload, list) else [payload]:
+            WS_MESSAGES_RECEIVED += 1
+            submitted_at = SUBMITTED_REVIEWS.pop(ticket.get("ticket_id"), None)
+            if submitted_at is not None:
+                events.request.fire(
+                    request_type="WS", name="review_update", response_time=(time.time() - submitted_at) * 1000,
+                    response_length=len(message), exception=None, context={}
+                )
+
+# --- 3. Print a Before/After Comparison Summary ---
+
+@events.test_stop.add_listener
+def print_latency_summary(environment, **kwargs):
+    """
+    Prints RPS and tail latencies per endpoint when the test stops, so that runs against
+    different versions of the Results API (e.g. the sync and async database drivers)
+    can be compared side by side. WS review_update is the delay from submitting a review
+    to the update reaching a WebSocket listener.
+    """
+    print(f"\n{'endpoint':<30} {'requests':>9} {'failures':>9} {'RPS':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for entry in list(environment.stats.entries.values()) + [environment.stats.total]:
+        print(
+            f"{entry.method or '':<5}{entry.name:<25} {entry.num_requests:>9} {entry.num_failures:>9} "
+            f"{entry.total_rps:>8.1f} {entry.get_response_time_percentile(0.50):>8.0f} "
+            f"{entry.get_response_time_percentile(0.95):>8.0f} {entry.get_response_time_percentile(0.99):>8.0f}"
+        )
+    print(f"WebSocket ticket updates received: {WS_MESSAGES_RECEIVED}")
+'''
+### How to Run
+
+Start the stack with `docker-compose up -d --build`, keep the ML worker fed (e.g. with
+load_testing/ingestion_test.py against port 8001) so tickets and updates keep flowing, then run:
+```bash
+LOCUST_WAIT_MIN=0 LOCUST_WAIT_MAX=0 locust -f load_testing/results_api_test.py --headless \
+    -u 220 -r 20 -t 2m --host http://localhost:8002 --csv load_testing/results/results_api
+```
+With the default weights, 1 in 11 users is a WebSocket listener. Compare the p99 of the REST
+endpoints and of WS review_update between versions of the Results API, and watch
+db_pool_checkout_wait_seconds{application="results_api"} to see if the pool needs to grow
+(DB_POOL_SIZE / DB_MAX_OVERFLOW).
+'''
@@ -8,6 +8,8 @@ from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.metrics import classification_report, accuracy_score
 
+from instrumentation.stages import stage, profiled
+
 def log_model_robustly(model_obj, artifact_path="model"):
     """
     Saves the model to a temporary local path first, then uses
@@ -49,10 +51,16 @@ def find_best_model(
 ) -> tuple:
     """
     Runs a full grid search experiment, logs each combination, and identifies the best model.
+    The time spent in each stage is logged to every run as '<stage>_seconds'.
     """
+    with profiled(f"find_best_model_{target_column}"):
+        return _find_best_model(df, target_column, vectorizers, classifiers, param_grids)
+
+def _find_best_model(df, target_column, vectorizers, classifiers, param_grids):
     X = df['processed_text']
     y = df[target_column]
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    with stage("train_test_split"):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
 
     best_f1_score = -1.0
     best_run_id = None
@@ -72,14 +80,16 @@ def find_best_model(
 
                 try:
                     search = GridSearchCV(pipeline, grid_params, cv=3, n_jobs=-1, verbose=1, scoring='f1_macro')
-                    search.fit(X_train, y_train)
+                    with stage("grid_search", run_name) as grid_search_timer:
+                        search.fit(X_train, y_train)
 
                     best_model = search.best_estimator_
-                    y_pred = best_model.predict(X_test)
+                    with stage("evaluate", run_name) as evaluate_timer:
+                        y_pred = best_model.predict(X_test)
                     
-                    # --- UPDATED METRIC LOGGING ---
-                    report = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
-                    acc = accuracy_score(y_test, y_pred)
+                        # --- UPDATED METRIC LOGGING ---
+                        report = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+                        acc = accuracy_score(y_test, y_pred)
                     
                     # Log parameters
                     mlflow.log_params(search.best_params_)
@@ -96,7 +106,12 @@ def find_best_model(
 
                     # Log artifacts
                     mlflow.log_dict(report, "classification_report.json")
-                    log_model_robustly(best_model, artifact_path="model")
+                    with stage("log_model", run_name) as log_model_timer:
+                        log_model_robustly(best_model, artifact_path="model")
+
+                    mlflow.log_metric("grid_search_seconds", grid_search_timer.seconds)
+                    mlflow.log_metric("evaluate_seconds", evaluate_timer.seconds)
+                    mlflow.log_metric("log_model_seconds", log_model_timer.seconds)
                     
                     current_f1_score = report['macro avg']['f1-score']
                     print(f"Logged {run_name} with f1_macro: {current_f1_score:.4f}")
@@ -0,0 +1,67 @@
+# retraining_pipeline/preprocess_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+
+# SQLite caps the number of bound parameters per statement; stay well below it.
+_SQLITE_BATCH_SIZE = 900
+
+
+class PreprocessCache:
+    """
+    Persistent, content-addressed store of preprocessed ticket text.
+
+    Entries are keyed by a hash of (subject, description, preprocessor version), so
+    unchanged tickets are never preprocessed twice across retraining runs and any change
+    to the preprocessing logic (a new PREPROCESSOR_VERSION) transparently misses the cache.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS processed_text (
+                key TEXT PRIMARY KEY,
+                processed_text TEXT NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(subject, description, version: str) -> str:
+        """Returns the content hash identifying one ticket's preprocessed text."""
+        payload = json.dumps([subject, description, version], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list) -> dict:
+        """Returns a {key: processed_text} dict for every key present in the cache."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for i in range(0, len(unique_keys), _SQLITE_BATCH_SIZE):
+            batch = unique_keys[i:i + _SQLITE_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(
+                f"SELECT key, processed_text FROM processed_text WHERE key IN ({placeholders})", batch
+            )
+            found.update(rows)
+        return found
+
+    def put_many(self, items: dict):
+        """Stores a {key: processed_text} dict in a single transaction."""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO processed_text (key, processed_text) VALUES (?, ?)",
+                items.items()
+            )
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM processed_text").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
@@ -13,12 +13,19 @@ import os
 # Import our project modules
 from data import get_training_data
 from preprocess import preprocess_data
+from preprocess_cache import PreprocessCache
 from experiment import find_best_model
 from db.engine import engine
 from db.database_setup import tickets
+from instrumentation.stages import install_profiling_hooks
 import config_category as config_cat
 import config_priority as config_pri
 
+# --- Configuration ---
+PREPROCESS_N_JOBS = int(os.getenv("PREPROCESS_N_JOBS", -1))
+# On-disk cache of preprocessed ticket text. Set to an empty string to disable it.
+PREPROCESS_CACHE_PATH = os.getenv("PREPROCESS_CACHE_PATH", ".cache/preprocessed_text.sqlite")
+
 # --- MODIFIED `run` FUNCTION ---
 # It no longer fetches data or updates the database.
 # It now accepts a DataFrame as an argument.
@@ -125,6 +132,7 @@ def main():
     parser = argparse.ArgumentParser(description="Run the model retraining pipeline.")
     parser.add_argument("model_type", choices=['category', 'priority', 'all'], help="The type of model to retrain.")
     args = parser.parse_args()
+    install_profiling_hooks()
 
     # --- STEP 1: DATA PREPARATION (Done ONCE) ---
     print("--- Step 1: Fetching and preprocessing data for all models... ---")
@@ -134,7 +142,13 @@ def main():
         print("No new data to train on. Exiting pipeline.")
         return
             
-    processed_df = preprocess_data(raw_df)
+    # Only tickets that were never preprocessed before (or have changed) are processed again
+    cache = PreprocessCache(PREPROCESS_CACHE_PATH) if PREPROCESS_CACHE_PATH else None
+    try:
+        processed_df = preprocess_data(raw_df, n_jobs=PREPROCESS_N_JOBS, cache=cache)
+    finally:
+        if cache:
+            cache.close()
     print(f"Data ready. Total records for training: {len(processed_df)}")
 
     # --- STEP 2: MODEL TRAINING ---
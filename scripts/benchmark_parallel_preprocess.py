@@ -0,0 +1,49 @@
+# scripts/benchmark_parallel_preprocess.py
+
+"""
+Measures how preprocess_data scales with worker processes. Datasets of 10k, 100k and 1M rows
+are built by resampling the 'original_training_data' table, then preprocessed serially and
+with the process pool.
+
+Usage (from the project root):
+    python -m scripts.benchmark_parallel_preprocess --sizes 10000 100000 1000000 --n-jobs 1 4 -1
+"""
+
+import argparse
+import os
+import time
+import pandas as pd
+from sqlalchemy import select
+
+from db.engine import engine
+from db.database_setup import original_training_data
+from retraining_pipeline.preprocess import preprocess_data
+
+
+def load_tickets() -> pd.DataFrame:
+    """Fetches the subject and description of every ticket in the original dataset."""
+    stmt = select(original_training_data.c.subject, original_training_data.c.description)
+    with engine.connect() as connection:
+        return pd.read_sql(stmt, connection)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parallel preprocessing of ticket data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Dataset sizes in rows.")
+    parser.add_argument("--n-jobs", type=int, nargs="+", default=[1, -1], help="n_jobs values to compare.")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Rows per worker chunk.")
+    args = parser.parse_args()
+
+    tickets = load_tickets()
+    print(f"Loaded {len(tickets)} source tickets. CPU cores available: {os.cpu_count()}")
+
+    print(f"\n{'rows':>10} {'n_jobs':>7} {'seconds':>10} {'rows/sec':>12} {'speed-up':>9}")
+    for size in args.sizes:
+        df = tickets.sample(n=size, replace=True, random_state=42).reset_index(drop=True)
+        baseline = None
+        for n_jobs in args.n_jobs:
+            start = time.perf_counter()
+            preprocess_data(df.copy(), n_jobs=n_jobs, chunk_size=args.chunk_size)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{size:>10} {n_jobs:>7} {elapsed:>10.2f} {size / elapsed:>12.0f} {baseline / elapsed:>8.1f}x")
@@ -0,0 +1,57 @@
+# scripts/benchmark_preprocess.py
+
+"""
+Compares the throughput (tickets/sec) of the reference NLTK preprocessing path and the
+compiled fast path on real tickets from the 'original_training_data' table.
+
+Usage (from the project root):
+    python -m scripts.benchmark_preprocess --limit 2000
+"""
+
+import argparse
+import time
+import pandas as pd
+from sqlalchemy import select
+
+from db.engine import engine
+from db.database_setup import original_training_data
+from retraining_pipeline.preprocess import _clean_and_lemmatize_text, _clean_and_lemmatize_text_reference
+
+
+def load_texts(limit: int) -> list:
+    """Fetches up to `limit` tickets and combines subject and description like preprocess_data."""
+    stmt = select(original_training_data.c.subject, original_training_data.c.description).limit(limit)
+    with engine.connect() as connection:
+        df = pd.read_sql(stmt, connection)
+    return (df['subject'] + ' ' + df['description']).tolist()
+
+
+def benchmark(func, texts: list) -> float:
+    """Runs `func` over every text and returns the throughput in tickets per second."""
+    start = time.perf_counter()
+    for text in texts:
+        func(text)
+    return len(texts) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ticket text preprocessors.")
+    parser.add_argument("--limit", type=int, default=2000, help="Number of tickets to benchmark on.")
+    args = parser.parse_args()
+
+    texts = load_texts(args.limit)
+    print(f"Loaded {len(texts)} tickets.")
+
+    # Warm up NLTK resources so neither path pays the one-off corpus loading cost
+    _clean_and_lemmatize_text_reference(texts[0])
+    _clean_and_lemmatize_text(texts[0])
+
+    reference_tps = benchmark(_clean_and_lemmatize_text_reference, texts)
+    fast_tps = benchmark(_clean_and_lemmatize_text, texts)
+
+    mismatches = sum(_clean_and_lemmatize_text(t) != _clean_and_lemmatize_text_reference(t) for t in texts)
+    print(f"Output mismatches between paths: {mismatches}")
+
+    print(f"Reference path: {reference_tps:10.1f} tickets/sec")
+    print(f"Fast path:      {fast_tps:10.1f} tickets/sec")
+    print(f"Speed-up:       {fast_tps / reference_tps:10.1f}x")
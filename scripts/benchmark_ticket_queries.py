@@ -0,0 +1,121 @@
+# scripts/benchmark_ticket_queries.py
+
+"""
+Seeds a local Postgres with synthetic tickets, then prints the query plan and the latency of
+each hot query against 'tickets': the /tickets/recent and /review-queue pages (first and deep),
+a filtered listing, a ticket lookup, /stats and the retraining pipeline's selection.
+
+Run it once per schema variant to compare, e.g.:
+    python -m db.migrate && python -m scripts.benchmark_ticket_queries --rows 10000000
+    python -m db.migrate --partition-by-month && python -m scripts.benchmark_ticket_queries --skip-seed
+
+Seeding goes through the ticket_stats triggers like any other write. Point DB_* in .env at a
+scratch database: the seeded rows are not removed.
+"""
+
+import argparse
+import time
+import statistics
+from sqlalchemy import text
+
+from db.engine import engine
+
+SEED_SQL = """
+    INSERT INTO tickets (
+        ticket_id, created_at, subject, description, status,
+        predicted_category, predicted_priority, final_category, final_priority,
+        prediction_confidence_category, prediction_confidence_priority, reviewed_at, used_for_retraining
+    )
+    SELECT
+        gen_random_uuid(), created_at, 'Synthetic ticket ' || n, 'Synthetic description for benchmarking',
+        CAST(CASE WHEN n % 50 = 0 THEN 'PENDING_REVIEW' ELSE 'COMPLETED' END AS ticket_status_enum),
+        category, priority,
+        CASE WHEN n % 50 = 0 THEN NULL ELSE category END, CASE WHEN n % 50 = 0 THEN NULL ELSE priority END,
+        0.5 + random() / 2, 0.5 + random() / 2,
+        CASE WHEN n % 50 = 1 THEN created_at + interval '1 hour' END,
+        n % 50 = 1 AND n < :rows * 0.9
+    FROM (
+        SELECT n,
+               now() - interval '365 days' * (1 - n / CAST(:rows AS float)) AS created_at,
+               (ARRAY['Technical Support', 'Finance & Billing', 'Account Management', 'Sales', 'General Inquiry'])[1 + n % 5] AS category,
+               (ARRAY['P1', 'P2', 'P3'])[1 + n % 3] AS priority
+        FROM generate_series(:start, :stop) AS n
+    ) AS synthetic
+"""
+
+# name -> SQL, mirroring the queries the services send. :created_at and :ticket_id come from a
+# row halfway through the table, like a client that paged deep into /tickets/recent.
+QUERIES = {
+    "recent_first_page":
+        "SELECT * FROM tickets ORDER BY created_at DESC, ticket_id DESC LIMIT 101",
+    "recent_deep_page":
+        "SELECT * FROM tickets WHERE (created_at, ticket_id) < (:created_at, :ticket_id) "
+        "ORDER BY created_at DESC, ticket_id DESC LIMIT 101",
+    "recent_by_final_category":
+        "SELECT * FROM tickets WHERE final_category = 'Sales' ORDER BY created_at DESC, ticket_id DESC LIMIT 101",
+    "review_queue_first_page":
+        "SELECT * FROM tickets WHERE status = 'PENDING_REVIEW' ORDER BY created_at, ticket_id LIMIT 101",
+    "ticket_lookup":
+        "SELECT * FROM tickets WHERE ticket_id = :ticket_id",
+    "stats_counters":
+        "SELECT dimension, value, count FROM ticket_stats",
+    "stats_throughput":
+        "SELECT COALESCE(SUM(count), 0) FROM ticket_throughput WHERE bucket >= now() - interval '1 minute'",
+    "retraining_selection":
+        "SELECT ticket_id, subject, description, final_category, final_priority FROM tickets "
+        "WHERE used_for_retraining = false AND reviewed_at IS NOT NULL",
+}
+
+
+def seed(connection, rows: int, chunk_size: int):
+    """Inserts `rows` synthetic tickets spread evenly over the last year, in chunks."""
+    for start in range(1, rows + 1, chunk_size):
+        stop = min(start + chunk_size - 1, rows)
+        chunk_start = time.perf_counter()
+        connection.execute(text(SEED_SQL), {"rows": rows, "start": start, "stop": stop})
+        connection.commit()
+        print(f"Seeded {stop:>11,} / {rows:,} tickets ({time.perf_counter() - chunk_start:.1f}s for this chunk)")
+    connection.execute(text("ANALYZE tickets"))
+    connection.commit()
+
+
+def benchmark(connection, runs: int):
+    """Prints each query's plan, then its median and p95 latency over `runs` executions."""
+    created_at, ticket_id = connection.execute(text(
+        "SELECT created_at, ticket_id FROM tickets ORDER BY created_at DESC, ticket_id DESC "
+        "OFFSET (SELECT count / 2 FROM ticket_stats WHERE dimension = 'total') LIMIT 1"
+    )).one()
+    params = {"created_at": created_at, "ticket_id": ticket_id}
+
+    latencies = {}
+    for name, sql in QUERIES.items():
+        plan = connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params).scalars().all()
+        print(f"\n=== {name} ===")
+        print("\n".join(plan))
+
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            connection.execute(text(sql), params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        latencies[name] = (statistics.median(timings), statistics.quantiles(timings, n=20)[-1])
+
+    print(f"\n{'query':<28} {'p50 ms':>10} {'p95 ms':>10}")
+    for name, (p50, p95) in latencies.items():
+        print(f"{name:<28} {p50:>10.2f} {p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed synthetic tickets and benchmark the hot queries.")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Number of synthetic tickets to seed.")
+    parser.add_argument("--chunk-size", type=int, default=500_000, help="Tickets inserted per transaction.")
+    parser.add_argument("--runs", type=int, default=20, help="Timed executions per query.")
+    parser.add_argument("--skip-seed", action="store_true", help="Benchmark the rows already in the database.")
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        # Seeding and the plans of unindexed queries can exceed the services' statement timeout
+        connection.execute(text("SET statement_timeout = 0"))
+        if not args.skip_seed:
+            seed(connection, args.rows, args.chunk_size)
+        benchmark(connection, args.runs)
@@ -1,10 +1,16 @@
 import os
-import redis
+import json
+import time
+import asyncio
+import redis.asyncio as redis_async
 import uuid
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
 from fastapi.middleware.cors import CORSMiddleware # <-- 1. IMPORT THIS
 from prometheus_fastapi_instrumentator import Instrumentator
+from prometheus_client import Gauge
 
 # --- Configuration & Initialization ---
 
@@ -29,8 +35,39 @@ app.add_middleware(
 # The hostname is 'redis', which is the service name in our docker-compose.yml file.
 # Docker's internal networking resolves this hostname to the Redis container's IP.
 REDIS_HOST = os.getenv("REDIS_HOST", "redis")
-r = redis.Redis(host=REDIS_HOST, port=6379, decode_responses=True)
+# Size of the shared async connection pool, and how long a request may wait for a free connection
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 5))
+
+# All handlers are async and share one bounded pool, so a request waiting on Redis
+# no longer holds one of FastAPI's threadpool workers.
+redis_pool = redis_async.BlockingConnectionPool(
+    host=REDIS_HOST, port=6379, decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT
+)
+r = redis_async.Redis(connection_pool=redis_pool)
 STREAM_NAME = 'ticket_stream'
+GROUP_NAME = os.getenv("STREAM_GROUP_NAME", 'ml_processing_group')
+MAX_BATCH_SIZE = int(os.getenv("INGESTION_MAX_BATCH_SIZE", 10000))
+
+# --- Backpressure Configuration ---
+# Hard cap on the stream length (approximate trimming). This is a last-resort memory guard and
+# must stay well above the high-water mark, because trimming drops the oldest entries.
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", 100000))
+# A request is rejected with 429 if its tickets would take the consumer group's backlog
+# (pending + not yet delivered entries) past this mark, until the ML workers catch up.
+BACKLOG_HIGH_WATER_MARK = int(os.getenv("BACKLOG_HIGH_WATER_MARK", 10000))
+BACKLOG_SAMPLE_INTERVAL_SECONDS = float(os.getenv("BACKLOG_SAMPLE_INTERVAL_SECONDS", 1.0))
+BACKPRESSURE_RETRY_AFTER_SECONDS = int(os.getenv("BACKPRESSURE_RETRY_AFTER_SECONDS", 5))
+
+# --- Prometheus Metrics Definition ---
+STREAM_LENGTH = Gauge('ingestion_stream_length', 'Number of entries in the ticket stream')
+CONSUMER_GROUP_PENDING = Gauge('ingestion_consumer_group_pending', 'Entries delivered to the ML workers but not yet acknowledged')
+CONSUMER_GROUP_LAG = Gauge('ingestion_consumer_group_lag', 'Entries in the ticket stream not yet delivered to the ML workers')
+
+# --- Cached backlog sample, refreshed at most once per sample interval ---
+backlog_sample = {"length": 0, "pending": 0, "lag": 0, "timestamp": 0.0}
+_backlog_sample_lock = asyncio.Lock()
 
 # --- Data Validation Model ---
 
@@ -43,14 +80,94 @@ class Ticket(BaseModel):
     subject: str
     description: str
 
+# --- Backpressure Helpers ---
+
+async def get_stream_backlog() -> int:
+    """
+    Returns the consumer group's backlog (pending + lag) from a cached XINFO GROUPS / XLEN sample.
+    Concurrent requests share a single refresh, so Redis sees at most one sample per interval.
+    If the sample cannot be taken, the last known values are kept (fail open).
+    """
+    if time.monotonic() - backlog_sample["timestamp"] >= BACKLOG_SAMPLE_INTERVAL_SECONDS:
+        async with _backlog_sample_lock:
+            # Another request may have refreshed the sample while we waited for the lock
+            if time.monotonic() - backlog_sample["timestamp"] >= BACKLOG_SAMPLE_INTERVAL_SECONDS:
+                try:
+                    groups = await r.xinfo_groups(STREAM_NAME)
+                    length = await r.xlen(STREAM_NAME)
+                    group = next((g for g in groups if g.get("name") == GROUP_NAME), None)
+                    pending = group.get("pending", 0) if group else 0
+                    # 'lag' is None when Redis cannot compute it (e.g. after XDEL); assume the worst
+                    lag = group.get("lag") if group else length
+                    backlog_sample.update({
+                        "length": length, "pending": pending,
+                        "lag": length if lag is None else lag
+                    })
+                    STREAM_LENGTH.set(backlog_sample["length"])
+                    CONSUMER_GROUP_PENDING.set(backlog_sample["pending"])
+                    CONSUMER_GROUP_LAG.set(backlog_sample["lag"])
+                except Exception as e:
+                    print(f"🚨 WARNING: Could not sample stream backlog. Error: {e}")
+                backlog_sample["timestamp"] = time.monotonic()
+    return backlog_sample["pending"] + backlog_sample["lag"]
+
+async def backpressure_response(incoming=1):
+    """
+    Returns a 429 response when enqueueing `incoming` tickets would take the stream backlog past
+    the high-water mark, else None. Accepted tickets are added to the cached sample straight
+    away (no await between the check and the update), so concurrent requests can't all pass on
+    the same stale sample; call release_backlog() if they could not be enqueued after all.
+    """
+    backlog = await get_stream_backlog()
+    if backlog + incoming > BACKLOG_HIGH_WATER_MARK:
+        print(f"⚠️ {incoming} tickets on top of a backlog of {backlog} entries would pass the high-water mark. Rejecting request.")
+        return JSONResponse(
+            status_code=429,
+            content={"error": "Ticket queue is full, please retry later", "backlog": backlog},
+            headers={"Retry-After": str(BACKPRESSURE_RETRY_AFTER_SECONDS)}
+        )
+    backlog_sample["lag"] += incoming
+    return None
+
+def release_backlog(count):
+    """Takes tickets that failed to enqueue back out of the cached backlog sample."""
+    backlog_sample["lag"] = max(0, backlog_sample["lag"] - count)
+
+def check_backpressure_config():
+    """
+    The stream's MAXLEN trimming silently drops the oldest entries, pending or not, so the backlog
+    must never get near it. The backlog can overshoot the mark by up to one batch per replica
+    between samples, hence the margin of half the stream.
+    """
+    if MAX_BATCH_SIZE > BACKLOG_HIGH_WATER_MARK:
+        raise ValueError(f"INGESTION_MAX_BATCH_SIZE ({MAX_BATCH_SIZE}) must not exceed "
+                         f"BACKLOG_HIGH_WATER_MARK ({BACKLOG_HIGH_WATER_MARK}), or a full batch could never be accepted")
+    if BACKLOG_HIGH_WATER_MARK + MAX_BATCH_SIZE > STREAM_MAXLEN // 2:
+        raise ValueError(f"BACKLOG_HIGH_WATER_MARK + INGESTION_MAX_BATCH_SIZE ({BACKLOG_HIGH_WATER_MARK + MAX_BATCH_SIZE}) "
+                         f"must be at most half of STREAM_MAXLEN ({STREAM_MAXLEN}), so trimming never drops unprocessed tickets")
+
 # --- API Endpoint ---
 
+@app.on_event("startup")
+async def startup_event():
+    check_backpressure_config()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Close every pooled Redis connection
+    await redis_pool.disconnect()
+
 @app.post("/tickets")
-def create_ticket(ticket: Ticket):
+async def create_ticket(ticket: Ticket):
     """
     Receives a ticket, generates a unique ID, and adds it to the Redis Stream
     for asynchronous processing by the ML Worker.
+    Returns 429 with a Retry-After header while the stream backlog is too large.
     """
+    rejection = await backpressure_response()
+    if rejection:
+        return rejection
+
     try:
         # Generate a unique ID for the ticket
         ticket_id = str(uuid.uuid4())
@@ -65,7 +182,7 @@ def create_ticket(ticket: Ticket):
 
         # Add the new ticket data to our Redis Stream.
         # The '*' tells Redis to auto-generate a unique message ID for this entry.
-        r.xadd(STREAM_NAME, ticket_data, '*')
+        await r.xadd(STREAM_NAME, ticket_data, '*', maxlen=STREAM_MAXLEN, approximate=True)
         
         print(f"✅ Added ticket {ticket_id} to the stream.")
 
@@ -75,10 +192,75 @@ def create_ticket(ticket: Ticket):
 
     except Exception as e:
         # If Redis is down or there's another issue, return a server error.
+        release_backlog(1)
         print(f"🚨 ERROR: Could not add ticket to stream. Error: {e}")
         return {"error": "Failed to enqueue ticket for processing"}, 500
 
 
+def _parse_batch_body(body: bytes, content_type: str) -> list:
+    """
+    Decodes a bulk request body. NDJSON (one ticket object per line) is used when the
+    content type says so, otherwise the body must be a JSON array of ticket objects.
+    """
+    text = body.decode("utf-8")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    items = json.loads(text)
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON array of tickets")
+    return items
+
+@app.post("/tickets/batch")
+async def create_tickets_batch(request: Request):
+    """
+    Receives many tickets at once, as a JSON array or as NDJSON, validates every entry
+    with the Ticket model and enqueues them all through a single Redis pipeline.
+    Returns the generated ticket IDs in the same order as the submitted tickets.
+    Returns 429 with a Retry-After header if the batch would take the stream backlog past the
+    high-water mark.
+    """
+    try:
+        items = _parse_batch_body(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:  # json.JSONDecodeError and UnicodeDecodeError are ValueErrors too
+        return JSONResponse(status_code=400, content={"error": f"Malformed batch body: {e}"})
+
+    if len(items) > MAX_BATCH_SIZE:
+        return JSONResponse(status_code=413, content={"error": f"Batch exceeds the maximum of {MAX_BATCH_SIZE} tickets"})
+
+    # Validate everything up front so a bad entry never leaves a partially enqueued batch
+    tickets, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            tickets.append(Ticket.model_validate(item))
+        except ValidationError as e:
+            for error in e.errors(include_url=False):
+                errors.append({**error, "loc": ("body", index, *error["loc"])})
+    if errors:
+        raise RequestValidationError(errors)
+
+    rejection = await backpressure_response(len(tickets))
+    if rejection:
+        return rejection
+
+    ticket_ids = [str(uuid.uuid4()) for _ in tickets]
+    try:
+        async with r.pipeline(transaction=False) as pipe:
+            for ticket_id, ticket in zip(ticket_ids, tickets):
+                pipe.xadd(
+                    STREAM_NAME, {"ticket_id": ticket_id, "subject": ticket.subject, "description": ticket.description}, '*',
+                    maxlen=STREAM_MAXLEN, approximate=True
+                )
+            await pipe.execute()
+
+        print(f"✅ Added {len(ticket_ids)} tickets to the stream.")
+        return {"message": f"{len(ticket_ids)} tickets received for processing", "ticket_ids": ticket_ids}
+
+    except Exception as e:
+        release_backlog(len(ticket_ids))
+        print(f"🚨 ERROR: Could not add ticket batch to stream. Error: {e}")
+        return JSONResponse(status_code=500, content={"error": "Failed to enqueue tickets for processing"})
+
+
 '''
 ### The Workflow: How a Ticket is Ingested
 
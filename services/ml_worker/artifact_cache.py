@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import joblib
+import mlflow
+from contextlib import contextmanager
+
+MODEL_FILE = "model.joblib"
+MANIFEST_FILE = "manifest.json"
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def _file_digest(path):
+    """Returns the sha256 of a file, read in chunks so large models don't need to fit in memory twice."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelArtifactCache:
+    """
+    Local on-disk cache of champion model artifacts, so a restarted worker loads its models
+    from disk instead of downloading them from the MLflow artifact store.
+
+    Each entry lives in <root>/<model name>/<version>/ and holds the model re-saved with joblib
+    plus a manifest recording the registry source and the artifact's sha256 digest. An entry is
+    only used when its source matches the registry and the file still matches its digest.
+    Models are loaded with joblib memory-mapping, so their numpy arrays are paged in from the
+    OS page cache and shared between worker processes. Least recently used entries are evicted
+    once the cache grows beyond max_bytes.
+
+    Forked workers share the cache, so an entry is only written or discarded while holding an
+    exclusive flock on <entry>.lock; a worker that waited for the lock re-checks the entry first
+    and serves what the other worker stored instead of downloading it again.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _entry_dir(self, model_name, version):
+        return os.path.join(self.root, model_name, str(version))
+
+    def _read_manifest(self, entry_dir):
+        try:
+            with open(os.path.join(entry_dir, MANIFEST_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @contextmanager
+    def _entry_lock(self, entry_dir, blocking=True):
+        """Holds the entry's exclusive flock. Non-blocking, yields False if another process holds it."""
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)  # also creates the cache root on first use
+        with open(f"{entry_dir}.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_entry(self, entry_dir, manifest, discard=True):
+        """
+        Loads a cached model after verifying its integrity, or returns None if the entry is unusable.
+        An unusable entry is removed when discard is set, which callers only do under its lock.
+        """
+        model_path = os.path.join(entry_dir, MODEL_FILE)
+        try:
+            if _file_digest(model_path) != manifest["digest"]:
+                print(f"⚠️ Cached model in {entry_dir} failed its integrity check.")
+                if discard:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                return None
+            model = joblib.load(model_path, mmap_mode="r")
+        except Exception as e:
+            print(f"⚠️ Could not load cached model from {entry_dir}: {e}")
+            if discard:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        # The manifest's mtime records when the entry was last used, for LRU eviction
+        os.utime(os.path.join(entry_dir, MANIFEST_FILE))
+        return model
+
+    def _load_valid_entry(self, entry_dir, source, discard=True):
+        """Loads the entry if it was cached from `source` and passes its integrity check, else returns None."""
+        manifest = self._read_manifest(entry_dir)
+        if manifest and manifest.get("source") == source:
+            return self._load_entry(entry_dir, manifest, discard)
+        return None
+
+    def _store(self, model_name, version, source, model):
+        """Writes a model and its manifest into the cache, replacing any previous entry. Call with the entry locked."""
+        entry_dir = self._entry_dir(model_name, version)
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        model_path = os.path.join(tmp_dir, MODEL_FILE)
+        try:
+            joblib.dump(model, model_path)
+            manifest = {
+                "model_name": model_name, "version": str(version), "source": source,
+                "digest": _file_digest(model_path), "size": os.path.getsize(model_path),
+                "cached_at": time.time()
+            }
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        # Swap the complete entry into place so readers never see a half-written model
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        return entry_dir, manifest
+
+    def load(self, model_name, version, source):
+        """
+        Returns the model for (model_name, version), from disk when a valid entry exists,
+        otherwise downloading it from MLflow and adding it to the cache.
+        """
+        entry_dir = self._entry_dir(model_name, version)
+        model = self._load_valid_entry(entry_dir, source, discard=False)
+        if model is not None:
+            print(f"💾 Loaded {model_name} version {version} from the local model cache.")
+            return model
+
+        with self._entry_lock(entry_dir):
+            # Another worker may have stored the entry while this one waited for the lock
+            model = self._load_valid_entry(entry_dir, source)
+            if model is not None:
+                print(f"💾 Loaded {model_name} version {version} from the local model cache.")
+                return model
+
+            model = mlflow.sklearn.load_model(source)
+            try:
+                entry_dir, manifest = self._store(model_name, version, source, model)
+                self.evict(keep=entry_dir)
+                # Serve the memory-mapped copy so every process shares the same pages
+                return self._load_entry(entry_dir, manifest) or model
+            except Exception as e:
+                print(f"⚠️ Could not add {model_name} version {version} to the local model cache: {e}")
+                return model
+
+    def latest(self, model_name):
+        """
+        Returns (version, model) for the most recently used valid entry of a model, or None.
+        Lets a worker start from its last known champion while MLflow is unreachable.
+        """
+        model_root = os.path.join(self.root, model_name)
+        entries = []
+        for version in os.listdir(model_root) if os.path.isdir(model_root) else []:
+            entry_dir = os.path.join(model_root, version)
+            manifest = None if ".tmp-" in version else self._read_manifest(entry_dir)
+            if manifest:
+                entries.append((os.path.getmtime(os.path.join(entry_dir, MANIFEST_FILE)), entry_dir, manifest))
+        for _, entry_dir, manifest in sorted(entries, key=lambda entry: entry[0], reverse=True):
+            with self._entry_lock(entry_dir):
+                model = self._load_valid_entry(entry_dir, manifest["source"])
+            if model is not None:
+                return manifest["version"], model
+        return None
+
+    def evict(self, keep=None):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for model_name in os.listdir(self.root) if os.path.isdir(self.root) else []:
+            model_root = os.path.join(self.root, model_name)
+            for version in os.listdir(model_root) if os.path.isdir(model_root) else []:
+                entry_dir = os.path.join(model_root, version)
+                manifest = None if ".tmp-" in version else self._read_manifest(entry_dir)
+                if manifest:
+                    last_used = os.path.getmtime(os.path.join(entry_dir, MANIFEST_FILE))
+                    entries.append((last_used, entry_dir, manifest["size"]))
+
+        total = sum(size for _, _, size in entries)
+        for _, entry_dir, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry_dir == keep:
+                continue
+            # Skip entries another worker is writing; waiting could deadlock with its own eviction
+            with self._entry_lock(entry_dir, blocking=False) as locked:
+                if not locked:
+                    continue
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            print(f"🧹 Evicted {entry_dir} from the local model cache.")
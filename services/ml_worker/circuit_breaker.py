@@ -0,0 +1,100 @@
+import os
+import time
+import random
+import threading
+from prometheus_client import Counter, Gauge
+
+# --- Configuration ---
+# Consecutive failures before a breaker opens
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 3))
+# Open intervals grow exponentially from the base delay up to the max delay, with jitter
+BREAKER_BASE_DELAY_SECONDS = float(os.getenv("BREAKER_BASE_DELAY_SECONDS", 0.5))
+BREAKER_MAX_DELAY_SECONDS = float(os.getenv("BREAKER_MAX_DELAY_SECONDS", 30))
+
+# --- Prometheus Metrics Definition ---
+STATE_VALUES = {"closed": 0, "open": 1, "half_open": 2}
+CIRCUIT_BREAKER_STATE = Gauge(
+    'dependency_circuit_breaker_state',
+    'Circuit breaker state per dependency (0 = closed, 1 = open, 2 = half-open)',
+    ['dependency']  # Labels: 'redis', 'postgres', 'mlflow'
+)
+CIRCUIT_BREAKER_OPENED_TOTAL = Counter(
+    'dependency_circuit_breaker_opened_total',
+    'Number of times a dependency circuit breaker opened',
+    ['dependency']
+)
+
+
+class Backoff:
+    """Exponential backoff with jitter: the n-th delay is drawn from [cap / 2, cap], cap = min(max, base * 2**n)."""
+
+    def __init__(self, base_delay, max_delay):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempts = 0
+
+    def next_delay(self):
+        cap = min(self.max_delay, self.base_delay * 2 ** self.attempts)
+        self.attempts += 1
+        return random.uniform(cap / 2, cap)
+
+    def reset(self):
+        self.attempts = 0
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of one dependency. After `failure_threshold` consecutive failures the breaker
+    opens and callers should stop using the dependency until the backoff delay has passed. The
+    breaker then turns half-open: the next call is a trial, which closes it on success or re-opens
+    it with a longer delay on failure.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 base_delay=BREAKER_BASE_DELAY_SECONDS, max_delay=BREAKER_MAX_DELAY_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.backoff = Backoff(base_delay, max_delay)
+        self.failures = 0
+        self.retry_at = 0.0
+        self._lock = threading.Lock()  # shared with the model refresher thread
+        self._set_state("closed")
+
+    def _set_state(self, state):
+        self.state = state
+        CIRCUIT_BREAKER_STATE.labels(dependency=self.name).set(STATE_VALUES[state])
+
+    def allow(self):
+        """Returns True if the dependency may be used, turning an expired open breaker half-open."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() >= self.retry_at:
+                self._set_state("half_open")
+            return self.state != "open"
+
+    def seconds_until_retry(self):
+        return max(0.0, self.retry_at - time.monotonic()) if self.state == "open" else 0.0
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.backoff.reset()
+            if self.state != "closed":
+                print(f"✅ {self.name} is healthy again. Closing its circuit breaker.")
+                self._set_state("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                delay = self.backoff.next_delay()
+                self.retry_at = time.monotonic() + delay
+                if self.state != "open":
+                    CIRCUIT_BREAKER_OPENED_TOTAL.labels(dependency=self.name).inc()
+                    self._set_state("open")
+                print(f"⛔ {self.name} circuit breaker open after {self.failures} failures. Retrying in {delay:.1f}s.")
+
+
+# --- Shared breakers for the worker's dependencies ---
+redis_breaker = CircuitBreaker("redis")
+postgres_breaker = CircuitBreaker("postgres")
+mlflow_breaker = CircuitBreaker("mlflow")
@@ -1,7 +1,9 @@
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
+from db.engine_factory import create_db_engine
+
 # --- Database Connection Setup ---
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
@@ -11,7 +13,7 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL)
+engine = create_db_engine(DATABASE_URL, "ml_worker")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db_session():
@@ -24,13 +26,6 @@ def get_db_session():
 
 # --- Core Database Functions ---
 
-# --- NEW FUNCTION ---
-def get_ticket_by_id(session, ticket_id):
-    """Fetches a single, complete ticket record by its ID."""
-    stmt = text("SELECT * FROM tickets WHERE ticket_id = :ticket_id")
-    result = session.execute(stmt, {"ticket_id": str(ticket_id)}).first()
-    return result
-
 def get_or_create_model_record(session, model_name, model_version):
     """
     Checks if a model version is in the 'models' table. If not, it adds it.
@@ -64,51 +59,61 @@ def get_or_create_model_record(session, model_name, model_version):
         session.commit()
         return new_model_id
 
-def create_ticket_entry(session, ticket_id, subject, description, cat_model_id, pri_model_id):
-    """Inserts a new ticket with status 'PROCESSING'."""
+# --- Batch Database Functions ---
+
+def upsert_ticket_results(session, results, cat_model_id, pri_model_id):
+    """
+    Writes a batch of fully processed tickets in a single round-trip and a single commit.
+    Tickets are inserted directly in their final state ('COMPLETED' or 'PENDING_REVIEW');
+    'final_*' labels are only set for COMPLETED tickets. A redelivered ticket overwrites its
+    earlier row unless a human has already reviewed it. Conflicts are detected on the primary key
+    constraint, which is (ticket_id, created_at) once 'tickets' is partitioned by month.
+    Returns the written rows so callers can publish them without reading them back.
+    """
+    completed = [res["status"] == 'COMPLETED' for res in results]
     stmt = text("""
-        INSERT INTO tickets (ticket_id, subject, description, status, category_model_id, priority_model_id)
-        VALUES (:ticket_id, :subject, :description, 'PROCESSING', :cat_model_id, :pri_model_id)
+        INSERT INTO tickets (
+            ticket_id, created_at, subject, description, status,
+            predicted_category, predicted_priority, final_category, final_priority,
+            prediction_confidence_category, prediction_confidence_priority,
+            category_model_id, priority_model_id
+        )
+        SELECT batch.*, CAST(:cat_model_id AS integer), CAST(:pri_model_id AS integer)
+        FROM unnest(
+            CAST(:ticket_ids AS uuid[]), CAST(:created_ats AS timestamp[]),
+            CAST(:subjects AS text[]), CAST(:descriptions AS text[]),
+            CAST(:statuses AS ticket_status_enum[]),
+            CAST(:cats AS varchar[]), CAST(:pris AS varchar[]),
+            CAST(:final_cats AS varchar[]), CAST(:final_pris AS varchar[]),
+            CAST(:cat_confs AS double precision[]), CAST(:pri_confs AS double precision[])
+        ) AS batch
+        ON CONFLICT ON CONSTRAINT tickets_pkey DO UPDATE SET
+            status = EXCLUDED.status,
+            predicted_category = EXCLUDED.predicted_category,
+            predicted_priority = EXCLUDED.predicted_priority,
+            final_category = EXCLUDED.final_category,
+            final_priority = EXCLUDED.final_priority,
+            prediction_confidence_category = EXCLUDED.prediction_confidence_category,
+            prediction_confidence_priority = EXCLUDED.prediction_confidence_priority,
+            category_model_id = EXCLUDED.category_model_id,
+            priority_model_id = EXCLUDED.priority_model_id
+        WHERE tickets.reviewed_at IS NULL
+        RETURNING *
     """)
-    session.execute(stmt, {
-        "ticket_id": ticket_id,
-        "subject": subject,
-        "description": description,
+    rows = session.execute(stmt, {
+        "ticket_ids": [str(res["ticket_id"]) for res in results],
+        "created_ats": [res["created_at"] for res in results],
+        "subjects": [res["subject"] for res in results],
+        "descriptions": [res["description"] for res in results],
+        "statuses": [res["status"] for res in results],
+        "cats": [res["category"] for res in results],
+        "pris": [res["priority"] for res in results],
+        "final_cats": [res["category"] if done else None for res, done in zip(results, completed)],
+        "final_pris": [res["priority"] if done else None for res, done in zip(results, completed)],
+        "cat_confs": [res["cat_confidence"] for res in results],
+        "pri_confs": [res["pri_confidence"] for res in results],
         "cat_model_id": cat_model_id,
         "pri_model_id": pri_model_id
-    })
-    session.commit()
-
-def update_ticket_to_completed(session, ticket_id, category, priority, cat_confidence, pri_confidence):
-    """Updates a ticket to 'COMPLETED' with final predictions."""
-    stmt = text("""
-        UPDATE tickets SET
-            status = 'COMPLETED',
-            predicted_category = :cat, final_category = :cat,
-            predicted_priority = :pri, final_priority = :pri,
-            prediction_confidence_category = :cat_conf,
-            prediction_confidence_priority = :pri_conf
-        WHERE ticket_id = :ticket_id
-    """)
-    session.execute(stmt, {
-        "ticket_id": ticket_id, "cat": category, "pri": priority,
-        "cat_conf": cat_confidence, "pri_conf": pri_confidence
-    })
+    }).fetchall()
     session.commit()
-
-def update_ticket_for_review(session, ticket_id, category_guess, priority_guess, cat_confidence, pri_confidence):
-    """Updates a ticket to 'PENDING_REVIEW' for human-in-the-loop."""
-    stmt = text("""
-        UPDATE tickets SET
-            status = 'PENDING_REVIEW',
-            predicted_category = :cat_guess,
-            predicted_priority = :pri_guess,
-            prediction_confidence_category = :cat_conf,
-            prediction_confidence_priority = :pri_conf
-        WHERE ticket_id = :ticket_id
-    """)
-    session.execute(stmt, {
-        "ticket_id": ticket_id, "cat_guess": category_guess, "pri_guess": priority_guess,
-        "cat_conf": cat_confidence, "pri_conf": pri_confidence
-    })
-    session.commit()
\ No newline at end of file
+    return rows
@@ -0,0 +1,100 @@
+# services/ml_worker/inference.py
+
+import hashlib
+import numpy as np
+from sklearn.pipeline import Pipeline
+
+from instrumentation.stages import stage
+
+# --- Vectorizer fingerprint cache ---
+# Maps id(model) -> (model, fingerprint). The model is kept alongside its fingerprint so a
+# recycled id() of a garbage-collected model can never be mistaken for a cached entry.
+_fingerprint_cache = {}
+_FINGERPRINT_CACHE_SIZE = 8
+
+
+def _split_pipeline(model):
+    """
+    Splits a fitted sklearn Pipeline into its featurizer (all steps but the last)
+    and its final classifier. Returns (None, model) for anything else.
+    """
+    if isinstance(model, Pipeline) and len(model.steps) > 1:
+        return model[:-1], model[-1]
+    return None, model
+
+
+def _featurizer_fingerprint(model):
+    """
+    Computes a digest of a model's fitted featurizer: step types, their parameters and
+    their learned state (vocabulary and IDF weights). Two featurizers with the same
+    fingerprint produce identical matrices, so their transform can be shared.
+    """
+    cached = _fingerprint_cache.get(id(model))
+    if cached and cached[0] is model:
+        return cached[1]
+
+    featurizer, _ = _split_pipeline(model)
+    if featurizer is None:
+        return None
+
+    digest = hashlib.sha1()
+    for name, step in featurizer.steps:
+        digest.update(f"{name}:{type(step).__module__}.{type(step).__name__}".encode())
+        params = step.get_params(deep=False)
+        digest.update(repr(sorted((k, repr(v)) for k, v in params.items())).encode())
+        vocabulary = getattr(step, 'vocabulary_', None)
+        if vocabulary is not None:
+            digest.update(repr(sorted(vocabulary.items())).encode())
+        idf = getattr(step, 'idf_', None)
+        if idf is not None:
+            digest.update(np.ascontiguousarray(idf).tobytes())
+    fingerprint = digest.hexdigest()
+
+    if len(_fingerprint_cache) >= _FINGERPRINT_CACHE_SIZE:
+        _fingerprint_cache.clear()
+    _fingerprint_cache[id(model)] = (model, fingerprint)
+    return fingerprint
+
+
+def predict_with_confidence(models, texts, model_versions=None):
+    """
+    Runs every model over the same input texts with a single predict_proba call each.
+    The label is taken as the argmax over the model's classes_, which is what predict()
+    would return, so the vectorizer and classifier only run once per model. When two
+    models have identical fitted featurizers, the text is vectorized only once.
+
+    Args:
+        models (list): Fitted sklearn estimators (usually 'vect' + 'clf' Pipelines).
+        texts (pd.Series | list): The preprocessed texts to score.
+        model_versions (list, optional): A version label per model for the stage latency metrics.
+
+    Returns:
+        list: One (labels, confidences) tuple of numpy arrays per model, in order.
+    """
+    model_versions = model_versions or [""] * len(models)
+    fingerprints = [_featurizer_fingerprint(model) for model in models]
+
+    # Label each shared vectorizing pass with every model version that uses it
+    versions_by_fingerprint = {}
+    for fingerprint, version in zip(fingerprints, model_versions):
+        versions_by_fingerprint.setdefault(fingerprint, []).append(version)
+
+    features_by_fingerprint = {}
+    results = []
+    for model, fingerprint, version in zip(models, fingerprints, model_versions):
+        featurizer, classifier = _split_pipeline(model)
+        if featurizer is None:
+            with stage("predict_proba", version):
+                probas = model.predict_proba(texts)
+        else:
+            if fingerprint not in features_by_fingerprint:
+                with stage("vectorize", ",".join(versions_by_fingerprint[fingerprint])):
+                    features_by_fingerprint[fingerprint] = featurizer.transform(texts)
+            with stage("predict_proba", version):
+                probas = classifier.predict_proba(features_by_fingerprint[fingerprint])
+
+        best = np.argmax(probas, axis=1)
+        labels = np.asarray(model.classes_)[best]
+        confidences = probas[np.arange(len(best)), best]
+        results.append((labels, confidences))
+    return results
@@ -1,63 +1,178 @@
 import os
 import time
+import threading
 import mlflow
 from mlflow.tracking import MlflowClient
 
+from database import get_db_session, get_or_create_model_record
+from artifact_cache import ModelArtifactCache
+from circuit_breaker import mlflow_breaker
+
 # --- Configuration ---
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://127.0.0.1:5000")
 CATEGORY_MODEL_NAME = "ticket_category_classifier"
 PRIORITY_MODEL_NAME = "ticket_priority_classifier"
-CACHE_EXPIRATION_SECONDS = 3600  # 10 minutes
+# How often the background refresher checks the registry's 'champion' alias
+MODEL_POLL_INTERVAL_SECONDS = float(os.getenv("MODEL_POLL_INTERVAL_SECONDS", 15))
+WARM_UP_TEXT = "warm up request"
+# Local on-disk copy of downloaded model artifacts. Set MODEL_CACHE_DIR to an empty value to disable it.
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", ".model_cache")
+MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+MODEL_NAMES = {"category": CATEGORY_MODEL_NAME, "priority": PRIORITY_MODEL_NAME}
 
 # --- In-memory cache for models ---
+# Each entry is replaced as a whole (never mutated in place), so a reader always sees a
+# consistent model/version/model_id triple even while the refresher swaps in a new champion.
 model_cache = {
-    "category": {"model": None, "version": None, "timestamp": 0},
-    "priority": {"model": None, "version": None, "timestamp": 0}
+    "category": {"model": None, "version": None, "model_id": None, "timestamp": 0},
+    "priority": {"model": None, "version": None, "model_id": None, "timestamp": 0}
 }
 
-client = MlflowClient(tracking_uri=os.getenv("MLFLOW_TRACKING_URI"))
+_client = None
+artifact_cache = ModelArtifactCache(MODEL_CACHE_DIR, MODEL_CACHE_MAX_BYTES) if MODEL_CACHE_DIR else None
 
-def load_champion_models():
+_refresh_lock = threading.Lock()
+_refresher_thread = None
+
+class ModelsUnavailableError(Exception):
+    """Raised when no champion model has been loaded yet."""
+
+def get_mlflow_client():
+    """Creates the MLflow client on first use, so importing this module never touches the tracking store."""
+    global _client
+    if _client is None:
+        _client = MlflowClient(tracking_uri=os.getenv("MLFLOW_TRACKING_URI"))
+    return _client
+
+def resolve_model_id(model_name, model_version):
     """
-    Loads the latest 'champion' aliased models from the MLflow Model Registry.
-    Uses a time-based cache to avoid reloading on every request.
-    Returns the loaded model objects and their version details.
+    Registers a model version in the 'models' table and returns its model_id.
+    Only called when a new version is loaded, so the ticket path never writes to 'models'.
+    Returns None if the database is unavailable; the caller retries on the next refresh.
     """
-    now = time.time()
-    
-    # --- Load Category Model ---
-    if now - model_cache["category"]["timestamp"] > CACHE_EXPIRATION_SECONDS:
-        print("Category model cache expired. Fetching latest champion from MLflow...")
-        try:
-            latest_champion = client.get_model_version_by_alias(CATEGORY_MODEL_NAME, "champion")
-            model_uri = latest_champion.source
-            loaded_model = mlflow.sklearn.load_model(model_uri)
-            
-            model_cache["category"]["model"] = loaded_model
-            model_cache["category"]["version"] = latest_champion.version
-            model_cache["category"]["timestamp"] = now
-            print(f"Loaded new category model version: {latest_champion.version}")
-        except Exception as e:
-            print(f"🚨 ERROR: Could not load category model from MLflow: {e}")
-            # Keep using the old cached model if available
-    
-    # --- Load Priority Model ---
-    if now - model_cache["priority"]["timestamp"] > CACHE_EXPIRATION_SECONDS:
-        print("Priority model cache expired. Fetching latest champion from MLflow...")
+    db_session = next(get_db_session())
+    try:
+        return get_or_create_model_record(db_session, model_name, model_version)
+    except Exception as e:
+        print(f"🚨 ERROR: Could not register {model_name} version {model_version} in the database: {e}")
+        db_session.rollback()
+        return None
+    finally:
+        db_session.close()
+
+def _refresh_model(kind):
+    """
+    Checks the 'champion' alias of one registered model and, if it points to a new version,
+    loads it, warms it up with a dummy prediction and atomically swaps it into the cache.
+    """
+    model_name = MODEL_NAMES[kind]
+    current = model_cache[kind]
+    if not mlflow_breaker.allow():
+        # MLflow is backing off; a cold start can still use the last cached champion
+        if current["model"] is None and artifact_cache is not None:
+            _load_last_known_champion(kind)
+        return
+    try:
+        latest_champion = get_mlflow_client().get_model_version_by_alias(model_name, "champion")
+        mlflow_breaker.record_success()
+    except Exception as e:
+        print(f"🚨 ERROR: Could not check the {kind} champion alias in MLflow: {e}")
+        mlflow_breaker.record_failure()
+        if current["model"] is None and artifact_cache is not None:
+            _load_last_known_champion(kind)
+        return
+
+    # Registry versions may come back as ints or strings depending on the store; cached entries use strings
+    champion_version = str(latest_champion.version)
+    if champion_version == current["version"] and current["model"] is not None:
+        # Same champion: only retry the model_id if the database was down at load time
+        if current["model_id"] is None:
+            model_id = resolve_model_id(model_name, current["version"])
+            if model_id is not None:
+                model_cache[kind] = {**current, "model_id": model_id}
+        return
+
+    print(f"New {kind} champion detected (version {champion_version}). Loading in the background...")
+    try:
+        if artifact_cache is not None:
+            loaded_model = artifact_cache.load(model_name, champion_version, latest_champion.source)
+        else:
+            loaded_model = mlflow.sklearn.load_model(latest_champion.source)
+    except Exception as e:
+        print(f"🚨 ERROR: Could not load {kind} model version {champion_version} from MLflow: {e}")
+        mlflow_breaker.record_failure()
+        # Keep using the old cached model if available
+        return
+    try:
+        # Warm up so the first real ticket doesn't pay for lazy initialisation
+        loaded_model.predict_proba([WARM_UP_TEXT])
+    except Exception as e:
+        print(f"🚨 ERROR: {kind} model version {champion_version} failed its warm-up prediction: {e}")
+        return
+
+    model_cache[kind] = {
+        "model": loaded_model,
+        "version": champion_version,
+        "model_id": resolve_model_id(model_name, champion_version),
+        "timestamp": time.time()
+    }
+    print(f"Loaded new {kind} model version: {champion_version}")
+
+def _load_last_known_champion(kind):
+    """Starts from the most recently used cached model while MLflow is unreachable."""
+    model_name = MODEL_NAMES[kind]
+    cached = artifact_cache.latest(model_name)
+    if cached is None:
+        return
+    version, loaded_model = cached
+    model_cache[kind] = {
+        "model": loaded_model,
+        "version": version,
+        "model_id": resolve_model_id(model_name, version),
+        "timestamp": time.time()
+    }
+    print(f"💾 MLflow unreachable. Using cached {kind} model version {version} until the registry is back.")
+
+def refresh_champion_models():
+    """Polls the registry once for both champion models and hot-swaps any new versions."""
+    with _refresh_lock:
+        for kind in MODEL_NAMES:
+            _refresh_model(kind)
+
+def _refresh_loop():
+    while True:
+        time.sleep(MODEL_POLL_INTERVAL_SECONDS)
         try:
-            latest_champion = client.get_model_version_by_alias(PRIORITY_MODEL_NAME, "champion")
-            model_uri = latest_champion.source
-            loaded_model = mlflow.sklearn.load_model(model_uri)
-
-            model_cache["priority"]["model"] = loaded_model
-            model_cache["priority"]["version"] = latest_champion.version
-            model_cache["priority"]["timestamp"] = now
-            print(f"Loaded new priority model version: {latest_champion.version}")
+            refresh_champion_models()
         except Exception as e:
-            print(f"🚨 ERROR: Could not load priority model from MLflow: {e}")
+            print(f"🚨 ERROR: Champion model refresh failed: {e}")
+
+def start_model_refresher():
+    """Starts the background thread that keeps the champion models up to date."""
+    global _refresher_thread
+    if _refresher_thread is None or not _refresher_thread.is_alive():
+        _refresher_thread = threading.Thread(target=_refresh_loop, name="model-refresher", daemon=True)
+        _refresher_thread.start()
+        print(f"🔄 Champion model refresher started (polling every {MODEL_POLL_INTERVAL_SECONDS}s).")
+
+def champion_models_loaded():
+    return model_cache["category"]["model"] is not None and model_cache["priority"]["model"] is not None
+
+def load_champion_models():
+    """
+    Returns the current 'champion' models from the in-memory cache.
+    New versions are loaded and swapped in by the background refresher, so this is a
+    dictionary read on the ticket path. Models are only loaded inline on a cold start.
+    Returns the loaded model objects and their version details.
+    """
+    if not champion_models_loaded():
+        print("Champion models not loaded yet. Fetching latest champions from MLflow...")
+        refresh_champion_models()
 
-    # Return the currently cached models and their versions
-    category_model_info = {"model": model_cache["category"]["model"], "version": model_cache["category"]["version"], "name": CATEGORY_MODEL_NAME}
-    priority_model_info = {"model": model_cache["priority"]["model"], "version": model_cache["priority"]["version"], "name": PRIORITY_MODEL_NAME}
+    # Read each entry once so model, version and model_id always belong together
+    category, priority = model_cache["category"], model_cache["priority"]
+    category_model_info = {"model": category["model"], "version": category["version"], "model_id": category["model_id"], "name": CATEGORY_MODEL_NAME}
+    priority_model_info = {"model": priority["model"], "version": priority["version"], "model_id": priority["model_id"], "name": PRIORITY_MODEL_NAME}
 
-    return category_model_info, priority_model_info
\ No newline at end of file
+    return category_model_info, priority_model_info
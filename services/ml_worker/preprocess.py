@@ -5,6 +5,10 @@ import nltk
 import re
 from nltk.corpus import stopwords, wordnet
 from nltk.stem import WordNetLemmatizer
+from nltk.corpus.reader.wordnet import ADJ as WN_ADJ, ADV as WN_ADV, NOUN as WN_NOUN, VERB as WN_VERB
+from nltk.tag.perceptron import PerceptronTagger
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 import os
 import sys
 
@@ -35,9 +39,11 @@ def _get_wordnet_pos(treebank_tag):
         return wordnet.NOUN
 
 
-def _clean_and_lemmatize_text(text: str) -> str:
+def _clean_and_lemmatize_text_reference(text: str) -> str:
     """
-    Internal helper function to perform all cleaning and processing on a single text string.
+    Reference (slow-path) implementation of the cleaning and processing of a single text string.
+    Kept as the source of truth for the golden-output test and the preprocessing benchmark;
+    _clean_and_lemmatize_text must always return exactly the same output.
     """
     if not isinstance(text, str):
         return ""
@@ -73,7 +79,133 @@ def _clean_and_lemmatize_text(text: str) -> str:
     return " ".join(processed_tokens).strip()
 
 
-def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
+# --- Compiled fast-path engine ---
+# Bump this whenever the output of _clean_and_lemmatize_text changes.
+PREPROCESSOR_VERSION = "1"
+
+LEMMA_CACHE_SIZE = int(os.getenv("LEMMA_CACHE_SIZE", 100_000))
+
+# Step 2 must run on its own: URLs and e-mails may swallow '<' / '>' characters,
+# which changes what the HTML pattern matches afterwards.
+_URL_EMAIL_PATH_RE = re.compile(r'(https?|ftp)://[^\s/$.?#].[^\s]*|www\.\S+|(\S+@\S+)|([a-z]:\\[^\s:]+)')
+
+# Steps 3, 5 and 6 combined into a single left-to-right pass. HTML tags start and end on
+# non-word characters and long tokens are whole words, so replacing either with a space never
+# changes the word boundaries the other alternatives see. Step 4 (long numbers) is dropped:
+# the digits and ' '/'-' separators it matches are blanked by the non-alphabetic pass anyway.
+_CLEANUP_RE = re.compile(r'<.*?>|\b[a-z0-9]{20,}\b|[^a-z\s]')
+
+# After cleanup the text only holds [a-z] and whitespace, so the only thing NLTK's Treebank
+# tokenizer (and Punkt sentence splitting) still does is split these whole-word contractions.
+_TOKEN_SPLITS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+
+# Plain constants (not the lazy `wordnet` corpus) so importing this module does not load WordNet.
+_WORDNET_POS_BY_PREFIX = {'J': WN_ADJ, 'V': WN_VERB, 'N': WN_NOUN, 'R': WN_ADV}
+
+_TAGGER = None
+
+
+def _get_tagger():
+    """
+    Returns a process-wide PerceptronTagger. nltk.pos_tag() builds (and loads the model for)
+    a new tagger on every call, which dominates the cost of tagging a short ticket.
+    """
+    global _TAGGER
+    if _TAGGER is None:
+        _TAGGER = PerceptronTagger()
+    return _TAGGER
+
+
+def _tokenize(text: str) -> list:
+    """Equivalent of nltk.word_tokenize for text that only contains [a-z] and whitespace."""
+    tokens = []
+    for word in text.split():
+        split = _TOKEN_SPLITS.get(word)
+        if split:
+            tokens.extend(split)
+        else:
+            tokens.append(word)
+    return tokens
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def _lemmatize(word: str, tag_prefix: str) -> str:
+    """Bounded LRU cache over WordNet lemmatization, keyed by (token, POS)."""
+    return LEMMATIZER.lemmatize(word, _WORDNET_POS_BY_PREFIX.get(tag_prefix, WN_NOUN))
+
+
+def _clean_and_lemmatize_text(text: str) -> str:
+    """
+    Internal helper function to perform all cleaning and processing on a single text string.
+    Produces exactly the same output as _clean_and_lemmatize_text_reference.
+    """
+    if not isinstance(text, str):
+        return ""
+
+    text = _URL_EMAIL_PATH_RE.sub(' ', text.lower())
+    text = _CLEANUP_RE.sub(' ', text)
+
+    tokens = _tokenize(text)
+    if not tokens:
+        return ""
+
+    processed_tokens = []
+    for word, tag in _get_tagger().tag(tokens):
+        lemma = _lemmatize(word, tag[:1])
+        if lemma not in STOP_WORDS and len(lemma) > 2:
+            processed_tokens.append(lemma)
+
+    return " ".join(processed_tokens).strip()
+
+
+# --- Parallel preprocessing ---
+PREPROCESS_CHUNK_SIZE = int(os.getenv("PREPROCESS_CHUNK_SIZE", 2000))
+
+
+def _warm_up_worker():
+    """
+    Process-pool initializer. Loads the stop words, WordNet and the POS tagger once per
+    worker process so that no chunk pays the corpus loading cost.
+    """
+    _clean_and_lemmatize_text("warming up the running workers")
+
+
+def _process_chunk(texts: list) -> list:
+    """Cleans and lemmatizes one chunk of texts inside a worker process."""
+    return [_clean_and_lemmatize_text(text) for text in texts]
+
+
+def _resolve_n_jobs(n_jobs) -> int:
+    """Resolves an sklearn-style n_jobs value (None, -1, -2, ...) into a process count."""
+    cpu_count = os.cpu_count() or 1
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, cpu_count + 1 + n_jobs)
+    return n_jobs
+
+
+def _clean_texts(texts: list, n_jobs: int, chunk_size: int) -> list:
+    """Cleans and lemmatizes a list of texts, serially or across a process pool, preserving order."""
+    n_workers = _resolve_n_jobs(n_jobs)
+    if n_workers == 1 or len(texts) <= chunk_size:
+        return [_clean_and_lemmatize_text(text) for text in texts]
+
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    print(f"Preprocessing {len(texts)} rows in {len(chunks)} chunks across {n_workers} processes...")
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_warm_up_worker) as executor:
+        # executor.map yields results in submission order, so row order is preserved
+        return [text for chunk in executor.map(_process_chunk, chunks) for text in chunk]
+
+
+def preprocess_data(df: pd.DataFrame, n_jobs: int = 1, chunk_size: int = PREPROCESS_CHUNK_SIZE, cache=None) -> pd.DataFrame:
     """
     The main function to preprocess the ticket data.
     It takes a DataFrame with 'subject' and 'description' columns and returns
@@ -81,6 +213,10 @@ def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
 
     Args:
         df (pd.DataFrame): The input DataFrame.
+        n_jobs (int): Number of worker processes. 1 runs serially, -1 uses all cores.
+        chunk_size (int): Number of rows sent to a worker process at a time.
+        cache: Optional content-addressed store (e.g. PreprocessCache) exposing make_key,
+            get_many and put_many. Only rows missing from it are preprocessed.
 
     Returns:
         pd.DataFrame: The processed DataFrame.
@@ -90,9 +226,31 @@ def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
     # Combine subject and description for a complete text representation
     # Note: Using 'description' to align with our database schema, not 'body'
     df['full_text'] = df['subject'] + ' ' + df['description']
+    texts = df['full_text'].tolist()
     
     # Apply the cleaning and lemmatization function
-    df['processed_text'] = df['full_text'].apply(_clean_and_lemmatize_text)
+    if cache is None:
+        processed = _clean_texts(texts, n_jobs, chunk_size)
+    else:
+        keys = [
+            cache.make_key(subject, description, PREPROCESSOR_VERSION)
+            for subject, description in zip(df['subject'].tolist(), df['description'].tolist())
+        ]
+        cached = cache.get_many(keys)
+        hits = sum(key in cached for key in keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        print(f"Preprocessing cache: {hits} of {len(keys)} rows cached, {len(missing)} new texts to process.")
+
+        if missing:
+            new_texts = dict(zip(missing.keys(), _clean_texts(list(missing.values()), n_jobs, chunk_size)))
+            cache.put_many(new_texts)
+            cached.update(new_texts)
+        processed = [cached[key] for key in keys]
+
+    df['processed_text'] = pd.Series(processed, index=df.index)
 
     print("Preprocessing complete.")
     
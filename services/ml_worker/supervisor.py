@@ -0,0 +1,179 @@
+# services/ml_worker/supervisor.py
+
+import os
+import gc
+import glob
+import time
+import signal
+
+# prometheus_client aggregates the consumers' metrics through files in PROMETHEUS_MULTIPROC_DIR.
+# Stale files from a previous run must be removed before the worker module creates its metrics.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    for stale_file in glob.glob(os.path.join(MULTIPROC_DIR, "*.db")):
+        os.remove(stale_file)
+
+from prometheus_client import start_http_server, CollectorRegistry, multiprocess
+
+import worker
+import database
+from models import refresh_champion_models, start_model_refresher
+from instrumentation.stages import install_profiling_hooks
+
+# --- Configuration ---
+# Number of consumer processes sharing the consumer group (defaults to one per CPU core)
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", 0)) or os.cpu_count() or 1
+# How long consumers get to finish their in-flight batch on shutdown before being killed
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("WORKER_DRAIN_TIMEOUT_SECONDS", 30))
+RESTART_DELAY_SECONDS = float(os.getenv("WORKER_RESTART_DELAY_SECONDS", 1))
+POLL_INTERVAL_SECONDS = 0.2
+# How often exited consumers are checked for removal from the consumer group
+RETIRED_CONSUMER_CHECK_SECONDS = float(os.getenv("RETIRED_CONSUMER_CHECK_SECONDS", 30))
+
+# --- Supervisor State ---
+children = {}  # pid -> slot number
+shutdown_deadline = None
+# Consumer names of exited consumers, removed from the group once their pending entries are reclaimed
+retired_consumers = set()
+
+def consumer_name(pid):
+    return f'worker_{pid}'
+
+def run_consumer():
+    """Entry point of a forked consumer process."""
+    signal.signal(signal.SIGTERM, worker.request_stop)
+    signal.signal(signal.SIGINT, worker.request_stop)
+    install_profiling_hooks()
+
+    # Every process needs its own consumer name and its own connections
+    worker.WORKER_NAME = consumer_name(os.getpid())
+    worker.r.connection_pool.reset()
+    database.engine.dispose(close=False)
+
+    # Threads don't survive fork(), so each consumer runs its own model refresher
+    start_model_refresher()
+    worker.consume_forever()
+
+def spawn_consumer(slot):
+    """Forks one consumer process into the shared consumer group."""
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            run_consumer()
+        except BaseException as e:
+            print(f"🚨 Consumer {slot} crashed: {e}")
+            exit_code = 1
+        finally:
+            # Skip the parent's atexit handlers and buffered state
+            os._exit(exit_code)
+    children[pid] = slot
+    # A reused pid means a live consumer under the retired name
+    retired_consumers.discard(consumer_name(pid))
+    print(f"👷 Started consumer {slot} (pid {pid}).")
+
+def remove_retired_consumers():
+    """
+    Deletes exited consumers from the consumer group once the live ones have reclaimed all their
+    pending entries (XGROUP DELCONSUMER drops whatever is still pending). Every restarted consumer
+    joins under a new name, so without this the old names would skew the XINFO-based backlog and
+    idle metrics indefinitely.
+    """
+    if not retired_consumers:
+        return
+    try:
+        pending = {consumer["name"]: consumer["pending"]
+                   for consumer in worker.r.xinfo_consumers(worker.STREAM_NAME, worker.GROUP_NAME)}
+        for name in list(retired_consumers):
+            if pending.get(name, 0) > 0:
+                continue
+            if name in pending:
+                worker.r.xgroup_delconsumer(worker.STREAM_NAME, worker.GROUP_NAME, name)
+                print(f"🧹 Removed exited consumer {name} from the consumer group.")
+            retired_consumers.discard(name)
+    except Exception as e:
+        print(f"🚨 Could not remove exited consumers from the consumer group: {e}")
+
+def request_shutdown(signum, frame):
+    """Forwards SIGTERM to every consumer so each drains its in-flight batch, then exits."""
+    global shutdown_deadline
+    if shutdown_deadline is not None:
+        return
+    print(f"🛑 Supervisor received signal {signum}. Draining {len(children)} consumers...")
+    shutdown_deadline = time.monotonic() + DRAIN_TIMEOUT_SECONDS
+    for pid in list(children):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+def forward_signal(signum, frame):
+    """Forwards profiling signals (SIGUSR1/SIGUSR2) to every consumer."""
+    for pid in list(children):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+def supervise():
+    """
+    Reaps exited consumers, restarting crashed ones until a shutdown is requested, and removes
+    the exited ones from the consumer group once nothing is pending for them.
+    """
+    next_retired_check = time.monotonic() + RETIRED_CONSUMER_CHECK_SECONDS
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            if shutdown_deadline is not None and time.monotonic() > shutdown_deadline:
+                print(f"⚠️ {len(children)} consumers did not drain in time. Killing them.")
+                for child_pid in list(children):
+                    os.kill(child_pid, signal.SIGKILL)
+            if time.monotonic() >= next_retired_check:
+                remove_retired_consumers()
+                next_retired_check = time.monotonic() + RETIRED_CONSUMER_CHECK_SECONDS
+            time.sleep(POLL_INTERVAL_SECONDS)
+            continue
+
+        slot = children.pop(pid)
+        retired_consumers.add(consumer_name(pid))
+        if MULTIPROC_DIR:
+            multiprocess.mark_process_dead(pid)
+        if shutdown_deadline is None:
+            print(f"🚨 Consumer {slot} (pid {pid}) exited with code {os.waitstatus_to_exitcode(status)}. Restarting...")
+            time.sleep(RESTART_DELAY_SECONDS)
+            spawn_consumer(slot)
+    # Drained consumers acknowledged their last batch, so they can usually be removed right away
+    remove_retired_consumers()
+
+
+# --- Main Application Execution ---
+if __name__ == "__main__":
+    print(f"🚀 ML Worker supervisor starting {WORKER_PROCESSES} consumer processes...")
+
+    # Serve the metrics of all consumers on port 8000
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(8000, registry=registry)
+    else:
+        print("⚠️ PROMETHEUS_MULTIPROC_DIR is not set. Only the supervisor's own metrics are exported.")
+        start_http_server(8000)
+    print("📈 Prometheus metrics server started on port 8000.")
+
+    worker.create_consumer_group()
+
+    # Load the champion models once, before forking, so consumers share their memory copy-on-write.
+    # Freezing the GC keeps collections in the children from touching (and copying) those pages.
+    refresh_champion_models()
+    gc.freeze()
+
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(signal.SIGUSR1, forward_signal)
+    signal.signal(signal.SIGUSR2, forward_signal)
+    for slot in range(WORKER_PROCESSES):
+        spawn_consumer(slot)
+
+    supervise()
+    print("👋 All consumers drained. Supervisor exiting.")
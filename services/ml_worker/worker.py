@@ -2,14 +2,20 @@
 
 import os
 import time
+import signal
 import redis
 import pandas as pd
 import json
+from datetime import datetime
 from prometheus_client import start_http_server, Counter, Histogram
+from sqlalchemy.exc import DBAPIError, OperationalError
 
 from preprocess import preprocess_data
-from database import get_db_session, get_or_create_model_record, create_ticket_entry, update_ticket_to_completed, update_ticket_for_review, get_ticket_by_id
-from models import load_champion_models
+from database import get_db_session, upsert_ticket_results
+from models import load_champion_models, refresh_champion_models, start_model_refresher, champion_models_loaded, ModelsUnavailableError
+from inference import predict_with_confidence
+from instrumentation.stages import stage, profiled, install_profiling_hooks
+from circuit_breaker import Backoff, redis_breaker, postgres_breaker, mlflow_breaker, BREAKER_BASE_DELAY_SECONDS, BREAKER_MAX_DELAY_SECONDS
 
 # --- Configuration ---
 REDIS_HOST = os.getenv("REDIS_HOST", "redis")
@@ -18,6 +24,26 @@ STREAM_NAME = 'ticket_stream'
 GROUP_NAME = 'ml_processing_group'
 WORKER_NAME = f'worker_{os.getpid()}'
 REDIS_PUB_CHANNEL = "ticket_updates"
+# Every update is appended here first and then published as "<entry id> <json>", so the results
+# API can resume from the last entry id it saw after being disconnected from Redis
+UPDATES_STREAM = 'ticket_updates_log'
+UPDATES_STREAM_MAXLEN = int(os.getenv("TICKET_UPDATES_STREAM_MAXLEN", 10000))
+# Micro-batching: read up to BATCH_SIZE messages, waiting at most BATCH_MAX_WAIT_MS
+# after the first one arrives before processing whatever has been collected.
+BATCH_SIZE = int(os.getenv("WORKER_BATCH_SIZE", 32))
+BATCH_MAX_WAIT_MS = int(os.getenv("WORKER_BATCH_MAX_WAIT_MS", 50))
+# How long the first read of a batch blocks, so a stop request is noticed within this time
+WORKER_BLOCK_MS = int(os.getenv("WORKER_BLOCK_MS", 2000))
+# Pending entries idle for longer than RECLAIM_IDLE_MS (e.g. read by a consumer that crashed)
+# are claimed by another consumer; after MAX_DELIVERIES attempts they go to the dead-letter stream.
+DEAD_LETTER_STREAM = 'ticket_stream_dead_letter'
+RECLAIM_IDLE_MS = int(os.getenv("RECLAIM_IDLE_MS", 60000))
+RECLAIM_INTERVAL_SECONDS = float(os.getenv("RECLAIM_INTERVAL_SECONDS", 10))
+MAX_DELIVERIES = int(os.getenv("MAX_DELIVERIES", 5))
+DEAD_LETTER_MAXLEN = int(os.getenv("DEAD_LETTER_MAXLEN", 100000))
+REQUIRED_FIELDS = ("ticket_id", "subject", "description")
+# Publish an intermediate 'PROCESSING' event before inference (Redis only, no DB write)
+ANNOUNCE_PROCESSING = os.getenv("ANNOUNCE_PROCESSING", "true").lower() == "true"
 
 # --- Prometheus Metrics Definition ---
 TICKETS_PROCESSED_TOTAL = Counter(
@@ -29,127 +55,392 @@ TICKET_PROCESSING_LATENCY = Histogram(
     'ticket_processing_latency_seconds',
     'Time spent processing a ticket'
 )
+BATCH_PROCESSING_LATENCY = Histogram(
+    'ticket_batch_processing_latency_seconds',
+    'Time spent processing a batch of tickets'
+)
+BATCH_SIZE_OBSERVED = Histogram(
+    'ticket_batch_size',
+    'Number of tickets processed per batch',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
 MODEL_CONFIDENCE = Histogram(
     'model_confidence_score',
     'Distribution of model prediction confidence scores',
     ['model_type']  # Labels: 'category', 'priority'
 )
+TICKETS_RECLAIMED_TOTAL = Counter(
+    'tickets_reclaimed_total',
+    'Pending stream entries claimed from idle consumers for another attempt'
+)
+TICKETS_DEAD_LETTERED_TOTAL = Counter(
+    'tickets_dead_lettered_total',
+    'Stream entries moved to the dead-letter stream',
+    ['reason']  # Labels: 'malformed', 'max_deliveries'
+)
 
 # --- Redis Connection ---
 r = redis.Redis(host=REDIS_HOST, port=6379, decode_responses=True)
 
-# --- Helper Function ---
-def publish_ticket_update(ticket_id):
-    """Fetches the latest ticket data and publishes it to the Redis channel."""
-    db_session = next(get_db_session())
+# Set by SIGTERM/SIGINT; the consume loop finishes and acknowledges its in-flight batch, then exits
+_stop_requested = False
+# Position of the XAUTOCLAIM scan through the consumer group's pending entries
+_reclaim_cursor = '0-0'
+
+# --- Helper Functions ---
+def serialize_ticket_record(ticket_record):
+    """Converts a ticket row into a JSON-serializable dict."""
+    ticket_dict = dict(ticket_record._mapping)
+
+    # Serialize fields that are not JSON-native
+    for key, value in ticket_dict.items():
+        if hasattr(value, 'isoformat'):  # Datetime objects
+            ticket_dict[key] = value.isoformat()
+        elif hasattr(value, 'hex'):  # UUID objects
+            ticket_dict[key] = str(value)
+    return ticket_dict
+
+def publish_ticket_updates(payloads):
+    """
+    Appends the updates to the updates stream, then publishes each one prefixed with the id of
+    its stream entry. Two pipelined round trips, since the ids are only known after the XADDs.
+    """
+    pipe = r.pipeline(transaction=False)
+    for payload in payloads:
+        pipe.xadd(UPDATES_STREAM, {"data": payload}, maxlen=UPDATES_STREAM_MAXLEN, approximate=True)
+    entry_ids = pipe.execute()
+    pipe = r.pipeline(transaction=False)
+    for entry_id, payload in zip(entry_ids, payloads):
+        pipe.publish(REDIS_PUB_CHANNEL, f"{entry_id} {payload}")
+    pipe.execute()
+
+def publish_ticket_records(ticket_records):
+    """Publishes already-fetched ticket rows through one Redis pipeline, without any DB read-back."""
     try:
-        ticket_record = get_ticket_by_id(db_session, ticket_id)
-        if ticket_record:
-            ticket_dict = dict(ticket_record._mapping)
-            
-            # Serialize fields that are not JSON-native
-            for key, value in ticket_dict.items():
-                if hasattr(value, 'isoformat'):  # Datetime objects
-                    ticket_dict[key] = value.isoformat()
-                elif hasattr(value, 'hex'):  # UUID objects
-                    ticket_dict[key] = str(value)
-
-            r.publish(REDIS_PUB_CHANNEL, json.dumps(ticket_dict))
-            print(f"📢 Published update for ticket {ticket_id} to '{REDIS_PUB_CHANNEL}'")
+        publish_ticket_updates([json.dumps(serialize_ticket_record(ticket_record)) for ticket_record in ticket_records])
+        print(f"📢 Published updates for {len(ticket_records)} tickets to '{REDIS_PUB_CHANNEL}'")
     except Exception as e:
-        print(f"🚨 ERROR publishing ticket update for {ticket_id}: {e}")
-    finally:
-        db_session.close()
+        print(f"🚨 ERROR publishing ticket updates for {len(ticket_records)} tickets: {e}")
 
+def stream_id_to_datetime(message_id):
+    """
+    Returns the time a message was added to the stream (UTC), from the milliseconds part of its ID.
+    Used as the ticket's created_at, so a redelivered ticket keeps the same primary key when
+    'tickets' is partitioned by created_at.
+    """
+    return datetime.utcfromtimestamp(int(message_id.split('-')[0]) / 1000)
 
-# --- Main Application Execution ---
-if __name__ == "__main__":
-    print("🚀 ML Worker starting...")
-    
-    # Start a server on port 8000 to expose Prometheus metrics
-    start_http_server(8000)
-    print("📈 Prometheus metrics server started on port 8000.")
+def announce_processing(tickets):
+    """Publishes a 'PROCESSING' event for each ticket, built from the stream message alone."""
+    try:
+        publish_ticket_updates([json.dumps({**ticket, "status": "PROCESSING", "created_at": ticket["created_at"].isoformat()})
+                                for ticket in tickets])
+    except Exception as e:
+        print(f"🚨 ERROR announcing PROCESSING status for {len(tickets)} tickets: {e}")
+
+def read_batch():
+    """
+    Blocks for up to WORKER_BLOCK_MS until a message is available, then keeps reading until
+    BATCH_SIZE messages are collected or BATCH_MAX_WAIT_MS has elapsed.
+    Returns a list of (message_id, data) tuples, empty if nothing arrived.
+    """
+    response = r.xreadgroup(GROUP_NAME, WORKER_NAME, {STREAM_NAME: '>'}, count=BATCH_SIZE, block=WORKER_BLOCK_MS)
+    if not response:
+        return []
+    messages = list(response[0][1])
+
+    deadline = time.monotonic() + BATCH_MAX_WAIT_MS / 1000
+    while len(messages) < BATCH_SIZE:
+        remaining_ms = int((deadline - time.monotonic()) * 1000)
+        if remaining_ms <= 0:
+            break
+        response = r.xreadgroup(GROUP_NAME, WORKER_NAME, {STREAM_NAME: '>'}, count=BATCH_SIZE - len(messages), block=remaining_ms)
+        if not response:
+            break
+        messages.extend(response[0][1])
+    return messages
+
+def dead_letter(message_id, data, reason, delivery_count):
+    """Moves an entry to the dead-letter stream and acknowledges it in one transaction."""
+    pipe = r.pipeline(transaction=True)
+    pipe.xadd(DEAD_LETTER_STREAM, {
+        **(data or {}), "original_message_id": message_id,
+        "failure_reason": reason, "delivery_count": delivery_count
+    }, maxlen=DEAD_LETTER_MAXLEN, approximate=True)
+    pipe.xack(STREAM_NAME, GROUP_NAME, message_id)
+    pipe.execute()
+    TICKETS_DEAD_LETTERED_TOTAL.labels(reason=reason).inc()
+    print(f"☠️ Moved message {message_id} to '{DEAD_LETTER_STREAM}' ({reason}, {delivery_count} deliveries).")
+
+def reclaim_pending():
+    """
+    Claims pending entries idle for at least RECLAIM_IDLE_MS with XAUTOCLAIM, continuing the scan
+    from where the previous call stopped. Entries delivered more than MAX_DELIVERIES times are
+    dead-lettered. Returns the (message_id, data) tuples to process again, or an empty list once
+    a full pass over the pending entries found nothing to retry.
+    """
+    global _reclaim_cursor
+    while True:
+        response = r.xautoclaim(STREAM_NAME, GROUP_NAME, WORKER_NAME, RECLAIM_IDLE_MS, start_id=_reclaim_cursor, count=BATCH_SIZE)
+        _reclaim_cursor, claimed = response[0], response[1]
+
+        # Entries trimmed from the stream come back without data (Redis < 7); just acknowledge them
+        trimmed_ids = [message_id for message_id, data in claimed if data is None]
+        if trimmed_ids:
+            r.xack(STREAM_NAME, GROUP_NAME, *trimmed_ids)
+        claimed = [(message_id, data) for message_id, data in claimed if data is not None]
+
+        retry = []
+        if claimed:
+            pending = r.xpending_range(STREAM_NAME, GROUP_NAME, claimed[0][0], claimed[-1][0], len(claimed), consumername=WORKER_NAME)
+            delivery_counts = {entry["message_id"]: entry["times_delivered"] for entry in pending}
+            for message_id, data in claimed:
+                delivery_count = delivery_counts.get(message_id, 1)
+                if delivery_count > MAX_DELIVERIES:
+                    dead_letter(message_id, data, "max_deliveries", delivery_count)
+                else:
+                    retry.append((message_id, data))
+            if retry:
+                TICKETS_RECLAIMED_TOTAL.inc(len(retry))
+                print(f"♻️ Reclaimed {len(retry)} idle pending messages.")
+
+        if retry or _reclaim_cursor in ('0-0', '0'):
+            return retry
+
+def failed_dependency(error):
+    """Returns the circuit breaker of the dependency an error points to, or None for other errors."""
+    if isinstance(error, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+        return redis_breaker
+    if isinstance(error, OperationalError) or (isinstance(error, DBAPIError) and error.connection_invalidated):
+        return postgres_breaker
+    if isinstance(error, ModelsUnavailableError):
+        return mlflow_breaker
+    return None
+
+def blocking_breakers():
+    """Returns the open breakers that should pause reading from the stream."""
+    breakers = [redis_breaker, postgres_breaker]
+    # MLflow only matters while no champion model is loaded
+    if not champion_models_loaded():
+        breakers.append(mlflow_breaker)
+    return [breaker for breaker in breakers if not breaker.allow()]
+
+def dependencies_healthy():
+    """
+    True when every breaker is closed with no failure since its last success. Reclaiming bumps
+    each entry's delivery count, so it must not happen while a failing dependency would make the
+    attempt fail and push healthy tickets towards MAX_DELIVERIES.
+    """
+    return all(breaker.state == "closed" and breaker.failures == 0
+               for breaker in (redis_breaker, postgres_breaker, mlflow_breaker))
+
+def process_messages(messages):
+    """
+    Processes messages as one batch. Malformed entries are dead-lettered up front. If the batch
+    fails, each message is retried on its own so one poison ticket cannot fail the others; the
+    failing ones stay pending until they are reclaimed. Re-raises if no message could be processed,
+    because that points to a dependency outage rather than a bad ticket.
+    """
+    valid = []
+    for message_id, data in messages:
+        if all(field in data for field in REQUIRED_FIELDS):
+            valid.append((message_id, data))
+        else:
+            dead_letter(message_id, data, "malformed", 1)
+    if not valid:
+        return
+
+    try:
+        process_batch(valid)
+        return
+    except Exception as e:
+        # A dependency outage would fail every message again; let the circuit breaker handle it
+        if len(valid) == 1 or failed_dependency(e):
+            raise
+        print(f"🚨 Batch of {len(valid)} messages failed ({e}). Retrying them one by one...")
+
+    failed = []
+    for message in valid:
+        try:
+            process_batch([message])
+        except Exception as e:
+            print(f"🚨 Message {message[0]} failed: {e}. Leaving it pending for reclaim.")
+            failed.append(e)
+    if len(failed) == len(valid):
+        raise failed[-1]
 
-    # Create Redis consumer group if it doesn't exist
+def process_batch(messages):
+    """
+    Runs the full inference pipeline over a batch of stream messages:
+    one preprocessing pass, one predict_proba call per model,
+    a single INSERT ... RETURNING for all rows and a single XACK for all message ids.
+    Each step is timed into the stage latency histogram, labelled with the champion versions.
+    """
+    db_session = None
+    message_ids = [message_id for message_id, _ in messages]
+    tickets = [
+        {"ticket_id": data['ticket_id'], "subject": data['subject'], "description": data['description'],
+         "created_at": stream_id_to_datetime(message_id)}
+        for message_id, data in messages
+    ]
+    print(f"📨 Received batch of {len(tickets)} tickets. Processing...")
+
+    try:
+        with BATCH_PROCESSING_LATENCY.time(), profiled("process_batch"):
+            batch_start = time.perf_counter()
+
+            # 1. Load Champion Models and their cached model_ids (from cache or MLflow)
+            with stage("load_models"):
+                cat_model_info, pri_model_info = load_champion_models()
+            if not all([cat_model_info["model"], pri_model_info["model"]]):
+                raise ModelsUnavailableError("One or more champion models could not be loaded.")
+            if not all([cat_model_info["model_id"], pri_model_info["model_id"]]):
+                raise Exception("One or more champion models are not registered in the database.")
+            cat_model_id, pri_model_id = cat_model_info["model_id"], pri_model_info["model_id"]
+            cat_version, pri_version = f"category:{cat_model_info['version']}", f"priority:{pri_model_info['version']}"
+            model_version = f"{cat_version},{pri_version}"
+
+            # 2. Optionally announce 'PROCESSING' status to live dashboards
+            if ANNOUNCE_PROCESSING:
+                with stage("announce", model_version):
+                    announce_processing(tickets)
+
+            # 3. Preprocess data and make predictions for the whole batch
+            with stage("preprocess", model_version):
+                input_df = pd.DataFrame([{"subject": t["subject"], "description": t["description"]} for t in tickets])
+                processed_df = preprocess_data(input_df)
+
+            # Times its own 'vectorize' and 'predict_proba' stages
+            (category_preds, category_probs), (priority_preds, priority_probs) = predict_with_confidence(
+                [cat_model_info["model"], pri_model_info["model"]], processed_df['processed_text'],
+                model_versions=[cat_version, pri_version]
+            )
+
+            # 4. Execute HITL Logic for each ticket and observe Prometheus metrics
+            with stage("hitl", model_version):
+                results = []
+                status_counts = {'completed_auto': 0, 'pending_review': 0}
+                for i, ticket in enumerate(tickets):
+                    category_prob, priority_prob = float(category_probs[i]), float(priority_probs[i])
+                    avg_confidence = (category_prob + priority_prob) / 2
+                    MODEL_CONFIDENCE.labels(model_type='category').observe(category_prob)
+                    MODEL_CONFIDENCE.labels(model_type='priority').observe(priority_prob)
+
+                    if avg_confidence >= CONFIDENCE_THRESHOLD:
+                        status, final_status = 'COMPLETED', 'completed_auto'
+                    else:
+                        status, final_status = 'PENDING_REVIEW', 'pending_review'
+                    status_counts[final_status] += 1
+
+                    results.append({
+                        **ticket, "status": status,
+                        "category": str(category_preds[i]), "priority": str(priority_preds[i]),
+                        "cat_confidence": category_prob, "pri_confidence": priority_prob
+                    })
+
+            # 5. Write the finished rows in one statement and one commit
+            with stage("db_write", model_version):
+                db_session = next(get_db_session())
+                ticket_records = upsert_ticket_results(db_session, results, cat_model_id, pri_model_id)
+            print(f"   - {status_counts['completed_auto']} tickets COMPLETED, {status_counts['pending_review']} sent for HUMAN REVIEW.")
+
+            # 6. Increment final status counters and publish the returned rows
+            for final_status, count in status_counts.items():
+                if count:
+                    TICKETS_PROCESSED_TOTAL.labels(final_status=final_status).inc(count)
+            with stage("publish", model_version):
+                publish_ticket_records(ticket_records)
+
+            # Keep the per-ticket latency histogram meaningful by amortizing the batch time
+            per_ticket_latency = (time.perf_counter() - batch_start) / len(tickets)
+            for _ in tickets:
+                TICKET_PROCESSING_LATENCY.observe(per_ticket_latency)
+            BATCH_SIZE_OBSERVED.observe(len(tickets))
+
+        # 7. Acknowledge all messages in the Redis Stream at once
+        with stage("ack", model_version):
+            r.xack(STREAM_NAME, GROUP_NAME, *message_ids)
+        print(f"✅ Acknowledged {len(message_ids)} messages")
+
+    finally:
+        if db_session:
+            db_session.close()
+
+def create_consumer_group():
+    """Creates the Redis consumer group if it doesn't exist."""
     try:
         r.xgroup_create(STREAM_NAME, GROUP_NAME, id='0', mkstream=True)
         print(f"Consumer group '{GROUP_NAME}' created.")
     except redis.exceptions.ResponseError:
         print(f"Consumer group '{GROUP_NAME}' already exists.")
 
-    # The main processing loop
-    while True:
-        db_session = None
-        message_id = 'N/A'
-        ticket_id = None
+def request_stop(signum=None, frame=None):
+    """Signal handler asking the consume loop to stop after its in-flight batch."""
+    global _stop_requested
+    _stop_requested = True
+    print(f"🛑 {WORKER_NAME} received a stop signal. Draining the in-flight batch...")
+
+def consume_forever():
+    """The main processing loop. Returns once a stop was requested and the last batch is acknowledged."""
+    next_reclaim_at = 0.0
+    # Backoff for errors that can't be attributed to a dependency
+    error_backoff = Backoff(BREAKER_BASE_DELAY_SECONDS, BREAKER_MAX_DELAY_SECONDS)
+    while not _stop_requested:
+        # Don't consume messages that would only fail while a dependency is down
+        blocked = blocking_breakers()
+        if blocked:
+            # Sleep in short steps so a stop request is still noticed quickly
+            time.sleep(min(1.0, max(breaker.seconds_until_retry() for breaker in blocked)))
+            continue
+
+        messages = []
         try:
-            # Block until a new message is received from the Redis Stream
-            response = r.xreadgroup(GROUP_NAME, WORKER_NAME, {STREAM_NAME: '>'}, count=1, block=0)
-            if not response:
+            # Periodically retry entries abandoned by other consumers before reading new ones,
+            # but not during a breaker trial or right after a dependency failure
+            if time.monotonic() >= next_reclaim_at and dependencies_healthy():
+                messages = reclaim_pending()
+                if not messages:
+                    next_reclaim_at = time.monotonic() + RECLAIM_INTERVAL_SECONDS
+
+            # Wait for new messages from the Redis Stream
+            if not messages:
+                messages = read_batch()
+            redis_breaker.record_success()
+            if not messages:
                 continue
 
-            message_id = response[0][1][0][0]
-            data = response[0][1][0][1]
-            ticket_id, subject, description = data['ticket_id'], data['subject'], data['description']
-            
-            print(f"📨 Received ticket {ticket_id}. Processing...")
+            process_messages(messages)
+            postgres_breaker.record_success()
+            error_backoff.reset()
 
-            # Use a context manager to automatically track processing time
-            with TICKET_PROCESSING_LATENCY.time():
-                # 1. Load Champion Models (from cache or MLflow)
-                cat_model_info, pri_model_info = load_champion_models()
-                if not all([cat_model_info["model"], pri_model_info["model"]]):
-                    raise Exception("One or more champion models could not be loaded.")
-
-                # 2. Get DB Session and Model Records
-                db_session = next(get_db_session())
-                cat_model_id = get_or_create_model_record(db_session, cat_model_info["name"], cat_model_info["version"])
-                pri_model_id = get_or_create_model_record(db_session, pri_model_info["name"], pri_model_info["version"])
+        except Exception as e:
+            breaker = failed_dependency(e)
+            if breaker is not None:
+                print(f"🚨 {breaker.name} is unavailable while handling a batch of {len(messages)} messages: {e}")
+                breaker.record_failure()
+            else:
+                delay = error_backoff.next_delay()
+                print(f"🚨 An error occurred processing a batch of {len(messages)} messages: {e}. Retrying in {delay:.1f}s")
+                time.sleep(delay)
+    print(f"👋 {WORKER_NAME} stopped.")
 
-                # 3. Create initial ticket entry in DB and publish 'PROCESSING' status
-                create_ticket_entry(db_session, ticket_id, subject, description, cat_model_id, pri_model_id)
-                publish_ticket_update(ticket_id)
 
-                # 4. Preprocess data and make predictions
-                input_df = pd.DataFrame([{"subject": subject, "description": description}])
-                processed_df = preprocess_data(input_df)
-                
-                category_pred = cat_model_info["model"].predict(processed_df['processed_text'])[0]
-                category_prob = max(cat_model_info["model"].predict_proba(processed_df['processed_text'])[0])
-                
-                priority_pred = pri_model_info["model"].predict(processed_df['processed_text'])[0]
-                priority_prob = max(pri_model_info["model"].predict_proba(processed_df['processed_text'])[0])
-                
-                avg_confidence = (category_prob + priority_prob) / 2
-                print(f"   - Predictions: Cat='{category_pred}', Pri='{priority_pred}'. Confidence={avg_confidence:.2f}")
-
-                # 5. Observe Prometheus metrics for model performance
-                MODEL_CONFIDENCE.labels(model_type='category').observe(category_prob)
-                MODEL_CONFIDENCE.labels(model_type='priority').observe(priority_prob)
-
-                # 6. Execute HITL Logic and update DB
-                final_status = ''
-                if avg_confidence >= CONFIDENCE_THRESHOLD:
-                    update_ticket_to_completed(db_session, ticket_id, category_pred, priority_pred, category_prob, priority_prob)
-                    print(f"   - High confidence. Ticket {ticket_id} marked as COMPLETED.")
-                    final_status = 'completed_auto'
-                else:
-                    update_ticket_for_review(db_session, ticket_id, category_pred, priority_pred, category_prob, priority_prob)
-                    print(f"   - Low confidence. Ticket {ticket_id} sent for HUMAN REVIEW.")
-                    final_status = 'pending_review'
+# --- Main Application Execution ---
+if __name__ == "__main__":
+    print("🚀 ML Worker starting...")
+    print(f"   - Batch size: {BATCH_SIZE}, max wait: {BATCH_MAX_WAIT_MS}ms")
+    
+    # Start a server on port 8000 to expose Prometheus metrics
+    start_http_server(8000)
+    print("📈 Prometheus metrics server started on port 8000.")
 
-                # 7. Increment final status counter and publish final update
-                TICKETS_PROCESSED_TOTAL.labels(final_status=final_status).inc()
-                publish_ticket_update(ticket_id)
+    create_consumer_group()
 
-            # 8. Acknowledge the message in the Redis Stream
-            r.xack(STREAM_NAME, GROUP_NAME, message_id)
-            print(f"✅ Acknowledged message {message_id}")
+    # Load the champion models before consuming, then keep them fresh in the background
+    refresh_champion_models()
+    start_model_refresher()
 
-        except Exception as e:
-            print(f"🚨 An error occurred processing message {message_id}: {e}")
-            time.sleep(5) # Wait before retrying
-        
-        finally:
-            if db_session:
-                db_session.close()
\ No newline at end of file
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    install_profiling_hooks()
+    consume_forever()
@@ -2,16 +2,26 @@
 
 import os
 import json
+import uuid
+import base64
 import asyncio
 from datetime import datetime, timedelta
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
-from pydantic import BaseModel, UUID4
-from sqlalchemy import create_engine, text, func
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, Depends, Query
+from pydantic import BaseModel, Field, UUID4, ValidationError
+from sqlalchemy import text, func, select, tuple_
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
-import redis # <-- Import the standard sync redis client
-import redis.asyncio as redis_async # Use async redis client for the background task
+import redis.asyncio as redis_async # Async Redis client, so publishing never blocks the event loop
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from prometheus_client import Counter
 from prometheus_fastapi_instrumentator import Instrumentator
+from instrumentation.stages import stage, profiled, install_profiling_hooks
+from db.engine_factory import create_async_db_engine
+from db.database_setup import tickets
+from services.results_api.response_cache import ResponseCache
+from services.results_api.connection_manager import ConnectionManager
 
 # --- Configuration & Initialization ---
 load_dotenv()
@@ -19,6 +29,29 @@ app = FastAPI(title="Results API & Real-Time Hub")
 
 Instrumentator().instrument(app).expose(app)
 
+# cProfile records everything the event loop runs, so only a request that has the loop to itself
+# is profiled: one that starts while another is in flight isn't sampled, and a sample that
+# another request overlapped is discarded.
+_requests_in_flight = 0
+_requests_started = 0
+
+@app.middleware("http")
+async def profile_sampled_requests(request: Request, call_next):
+    """Runs a sampled fraction of requests under cProfile (see PROFILE_SAMPLE_RATE and SIGUSR1)."""
+    global _requests_in_flight, _requests_started
+    _requests_in_flight += 1
+    _requests_started += 1
+    started = _requests_started
+    try:
+        if _requests_in_flight > 1:
+            return await call_next(request)
+        with profiled(f"results_api{request.url.path.replace('/', '_')}") as sample:
+            response = await call_next(request)
+            sample.discard = _requests_started != started
+            return response
+    finally:
+        _requests_in_flight -= 1
+
 # --- CORS Middleware ---
 origins = ["http://localhost", "http://localhost:3000"]
 app.add_middleware(
@@ -27,6 +60,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # --- Database Connection ---
@@ -35,79 +69,316 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME")
 DB_HOST = os.getenv("DB_HOST", "postgres")
 DB_PORT = os.getenv("DB_PORT", "5432")
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
+# asyncpg driver: queries run on the event loop without tying up a thread per request,
+# so slow dashboard queries don't hold up the WebSocket fan-out
+DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+engine = create_async_db_engine(DATABASE_URL, "results_api")
 
-# Create a synchronous Redis client for our regular API endpoints
-redis_client = redis.Redis(host=os.getenv("REDIS_HOST", "redis"), port=6379, decode_responses=True)
+# --- Stats Reconciliation ---
+# ticket_stats is maintained by triggers on 'tickets'. A periodic full recount corrects any drift
+# (e.g. counters created after the tickets they should include). It runs on one replica at a time,
+# whichever holds the advisory lock, and never blocks writers.
+STATS_RECONCILE_INTERVAL_SECONDS = float(os.getenv("STATS_RECONCILE_INTERVAL_SECONDS", 3600))
+STATS_RECONCILE_LOCK_NAME = "ticket_stats_reconcile"
+# Throughput buckets older than this are pruned every THROUGHPUT_PRUNE_INTERVAL_SECONDS
+THROUGHPUT_RETENTION = timedelta(minutes=5)
+THROUGHPUT_PRUNE_INTERVAL_SECONDS = float(os.getenv("THROUGHPUT_PRUNE_INTERVAL_SECONDS", 60))
 
-# --- WebSocket Connection Manager ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+STATS_COUNTERS_CORRECTED = Counter(
+    'ticket_stats_counters_corrected_total',
+    'ticket_stats counters that reconciliation found out of date'
+)
+
+# --- Response Caches ---
+# Every open dashboard polls /stats and /tickets/recent. Responses are shared for a short TTL and
+# concurrent misses share one query; ticket updates from the worker or /review invalidate them.
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 2))
+stats_cache = ResponseCache("stats", RESPONSE_CACHE_TTL_SECONDS)
+recent_tickets_cache = ResponseCache("tickets_recent", RESPONSE_CACHE_TTL_SECONDS)
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+def invalidate_response_caches(*messages):
+    """
+    Invalidates the response caches once for a batch of ticket updates, unless they're all
+    Redis-only 'PROCESSING' announcements.
+    """
+    for message_data in messages:
+        try:
+            if json.loads(message_data).get("status") == "PROCESSING":
+                continue
+        except (ValueError, AttributeError):
+            pass
+        stats_cache.invalidate()
+        recent_tickets_cache.invalidate()
+        return
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+# --- Ticket Updates ---
+# Every update is appended to a capped stream and then published on the channel as
+# "<entry id> <json>" (by the worker and by /review), so the subscriber can resume from the last
+# entry id it relayed after being disconnected from Redis.
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
+TICKET_UPDATES_CHANNEL = "ticket_updates"
+TICKET_UPDATES_STREAM = "ticket_updates_log"
+TICKET_UPDATES_STREAM_MAXLEN = int(os.getenv("TICKET_UPDATES_STREAM_MAXLEN", 10000))
+# Updates already waiting on the channel are relayed together, up to this many at a time
+SUBSCRIBER_BATCH_SIZE = int(os.getenv("SUBSCRIBER_BATCH_SIZE", 500))
+# Entries read per XRANGE call while replaying
+SUBSCRIBER_REPLAY_PAGE_SIZE = int(os.getenv("SUBSCRIBER_REPLAY_PAGE_SIZE", 1000))
+# An idle subscriber PINGs at this interval; two intervals without any reply mean the connection is dead
+SUBSCRIBER_HEALTH_CHECK_SECONDS = float(os.getenv("SUBSCRIBER_HEALTH_CHECK_SECONDS", 15))
+SUBSCRIBER_RECONNECT_BASE_DELAY_SECONDS = float(os.getenv("SUBSCRIBER_RECONNECT_BASE_DELAY_SECONDS", 0.5))
+SUBSCRIBER_RECONNECT_MAX_DELAY_SECONDS = float(os.getenv("SUBSCRIBER_RECONNECT_MAX_DELAY_SECONDS", 30))
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+SUBSCRIBER_RECONNECTS = Counter(
+    'ticket_updates_subscriber_reconnects_total',
+    'Times the ticket updates subscriber lost its Redis connection and reconnected'
+)
+SUBSCRIBER_REPLAYED_UPDATES = Counter(
+    'ticket_updates_replayed_total',
+    'Ticket updates replayed from the stream after the subscriber reconnected'
+)
+
+# Redis client for publishing updates from the API endpoints
+redis_client = redis_async.Redis(host=REDIS_HOST, port=6379, decode_responses=True)
 
+# --- WebSocket Connection Manager ---
+# Batches updates and gives each client its own bounded send queue (see connection_manager.py)
 manager = ConnectionManager()
+# Upper bound on the ticket ids a single subscription can follow
+WS_MAX_SUBSCRIBED_TICKETS = int(os.getenv("WS_MAX_SUBSCRIBED_TICKETS", 1000))
 
 # --- Redis Subscriber Background Task ---
+def relay_ticket_updates(messages):
+    """Hands a batch of serialized ticket updates to the response caches and the WebSocket fan-out."""
+    invalidate_response_caches(*messages)
+    with stage("ws_broadcast"):
+        for message_data in messages:
+            manager.broadcast(message_data)
+
+def stream_id_key(entry_id):
+    """Makes stream entry ids ("<ms>-<seq>") comparable."""
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq)
+
+async def newest_update_id(r):
+    """Returns the id of the stream's newest entry, where a fresh subscriber starts from."""
+    newest = await r.xrevrange(TICKET_UPDATES_STREAM, count=1)
+    return newest[0][0] if newest else "0-0"
+
+async def read_missed_updates(r, last_id):
+    """Returns the updates appended to the stream after entry last_id, oldest first, as (entry id, payload) pairs."""
+    missed = []
+    while True:
+        entries = await r.xrange(TICKET_UPDATES_STREAM, min=f"({last_id}", count=SUBSCRIBER_REPLAY_PAGE_SIZE)
+        missed.extend((entry_id, fields.get("data")) for entry_id, fields in entries)
+        if len(entries) < SUBSCRIBER_REPLAY_PAGE_SIZE:
+            break
+        last_id = entries[-1][0]
+    if len(missed) >= TICKET_UPDATES_STREAM_MAXLEN:
+        print(f"⚠️ At least {TICKET_UPDATES_STREAM_MAXLEN} ticket updates were missed; older ones may have been trimmed.")
+    return missed
+
 async def redis_subscriber():
-    """Listens to Redis Pub/Sub and broadcasts messages to connected clients."""
-    r = await redis_async.from_url(f"redis://{os.getenv('REDIS_HOST', 'redis')}", encoding="utf-8", decode_responses=True)
-    async with r.pubsub() as pubsub:
-        await pubsub.subscribe("ticket_updates")
-        print("Subscribed to 'ticket_updates' channel.")
-        while True:
-            try:
-                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-                if message:
-                    await manager.broadcast(message['data'])
-            except asyncio.CancelledError:
-                print("Subscriber task cancelled.")
-                break
-            except Exception as e:
-                print(f"🚨 Redis subscriber error: {e}")
-                await asyncio.sleep(5)
+    """
+    Relays ticket updates from Redis Pub/Sub, relaying updates that arrive together as one batch.
+    Each message carries its stream entry id; if the connection drops (or stops answering the
+    health-check PINGs) it reconnects with exponential backoff and replays TICKET_UPDATES_STREAM
+    from the last id it relayed.
+    """
+    delay = SUBSCRIBER_RECONNECT_BASE_DELAY_SECONDS
+    last_id = None
+    while True:
+        # No client-side retries: redis-py would silently reconnect and resubscribe, skipping the replay
+        r = redis_async.Redis(host=REDIS_HOST, port=6379, decode_responses=True, socket_keepalive=True,
+                              health_check_interval=SUBSCRIBER_HEALTH_CHECK_SECONDS, retry=Retry(NoBackoff(), 0))
+        try:
+            async with r.pubsub(ignore_subscribe_messages=True) as pubsub:
+                # Subscribe before reading the stream, so no update can fall between the two
+                await pubsub.subscribe(TICKET_UPDATES_CHANNEL)
+                if last_id is None:
+                    last_id = await newest_update_id(r)
+                else:
+                    missed = await read_missed_updates(r, last_id)
+                    if missed:
+                        print(f"🔁 Replaying {len(missed)} ticket updates missed while disconnected.")
+                        SUBSCRIBER_REPLAYED_UPDATES.inc(len(missed))
+                        relay_ticket_updates([payload for _, payload in missed])
+                        last_id = missed[-1][0]
+                print(f"Subscribed to '{TICKET_UPDATES_CHANNEL}' channel.")
+                delay = SUBSCRIBER_RECONNECT_BASE_DELAY_SECONDS
+
+                # listen() would block with no timeout, so a half-open connection would never be noticed.
+                # Reading with a timeout lets redis-py send its health-check PING while the channel is idle;
+                # its reply wakes the read early, so a read that waits out the full timeout twice in a row
+                # got no reply at all.
+                silent_reads = 0
+                loop = asyncio.get_running_loop()
+                while True:
+                    started = loop.time()
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=SUBSCRIBER_HEALTH_CHECK_SECONDS)
+                    if message is None:
+                        if loop.time() - started < SUBSCRIBER_HEALTH_CHECK_SECONDS:
+                            silent_reads = 0
+                            continue
+                        silent_reads += 1
+                        if silent_reads >= 2:
+                            raise ConnectionError("Redis stopped answering health checks")
+                        continue
+                    silent_reads = 0
+                    batch = [message]
+                    # Drain whatever else is already waiting, without blocking
+                    while len(batch) < SUBSCRIBER_BATCH_SIZE:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0)
+                        if message is None:
+                            break
+                        batch.append(message)
+
+                    updates = []
+                    for message in batch:
+                        entry_id, _, payload = message['data'].partition(" ")
+                        # Already relayed by the replay
+                        if stream_id_key(entry_id) > stream_id_key(last_id):
+                            updates.append(payload)
+                            last_id = entry_id
+                    if updates:
+                        relay_ticket_updates(updates)
+        except asyncio.CancelledError:
+            print("Subscriber task cancelled.")
+            break
+        except Exception as e:
+            SUBSCRIBER_RECONNECTS.inc()
+            print(f"🚨 Redis subscriber error: {e} (reconnecting in {delay:.1f}s)")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, SUBSCRIBER_RECONNECT_MAX_DELAY_SECONDS)
+        finally:
+            await r.aclose()
+
+async def reconcile_ticket_stats():
+    """
+    Recounts 'tickets' and corrects every ticket_stats counter that differs. Returns the number
+    of corrected counters.
+
+    The recount and the counters are read from one REPEATABLE READ snapshot, in which the triggers
+    have kept them in step, so their difference is pure drift. It is then added to the counters in
+    a separate short transaction, which commutes with the deltas writers add meanwhile. No lock is
+    taken on 'tickets'.
+    """
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="REPEATABLE READ")
+        async with connection.begin():
+            await connection.execute(text("SET TRANSACTION READ ONLY"))
+            drift = (await connection.execute(text("""
+                WITH grouped AS (
+                    SELECT GROUPING(status, final_category) AS grouping_set, CAST(status AS text) AS status,
+                           final_category, COUNT(*) AS count
+                    FROM tickets GROUP BY GROUPING SETS ((), (status), (final_category))
+                ), actual AS (
+                    SELECT CASE grouping_set WHEN 3 THEN 'total' WHEN 1 THEN 'status' ELSE 'final_category' END AS dimension,
+                           CASE grouping_set WHEN 3 THEN '' WHEN 1 THEN status ELSE final_category END AS value,
+                           count
+                    FROM grouped WHERE grouping_set <> 2 OR final_category IS NOT NULL
+                )
+                SELECT COALESCE(actual.dimension, current.dimension) AS dimension,
+                       COALESCE(actual.value, current.value) AS value,
+                       COALESCE(actual.count, 0) - COALESCE(current.count, 0) AS drift
+                FROM actual FULL OUTER JOIN ticket_stats AS current
+                    ON actual.dimension = current.dimension AND actual.value = current.value
+                WHERE COALESCE(actual.count, 0) <> COALESCE(current.count, 0)
+                ORDER BY 1, 2
+            """))).fetchall()
+
+    if drift:
+        # Key order, like the triggers, so concurrent upserts can't deadlock
+        async with engine.begin() as connection:
+            await connection.execute(text("""
+                INSERT INTO ticket_stats AS stats (dimension, value, count)
+                VALUES (:dimension, :value, :drift)
+                ON CONFLICT (dimension, value) DO UPDATE SET count = stats.count + EXCLUDED.count
+            """), [row._asdict() for row in drift])
+    STATS_COUNTERS_CORRECTED.inc(len(drift))
+    return len(drift)
+
+async def stats_reconciler():
+    """
+    Reconciles ticket_stats every STATS_RECONCILE_INTERVAL_SECONDS on the replica holding the
+    session-level advisory lock. The others retry for the lock each interval, so one takes over
+    if the leader goes away. A new leader reconciles as soon as it takes the lock, so the
+    counters are right from startup rather than one interval later.
+    """
+    while STATS_RECONCILE_INTERVAL_SECONDS > 0:
+        try:
+            async with engine.connect() as lock_connection:
+                leader = (await lock_connection.execute(
+                    text("SELECT pg_try_advisory_lock(hashtext(:name))"), {"name": STATS_RECONCILE_LOCK_NAME}
+                )).scalar()
+                await lock_connection.commit()
+                while leader:
+                    corrected = await reconcile_ticket_stats()
+                    if corrected:
+                        print(f"🧮 Stats reconciliation corrected {corrected} counters.")
+                    await asyncio.sleep(STATS_RECONCILE_INTERVAL_SECONDS)
+                    # Fails (and releases leadership) if the lock's connection was lost
+                    await lock_connection.execute(text("SELECT 1"))
+                    await lock_connection.commit()
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print(f"🚨 Stats reconciliation failed: {e}")
+        await asyncio.sleep(STATS_RECONCILE_INTERVAL_SECONDS)
+
+async def throughput_pruner():
+    """Deletes throughput buckets older than THROUGHPUT_RETENTION every THROUGHPUT_PRUNE_INTERVAL_SECONDS."""
+    while True:
+        try:
+            async with engine.begin() as connection:
+                await connection.execute(
+                    text("DELETE FROM ticket_throughput WHERE bucket < :cutoff"),
+                    {"cutoff": datetime.utcnow() - THROUGHPUT_RETENTION}
+                )
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            print(f"🚨 Pruning throughput buckets failed: {e}")
+        await asyncio.sleep(THROUGHPUT_PRUNE_INTERVAL_SECONDS)
 
 @app.on_event("startup")
 async def startup_event():
-    # Start the Redis subscriber as a background task
+    install_profiling_hooks()
+    manager.start()
+    # Start the Redis subscriber, the stats reconciler and the throughput pruner as background tasks
     asyncio.create_task(redis_subscriber())
+    asyncio.create_task(stats_reconciler())
+    asyncio.create_task(throughput_pruner())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await engine.dispose()
+    await redis_client.aclose()
 
 # --- NEW HELPER FUNCTION TO PUBLISH UPDATES ---
-def publish_ticket_update(ticket_id):
-    """Fetches full ticket data and publishes it to the Redis channel."""
+async def publish_ticket_update(ticket_record):
+    """Publishes a ticket row (as returned by UPDATE ... RETURNING *) to the Redis channel."""
+    ticket_dict = dict(ticket_record._mapping)
     try:
-        with engine.connect() as connection:
-            stmt = text("SELECT * FROM tickets WHERE ticket_id = :ticket_id")
-            ticket_record = connection.execute(stmt, {"ticket_id": str(ticket_id)}).first()
-
-            if ticket_record:
-                ticket_dict = dict(ticket_record._mapping)
-                for key, value in ticket_dict.items():
-                    if hasattr(value, 'isoformat'):
-                        ticket_dict[key] = value.isoformat()
-                    elif hasattr(value, 'hex'):
-                        ticket_dict[key] = str(value)
-                
-                redis_client.publish("ticket_updates", json.dumps(ticket_dict))
-                print(f"📢 Published manual review update for ticket {ticket_id}")
+        for key, value in ticket_dict.items():
+            if hasattr(value, 'isoformat'):
+                ticket_dict[key] = value.isoformat()
+            elif hasattr(value, 'hex'):
+                ticket_dict[key] = str(value)
+
+        payload = json.dumps(ticket_dict)
+        entry_id = await redis_client.xadd(TICKET_UPDATES_STREAM, {"data": payload},
+                                           maxlen=TICKET_UPDATES_STREAM_MAXLEN, approximate=True)
+        await redis_client.publish(TICKET_UPDATES_CHANNEL, f"{entry_id} {payload}")
+        print(f"📢 Published manual review update for ticket {ticket_dict['ticket_id']}")
     except Exception as e:
-        print(f"🚨 ERROR publishing review update for {ticket_id}: {e}")
+        print(f"🚨 ERROR publishing review update for {ticket_dict.get('ticket_id')}: {e}")
 
 # --- Pydantic Models ---
+TicketStatus = Literal["PROCESSING", "PENDING_REVIEW", "COMPLETED"]
+
 class TicketResult(BaseModel):
     ticket_id: UUID4
-    status: str
+    status: str | None = None
     subject: str | None = None
     description: str | None = None
     predicted_category: str | None = None
@@ -122,42 +393,153 @@ class ReviewLabel(BaseModel):
     final_category: str
     final_priority: str
 
+class TicketSubscription(BaseModel):
+    """
+    Sent by a WebSocket client to choose which updates it receives. A ticket must match every
+    given field (category and priority match the final label, or the prediction before review).
+    'delta' mode sends a ticket in full the first time it reaches the client, then only the fields
+    that changed since the client was last sent it.
+    """
+    status: list[TicketStatus] | None = Field(None, min_length=1)
+    category: list[str] | None = Field(None, min_length=1, max_length=100)
+    priority: list[str] | None = Field(None, min_length=1, max_length=100)
+    ticket_ids: list[uuid.UUID] | None = Field(None, min_length=1, max_length=WS_MAX_SUBSCRIBED_TICKETS)
+    mode: Literal["full", "delta"] = "full"
+
+# --- Ticket Listing (keyset pagination) ---
+# Pages are ordered by (created_at, ticket_id), so each page is an index range scan that starts
+# where the previous one ended, however deep the caller pages. The cursor for the next page is
+# returned in the X-Next-Cursor header, keeping the response body a plain list.
+TICKET_PAGE_SIZE = int(os.getenv("TICKET_PAGE_SIZE", 100))
+TICKET_PAGE_SIZE_MAX = int(os.getenv("TICKET_PAGE_SIZE_MAX", 500))
+TICKET_FIELDS = tuple(TicketResult.model_fields)
+# Always selected, since the next cursor is built from them
+CURSOR_FIELDS = ("created_at", "ticket_id")
+
+def encode_cursor(row):
+    key = json.dumps([row.created_at.isoformat(), str(row.ticket_id)])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        created_at, ticket_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), uuid.UUID(ticket_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def ticket_list_params(
+    cursor: str | None = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: int = Query(TICKET_PAGE_SIZE, ge=1, le=TICKET_PAGE_SIZE_MAX),
+    predicted_category: str | None = None,
+    final_category: str | None = None,
+    predicted_priority: str | None = None,
+    final_priority: str | None = None,
+    min_confidence: float | None = Query(None, ge=0, le=1, description="Lower bound on the lower of the two prediction confidences"),
+    max_confidence: float | None = Query(None, ge=0, le=1, description="Upper bound on the lower of the two prediction confidences"),
+    fields: str | None = Query(None, description="Comma-separated TicketResult fields to return (default: all)")
+):
+    """Query parameters shared by the ticket listing endpoints."""
+    if fields:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = set(selected) - set(TICKET_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        fields = tuple(dict.fromkeys(list(CURSOR_FIELDS) + selected))
+    else:
+        fields = TICKET_FIELDS
+    return {
+        "cursor": decode_cursor(cursor) if cursor else None, "limit": limit, "fields": fields,
+        "filters": {
+            "predicted_category": predicted_category, "final_category": final_category,
+            "predicted_priority": predicted_priority, "final_priority": final_priority
+        },
+        "min_confidence": min_confidence, "max_confidence": max_confidence
+    }
+
+def build_ticket_page_query(params, newest_first, status=None):
+    """Builds the SELECT for one page: projected columns, filters, keyset condition and limit + 1."""
+    stmt = select(*[tickets.c[name] for name in params["fields"]])
+    if status:
+        stmt = stmt.where(tickets.c.status == status)
+    for column, value in params["filters"].items():
+        if value is not None:
+            stmt = stmt.where(tickets.c[column] == value)
+    confidence = func.least(tickets.c.prediction_confidence_category, tickets.c.prediction_confidence_priority)
+    if params["min_confidence"] is not None:
+        stmt = stmt.where(confidence >= params["min_confidence"])
+    if params["max_confidence"] is not None:
+        stmt = stmt.where(confidence <= params["max_confidence"])
+
+    key = (tickets.c.created_at, tickets.c.ticket_id)
+    if params["cursor"]:
+        after_cursor = tuple_(*key) < tuple_(*params["cursor"]) if newest_first else tuple_(*key) > tuple_(*params["cursor"])
+        stmt = stmt.where(after_cursor)
+    order = [column.desc() for column in key] if newest_first else list(key)
+    # One extra row tells whether there is a next page
+    return stmt.order_by(*order).limit(params["limit"] + 1)
+
+async def fetch_ticket_page(stmt, limit, stage_name):
+    """Runs a page query and returns (tickets, next cursor or None)."""
+    with stage(stage_name):
+        async with engine.connect() as connection:
+            rows = (await connection.execute(stmt)).fetchall()
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+    return [TicketResult(**row._asdict()) for row in page], next_cursor
+
+def cache_key(params, **extra):
+    """A hashable key for a listing request's parameters."""
+    return tuple(sorted({**params["filters"], **extra, "limit": params["limit"], "fields": params["fields"],
+                         "min_confidence": params["min_confidence"], "max_confidence": params["max_confidence"]}.items()))
+
 # --- API Endpoints ---
 
-@app.get("/tickets/recent", response_model=list[TicketResult])
-def get_recent_tickets():
-    """Fetches the 100 most recently created tickets."""
-    with engine.connect() as connection:
-        stmt = text("SELECT * FROM tickets ORDER BY created_at DESC LIMIT 100")
-        results = connection.execute(stmt).fetchall()
-        return [TicketResult(**row._asdict()) for row in results]
+@app.get("/tickets/recent", response_model=list[TicketResult], response_model_exclude_unset=True)
+async def get_recent_tickets(
+    response: Response,
+    status: TicketStatus | None = None,
+    params: dict = Depends(ticket_list_params)
+):
+    """Fetches the most recently created tickets, newest first, one page at a time."""
+    stmt = build_ticket_page_query(params, newest_first=True, status=status)
+    load_page = lambda: fetch_ticket_page(stmt, params["limit"], "recent_tickets_query")
+    # Only first pages are cached: those are what the dashboards poll
+    if params["cursor"]:
+        page, next_cursor = await load_page()
+    else:
+        page, next_cursor = await recent_tickets_cache.get_or_load(cache_key(params, status=status), load_page)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
 
 @app.get("/stats")
-def get_stats():
-    """Calculates and returns live statistics about the system."""
-    with engine.connect() as connection:
-        total_tickets = connection.execute(text("SELECT COUNT(*) FROM tickets")).scalar_one()
-        
-        status_counts_res = connection.execute(
-            text("SELECT status, COUNT(*) as count FROM tickets GROUP BY status")
-        ).fetchall()
-        status_counts = {row.status: row.count for row in status_counts_res}
-
-        one_minute_ago = datetime.utcnow() - timedelta(minutes=1)
-        throughput = connection.execute(
-            text("SELECT COUNT(*) FROM tickets WHERE created_at >= :time"),
-            {"time": one_minute_ago}
-        ).scalar_one()
-
-        category_counts_res = connection.execute(
-            text("SELECT final_category, COUNT(*) as count FROM tickets WHERE final_category IS NOT NULL GROUP BY final_category")
-        ).fetchall()
-        category_counts = {row.final_category: row.count for row in category_counts_res}
+async def get_stats():
+    """Returns live statistics about the system from the incrementally maintained counters."""
+    return await stats_cache.get_or_load("stats", _load_stats)
+
+async def _load_stats():
+    with stage("stats_query"):
+        async with engine.connect() as connection:
+            counters = (await connection.execute(text("SELECT dimension, value, count FROM ticket_stats"))).fetchall()
+
+            one_minute_ago = datetime.utcnow() - timedelta(minutes=1)
+            throughput = (await connection.execute(
+                text("SELECT COALESCE(SUM(count), 0) FROM ticket_throughput WHERE bucket >= :time"),
+                {"time": one_minute_ago}
+            )).scalar_one()
+
+        counts = {"total": {}, "status": {}, "final_category": {}}
+        for row in counters:
+            if row.count:
+                counts[row.dimension][row.value] = row.count
+        total_tickets = counts["total"].get("", 0)
+        status_counts = counts["status"]
+        category_counts = counts["final_category"]
 
         return {
             "total_tickets": total_tickets,
+            # No "processing": the worker only writes finished rows, and announces PROCESSING over Redis alone
             "status_breakdown": {
-                "processing": status_counts.get("PROCESSING", 0),
                 "completed": status_counts.get("COMPLETED", 0),
                 "pending_review": status_counts.get("PENDING_REVIEW", 0)
             },
@@ -167,57 +549,76 @@ def get_stats():
 
 # --- Keep existing endpoints for review queue and ticket details ---
 @app.get("/tickets/{ticket_id}", response_model=TicketResult)
-def get_ticket_result(ticket_id: UUID4):
-    with engine.connect() as connection:
-        stmt = text("SELECT * FROM tickets WHERE ticket_id = :ticket_id")
-        result = connection.execute(stmt, {"ticket_id": str(ticket_id)}).first()
+async def get_ticket_result(ticket_id: UUID4):
+    with stage("ticket_lookup"):
+        async with engine.connect() as connection:
+            stmt = text("SELECT * FROM tickets WHERE ticket_id = :ticket_id")
+            result = (await connection.execute(stmt, {"ticket_id": ticket_id})).first()
         if not result:
             raise HTTPException(status_code=404, detail="Ticket not found")
         return TicketResult(**result._asdict())
 
-@app.get("/review-queue", response_model=list[TicketResult])
-def get_review_queue():
-    with engine.connect() as connection:
-        stmt = text("SELECT * FROM tickets WHERE status = 'PENDING_REVIEW' ORDER BY created_at ASC")
-        results = connection.execute(stmt).fetchall()
-        return [TicketResult(**row._asdict()) for row in results]
+@app.get("/review-queue", response_model=list[TicketResult], response_model_exclude_unset=True)
+async def get_review_queue(response: Response, params: dict = Depends(ticket_list_params)):
+    """Fetches tickets awaiting human review, oldest first, one page at a time."""
+    stmt = build_ticket_page_query(params, newest_first=False, status="PENDING_REVIEW")
+    page, next_cursor = await fetch_ticket_page(stmt, params["limit"], "review_queue_query")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
 
 # --- MODIFIED /review/{ticket_id} ENDPOINT ---
 @app.post("/review/{ticket_id}")
-def submit_review(ticket_id: UUID4, labels: ReviewLabel):
-    with engine.connect() as connection:
-        stmt = text("""
-            UPDATE tickets
-            SET status = 'COMPLETED', final_category = :final_category, final_priority = :final_priority, reviewed_at = :reviewed_at
-            WHERE ticket_id = :ticket_id AND status = 'PENDING_REVIEW'
-            RETURNING ticket_id;
-        """)
-        result = connection.execute(stmt, {
-            "ticket_id": str(ticket_id), "final_category": labels.final_category,
-            "final_priority": labels.final_priority, "reviewed_at": datetime.utcnow()
-        }).first()
-        connection.commit()
+async def submit_review(ticket_id: UUID4, labels: ReviewLabel):
+    with stage("review_update"):
+        async with engine.begin() as connection:
+            stmt = text("""
+                UPDATE tickets
+                SET status = 'COMPLETED', final_category = :final_category, final_priority = :final_priority, reviewed_at = :reviewed_at
+                WHERE ticket_id = :ticket_id AND status = 'PENDING_REVIEW'
+                RETURNING *;
+            """)
+            result = (await connection.execute(stmt, {
+                "ticket_id": ticket_id, "final_category": labels.final_category,
+                "final_priority": labels.final_priority, "reviewed_at": datetime.utcnow()
+            })).first()
 
         if not result:
             raise HTTPException(status_code=404, detail="Ticket not found or already reviewed")
         
         print(f"✅ Review for ticket {ticket_id} submitted successfully to DB.") # <-- ADDED LOG
-        
-        # NOW, PUBLISH THE UPDATE FOR A REAL-TIME RESPONSE
-        publish_ticket_update(ticket_id)
 
-        return {"message": "Review submitted successfully", "ticket_id": ticket_id}
+    # NOW, PUBLISH THE UPDATE FOR A REAL-TIME RESPONSE
+    with stage("review_publish"):
+        # The UPDATE already returned the full row, so no second round trip is needed
+        await publish_ticket_update(result)
+
+    return {"message": "Review submitted successfully", "ticket_id": ticket_id}
 
 # --- NEW: WebSocket Endpoint ---
 @app.websocket("/ws/ticket-updates")
 async def websocket_endpoint(websocket: WebSocket):
+    """
+    Streams ticket updates. Every update is sent in full until the client sends a
+    TicketSubscription as JSON; each one it sends replaces the previous subscription.
+    """
     await manager.connect(websocket)
     print(f"New client connected. Total clients: {len(manager.active_connections)}")
     try:
         while True:
-            # We keep the connection alive by waiting for a message, but don't need to do anything with it.
-            # The broadcast will happen from the Redis subscriber task.
-            await websocket.receive_text()
+            # The broadcast happens from the Redis subscriber task; clients only send subscriptions
+            message = await websocket.receive_text()
+            try:
+                subscription = TicketSubscription.model_validate_json(message)
+            except ValidationError:
+                manager.disconnect(websocket)
+                await websocket.close(code=1008, reason="Invalid subscription")
+                return
+            criteria = subscription.model_dump(exclude={"mode"})
+            if subscription.ticket_ids:
+                criteria["ticket_ids"] = [str(ticket_id) for ticket_id in subscription.ticket_ids]
+            manager.subscribe(websocket, criteria, subscription.mode)
     except WebSocketDisconnect:
+        # Also reached when the manager closed a slow or dead client itself
         manager.disconnect(websocket)
-        print(f"Client disconnected. Total clients: {len(manager.active_connections)}")
\ No newline at end of file
+        print(f"Client disconnected. Total clients: {len(manager.active_connections)}")
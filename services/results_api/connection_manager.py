@@ -0,0 +1,305 @@
+# services/results_api/connection_manager.py
+
+import os
+import json
+import time
+import asyncio
+from collections import OrderedDict, defaultdict
+from fastapi import WebSocket
+from prometheus_client import Counter, Gauge, Histogram
+
+# --- Configuration ---
+# Updates arriving within this window are sent to every client as one frame (a JSON array)
+WS_BATCH_WINDOW_MS = float(os.getenv("WS_BATCH_WINDOW_MS", 50))
+WS_MAX_BATCH_MESSAGES = int(os.getenv("WS_MAX_BATCH_MESSAGES", 500))
+# Frames a client may fall behind by before the slow-consumer policy applies
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 100))
+# 'drop_oldest' discards the client's oldest queued frame; 'disconnect' closes the client
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+# A send that doesn't complete in time means a dead or stalled socket: the client is disconnected
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", 10))
+# Close code for clients disconnected for being too slow ("Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+# Tickets whose last sent state is kept per delta client to compute its payloads
+WS_DELTA_STATE_SIZE = int(os.getenv("WS_DELTA_STATE_SIZE", 10000))
+
+# Fields a subscription can filter on
+SUBSCRIPTION_DIMENSIONS = ("status", "category", "priority", "ticket_ids")
+# Set at ingestion and never changed, so only a ticket's first delta payload includes them
+IMMUTABLE_FIELDS = ("subject", "description")
+
+# --- Prometheus Metrics Definition ---
+WS_CONNECTED_CLIENTS = Gauge('websocket_connected_clients', 'Connected WebSocket clients')
+WS_FANOUT_LATENCY = Histogram(
+    'websocket_fanout_latency_seconds',
+    'Time from an update reaching the fan-out until its frame was sent to a client',
+    buckets=(.005, .01, .025, .05, .075, .1, .25, .5, 1, 2.5, 5, 10)
+)
+WS_SEND_QUEUE_DEPTH = Histogram(
+    'websocket_send_queue_depth',
+    "Frames waiting in a client's send queue, observed when a frame is queued",
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+WS_FRAME_BATCH_SIZE = Histogram(
+    'websocket_frame_batch_size',
+    'Updates coalesced into one WebSocket frame',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+WS_SUBSCRIPTIONS = Gauge('websocket_subscriptions', 'Distinct subscriptions (filter and payload mode) with connected clients')
+WS_FRAME_BYTES = Counter(
+    'websocket_frame_bytes_total',
+    'Bytes of WebSocket frames sent to clients, by payload mode',
+    ['mode']  # Labels: 'full', 'delta'
+)
+WS_SLOW_CONSUMER_EVENTS = Counter(
+    'websocket_slow_consumer_events_total',
+    'Frames dropped for, or clients disconnected for, falling behind',
+    ['action']  # Labels: 'dropped', 'disconnected'
+)
+
+
+def dimension_value(update, dimension):
+    """The value of a ticket update a subscription dimension is matched against."""
+    if dimension == "category":
+        return update.get("final_category") or update.get("predicted_category")
+    if dimension == "priority":
+        return update.get("final_priority") or update.get("predicted_priority")
+    if dimension == "ticket_ids":
+        return update.get("ticket_id")
+    return update.get(dimension)
+
+
+def frame_text(messages):
+    """A single update goes out as-is; a batch is a JSON array of the updates."""
+    return messages[0] if len(messages) == 1 else "[" + ",".join(messages) + "]"
+
+
+class Frame:
+    """
+    A batch of updates for one subscription. In 'full' mode the messages are the serialized
+    updates and the text is built once, shared by every recipient. In 'delta' mode they're the
+    parsed updates, and each client's writer builds its own text against what it has sent.
+    """
+
+    def __init__(self, messages, received_at, mode="full"):
+        self.messages = messages
+        self.received_at = received_at  # when the oldest update reached the fan-out
+        self.mode = mode
+        self.text = frame_text(messages) if mode == "full" else None
+
+
+class Subscription:
+    """
+    A distinct filter and payload mode, shared by every client that subscribed with it.
+    criteria maps each dimension to the accepted values, or None to accept any value.
+    """
+
+    def __init__(self, key, criteria, mode):
+        self.key = key
+        self.criteria = criteria
+        self.mode = mode
+        self.clients = set()
+        self.constrained_dimensions = sum(values is not None for values in criteria.values())
+
+
+class ClientConnection:
+    """One WebSocket client: a bounded queue of frames drained by its own writer task."""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.writer_task = None
+        self.subscription = None
+        # Delta mode: ticket_id -> last state sent to this client (without immutable fields), oldest first
+        self.sent_states = OrderedDict()
+
+    def delta(self, update):
+        """
+        The fields of an update that changed since this client was last sent the ticket, always
+        with ticket_id and status. The first time the ticket reaches the client, every non-null
+        field. Records the update as the state the client now has.
+        """
+        ticket_id = update.get("ticket_id")
+        previous = self.sent_states.pop(ticket_id, None)
+        self.sent_states[ticket_id] = {key: value for key, value in update.items() if key not in IMMUTABLE_FIELDS}
+        while len(self.sent_states) > WS_DELTA_STATE_SIZE:
+            self.sent_states.popitem(last=False)
+
+        if previous is None:
+            return {key: value for key, value in update.items() if value is not None}
+        changed = {key: value for key, value in self.sent_states[ticket_id].items() if previous.get(key) != value}
+        return {"ticket_id": ticket_id, "status": update.get("status"), **changed}
+
+
+class ConnectionManager:
+    """
+    Fans updates out to WebSocket clients without letting one client hold up the others.
+    broadcast() only appends to a pending batch. Each batch window, a flush task matches the
+    updates against the subscription index, builds one Frame per subscription and queues it for
+    that subscription's clients. Each client's writer task sends from its own queue, so a slow
+    or dead socket only ever delays itself.
+    """
+
+    def __init__(self):
+        self.active_connections: dict[WebSocket, ClientConnection] = {}
+        self._pending = []
+        self._pending_since = None
+        self._pending_event = asyncio.Event()
+        self._flush_task = None
+        # (mode, criteria) -> Subscription
+        self._subscriptions = {}
+        # Inverted index: dimension -> value -> subscriptions accepting it. Subscriptions with no
+        # criteria at all match everything and are kept apart.
+        self._index = {dimension: defaultdict(set) for dimension in SUBSCRIPTION_DIMENSIONS}
+        self._unfiltered = set()
+
+    def start(self):
+        """Starts the flush task (call from the running event loop)."""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        client = ClientConnection(websocket)
+        client.writer_task = asyncio.create_task(self._writer(client))
+        self.active_connections[websocket] = client
+        # Until it sends a filter, a client receives every update in full
+        self._join(client, {dimension: None for dimension in SUBSCRIPTION_DIMENSIONS}, "full")
+        WS_CONNECTED_CLIENTS.set(len(self.active_connections))
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.active_connections.pop(websocket, None)
+        if client:
+            # A writer closing its own client must not cancel itself before the close is sent
+            if client.writer_task is not asyncio.current_task():
+                client.writer_task.cancel()
+            self._leave(client)
+            WS_CONNECTED_CLIENTS.set(len(self.active_connections))
+
+    def subscribe(self, websocket: WebSocket, criteria: dict, mode: str = "full"):
+        """
+        Replaces a client's subscription. criteria maps dimensions to lists of accepted values
+        (missing or None accepts any value); a ticket must match every constrained dimension.
+        """
+        client = self.active_connections.get(websocket)
+        if client:
+            # Deltas are relative to what was sent in delta mode; start over from full states
+            client.sent_states.clear()
+            self._leave(client)
+            self._join(client, {
+                dimension: frozenset(criteria[dimension]) if criteria.get(dimension) is not None else None
+                for dimension in SUBSCRIPTION_DIMENSIONS
+            }, mode)
+
+    def _join(self, client, criteria, mode):
+        key = (mode, tuple(criteria[dimension] for dimension in SUBSCRIPTION_DIMENSIONS))
+        subscription = self._subscriptions.get(key)
+        if subscription is None:
+            subscription = self._subscriptions[key] = Subscription(key, criteria, mode)
+            if subscription.constrained_dimensions == 0:
+                self._unfiltered.add(subscription)
+            for dimension, values in criteria.items():
+                for value in values or ():
+                    self._index[dimension][value].add(subscription)
+            WS_SUBSCRIPTIONS.set(len(self._subscriptions))
+        subscription.clients.add(client)
+        client.subscription = subscription
+
+    def _leave(self, client):
+        subscription = client.subscription
+        client.subscription = None
+        if subscription is None:
+            return
+        subscription.clients.discard(client)
+        if subscription.clients:
+            return
+        del self._subscriptions[subscription.key]
+        self._unfiltered.discard(subscription)
+        for dimension, values in subscription.criteria.items():
+            for value in values or ():
+                postings = self._index[dimension][value]
+                postings.discard(subscription)
+                if not postings:
+                    del self._index[dimension][value]
+        WS_SUBSCRIPTIONS.set(len(self._subscriptions))
+
+    def matching_subscriptions(self, update):
+        """
+        The subscriptions an update matches. Only the index entries for the update's own values
+        are visited, so the cost doesn't grow with the number of clients or filters.
+        """
+        hits = defaultdict(int)
+        for dimension in SUBSCRIPTION_DIMENSIONS:
+            for subscription in self._index[dimension].get(dimension_value(update, dimension), ()):
+                hits[subscription] += 1
+        matched = [subscription for subscription, count in hits.items() if count == subscription.constrained_dimensions]
+        return matched + list(self._unfiltered)
+
+    def broadcast(self, message: str):
+        """Queues a serialized update for every subscribed client. Never blocks."""
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append(message)
+        self._pending_event.set()
+
+    async def _flush_loop(self):
+        while True:
+            await self._pending_event.wait()
+            # Let concurrent updates accumulate into the same frames
+            if WS_BATCH_WINDOW_MS > 0:
+                await asyncio.sleep(WS_BATCH_WINDOW_MS / 1000)
+            self._pending_event.clear()
+            messages, self._pending = self._pending, []
+            try:
+                self._flush(messages, self._pending_since)
+            except Exception as e:
+                print(f"🚨 WebSocket fan-out failed for {len(messages)} updates: {e!r}")
+
+    def _flush(self, messages, received_at):
+        payloads = defaultdict(list)  # Subscription -> updates, in arrival order
+        for message in messages:
+            update = json.loads(message)
+            for subscription in self.matching_subscriptions(update):
+                payloads[subscription].append(update if subscription.mode == "delta" else message)
+
+        for subscription, updates in payloads.items():
+            for start in range(0, len(updates), WS_MAX_BATCH_MESSAGES):
+                frame = Frame(updates[start:start + WS_MAX_BATCH_MESSAGES], received_at, subscription.mode)
+                self._enqueue(frame, subscription.clients)
+
+    def _enqueue(self, frame, clients):
+        WS_FRAME_BATCH_SIZE.observe(len(frame.messages))
+        for client in list(clients):
+            if client.queue.full():
+                if WS_SLOW_CONSUMER_POLICY == "disconnect":
+                    WS_SLOW_CONSUMER_EVENTS.labels(action="disconnected").inc()
+                    self.disconnect(client.websocket)
+                    asyncio.create_task(self._close(client, SLOW_CONSUMER_CLOSE_CODE))
+                    continue
+                client.queue.get_nowait()
+                WS_SLOW_CONSUMER_EVENTS.labels(action="dropped").inc()
+            WS_SEND_QUEUE_DEPTH.observe(client.queue.qsize())
+            client.queue.put_nowait(frame)
+
+    async def _writer(self, client):
+        """Sends a client's queued frames in order until it disconnects or a send fails."""
+        try:
+            while True:
+                frame = await client.queue.get()
+                # Computed at send time, so frames the client never got (filtered out or dropped) don't move its baseline
+                text = frame.text or frame_text([json.dumps(client.delta(update)) for update in frame.messages])
+                await asyncio.wait_for(client.websocket.send_text(text), WS_SEND_TIMEOUT_SECONDS)
+                WS_FANOUT_LATENCY.observe(time.monotonic() - frame.received_at)
+                WS_FRAME_BYTES.labels(mode=frame.mode).inc(len(text))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Dropping WebSocket client after a failed send: {e!r}")
+            await self._close(client)
+
+    async def _close(self, client, code=1011):
+        self.disconnect(client.websocket)
+        try:
+            await client.websocket.close(code=code)
+        except Exception:
+            pass  # Already closed by the client
@@ -0,0 +1,72 @@
+# services/results_api/response_cache.py
+
+import time
+import asyncio
+from prometheus_client import Counter
+
+# --- Prometheus Metrics Definition ---
+RESPONSE_CACHE_REQUESTS = Counter(
+    'response_cache_requests_total',
+    'Response cache lookups by result (hit, miss, or coalesced into an in-flight load)',
+    ['cache', 'result']
+)
+RESPONSE_CACHE_INVALIDATIONS = Counter(
+    'response_cache_invalidations_total',
+    'Times a response cache was invalidated by a ticket update',
+    ['cache']
+)
+
+
+class ResponseCache:
+    """
+    In-process cache for endpoint responses with a short TTL and single-flight loading:
+    concurrent misses for the same key share one load instead of each querying the database.
+    invalidate() drops every entry and detaches in-flight loads, so a request arriving after
+    an invalidation never receives data read before it. At most max_entries are kept, dropping
+    the oldest first, since keys can carry caller-supplied query parameters.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int = 256):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}  # key -> (expires_at, value)
+        self._in_flight = {}  # key -> asyncio.Task
+        self._generation = 0
+
+    async def get_or_load(self, key, loader):
+        """Returns the cached value for `key`, or awaits `loader()` (shared with concurrent callers)."""
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            RESPONSE_CACHE_REQUESTS.labels(cache=self.name, result="hit").inc()
+            return entry[1]
+
+        task = self._in_flight.get(key)
+        if task:
+            RESPONSE_CACHE_REQUESTS.labels(cache=self.name, result="coalesced").inc()
+        else:
+            RESPONSE_CACHE_REQUESTS.labels(cache=self.name, result="miss").inc()
+            task = asyncio.ensure_future(self._load(key, loader, self._generation))
+            self._in_flight[key] = task
+        # Shielded so a caller that disconnects doesn't cancel the load for everyone else
+        return await asyncio.shield(task)
+
+    async def _load(self, key, loader, generation):
+        try:
+            value = await loader()
+            # Only cache the result if no invalidation happened while it was loading
+            if generation == self._generation:
+                self._entries.pop(key, None)
+                self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+                while len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+            return value
+        finally:
+            if generation == self._generation:
+                self._in_flight.pop(key, None)
+
+    def invalidate(self):
+        self._generation += 1
+        self._entries.clear()
+        self._in_flight.clear()
+        RESPONSE_CACHE_INVALIDATIONS.labels(cache=self.name).inc()
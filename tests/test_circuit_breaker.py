@@ -0,0 +1,58 @@
+# tests/test_circuit_breaker.py
+
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'services', 'ml_worker'))
+
+from circuit_breaker import Backoff, CircuitBreaker, CIRCUIT_BREAKER_STATE
+
+
+def _state_metric(name):
+    return CIRCUIT_BREAKER_STATE.labels(dependency=name)._value.get()
+
+
+def test_backoff_grows_exponentially_with_jitter_up_to_the_cap():
+    backoff = Backoff(base_delay=1, max_delay=8)
+    delays = [backoff.next_delay() for _ in range(6)]
+
+    for delay, cap in zip(delays, [1, 2, 4, 8, 8, 8]):
+        assert cap / 2 <= delay <= cap
+    backoff.reset()
+    assert backoff.next_delay() <= 1
+
+
+def test_breaker_opens_after_threshold_and_recovers_through_half_open():
+    """
+    The breaker should open after consecutive failures, allow a trial once its delay has passed,
+    re-open with a longer delay if the trial fails and close again on success.
+    """
+    # Arrange
+    breaker = CircuitBreaker("test_dependency", failure_threshold=2, base_delay=10, max_delay=100)
+    now = [1000.0]
+
+    with patch('circuit_breaker.time.monotonic', side_effect=lambda: now[0]), \
+         patch('circuit_breaker.random.uniform', side_effect=lambda low, high: high):
+        # Act & Assert: One failure is tolerated, the second opens the breaker
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert not breaker.allow()
+        assert breaker.seconds_until_retry() == 10
+        assert _state_metric("test_dependency") == 1
+
+        # The delay has passed: a trial is allowed, and its failure doubles the delay
+        now[0] += 10
+        assert breaker.allow() and breaker.state == "half_open"
+        breaker.record_failure()
+        assert not breaker.allow()
+        assert breaker.seconds_until_retry() == 20
+
+        # A successful trial closes the breaker and resets the backoff
+        now[0] += 20
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+        assert _state_metric("test_dependency") == 0
+        assert breaker.backoff.attempts == 0
@@ -0,0 +1,254 @@
+# tests/test_connection_manager.py
+
+import json
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+from services.results_api import connection_manager
+from services.results_api.connection_manager import ConnectionManager, WS_SLOW_CONSUMER_EVENTS
+
+
+class FakeWebSocket:
+    """Records the frames sent to it; a blocked socket never completes a send."""
+
+    def __init__(self, blocked=False):
+        self.frames = []
+        self.blocked = blocked
+        self.accept = AsyncMock()
+        self.close_code = None
+
+    async def send_text(self, text):
+        if self.blocked:
+            await asyncio.Event().wait()
+        self.frames.append(text)
+
+    async def close(self, code=1000):
+        # Yields like a real close handshake, so a cancellation pending on the caller would land here
+        await asyncio.sleep(0)
+        self.close_code = code
+
+
+def _slow_consumer_events(action):
+    return WS_SLOW_CONSUMER_EVENTS.labels(action=action)._value.get()
+
+
+async def _settle():
+    """Lets the flush and writer tasks run past the batch window."""
+    await asyncio.sleep(connection_manager.WS_BATCH_WINDOW_MS / 1000 + 0.05)
+
+
+@asynccontextmanager
+async def running_manager():
+    manager = ConnectionManager()
+    manager.start()
+    try:
+        yield manager
+    finally:
+        manager._flush_task.cancel()
+        for websocket in list(manager.active_connections):
+            manager.disconnect(websocket)
+
+
+@pytest.mark.asyncio
+async def test_updates_within_the_batch_window_are_sent_as_one_array_frame():
+    async with running_manager() as manager:
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+
+        manager.broadcast(json.dumps({"ticket_id": "a"}))
+        manager.broadcast(json.dumps({"ticket_id": "b"}))
+        await _settle()
+        manager.broadcast(json.dumps({"ticket_id": "c"}))
+        await _settle()
+
+        assert [json.loads(frame) for frame in websocket.frames] == [
+            [{"ticket_id": "a"}, {"ticket_id": "b"}],
+            {"ticket_id": "c"},  # A lone update is sent as-is
+        ]
+
+
+@pytest.mark.asyncio
+async def test_a_blocked_client_does_not_delay_the_others():
+    async with running_manager() as manager:
+        blocked, healthy = FakeWebSocket(blocked=True), FakeWebSocket()
+        await manager.connect(blocked)
+        await manager.connect(healthy)
+
+        for ticket_id in ("a", "b"):
+            manager.broadcast(json.dumps({"ticket_id": ticket_id}))
+            await _settle()
+
+        assert [json.loads(frame)["ticket_id"] for frame in healthy.frames] == ["a", "b"]
+        assert blocked.frames == []
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_policy_keeps_a_slow_client_connected_with_the_newest_frames():
+    async with running_manager() as manager:
+        dropped_before = _slow_consumer_events("dropped")
+        with patch.object(connection_manager, "WS_SEND_QUEUE_SIZE", 2), \
+             patch.object(connection_manager, "WS_SLOW_CONSUMER_POLICY", "drop_oldest"):
+            websocket = FakeWebSocket(blocked=True)
+            await manager.connect(websocket)
+            for ticket_id in ("a", "b", "c", "d"):
+                manager.broadcast(json.dumps({"ticket_id": ticket_id}))
+                await _settle()
+
+        client = manager.active_connections[websocket]
+        # 'a' is stuck in the blocked send; 'b' was dropped to make room for 'd'
+        assert [json.loads(frame.text)["ticket_id"] for frame in client.queue._queue] == ["c", "d"]
+        assert _slow_consumer_events("dropped") - dropped_before == 1
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_a_slow_client():
+    async with running_manager() as manager:
+        disconnected_before = _slow_consumer_events("disconnected")
+        with patch.object(connection_manager, "WS_SEND_QUEUE_SIZE", 1), \
+             patch.object(connection_manager, "WS_SLOW_CONSUMER_POLICY", "disconnect"):
+            websocket = FakeWebSocket(blocked=True)
+            await manager.connect(websocket)
+            for ticket_id in ("a", "b", "c"):
+                manager.broadcast(json.dumps({"ticket_id": ticket_id}))
+                await _settle()
+
+        assert websocket not in manager.active_connections
+        assert websocket.close_code == connection_manager.SLOW_CONSUMER_CLOSE_CODE
+        assert _slow_consumer_events("disconnected") - disconnected_before == 1
+
+
+@pytest.mark.asyncio
+async def test_a_failed_send_removes_only_that_client():
+    async with running_manager() as manager:
+        broken, healthy = FakeWebSocket(), FakeWebSocket()
+        broken.send_text = AsyncMock(side_effect=RuntimeError("socket closed"))
+        await manager.connect(broken)
+        await manager.connect(healthy)
+
+        manager.broadcast(json.dumps({"ticket_id": "a"}))
+        await _settle()
+
+        assert list(manager.active_connections) == [healthy]
+        assert len(healthy.frames) == 1
+        assert broken.close_code == 1011
+        assert healthy.close_code is None
+
+
+@pytest.mark.asyncio
+async def test_a_send_that_times_out_closes_the_client():
+    async with running_manager() as manager:
+        with patch.object(connection_manager, "WS_SEND_TIMEOUT_SECONDS", 0.01):
+            websocket = FakeWebSocket(blocked=True)
+            await manager.connect(websocket)
+            manager.broadcast(json.dumps({"ticket_id": "a"}))
+            await _settle()
+
+        assert websocket not in manager.active_connections
+        assert websocket.close_code == 1011
+
+
+def _ticket(ticket_id, status="COMPLETED", predicted_category="Sales", final_category=None, **fields):
+    return {"ticket_id": ticket_id, "status": status, "predicted_category": predicted_category,
+            "final_category": final_category, "predicted_priority": "P2", "final_priority": None,
+            "subject": "Subject", "description": "Description", **fields}
+
+
+@pytest.mark.asyncio
+async def test_subscriptions_receive_only_matching_updates():
+    async with running_manager() as manager:
+        firehose, reviewer, finance_p1, watcher = (FakeWebSocket() for _ in range(4))
+        for websocket in (firehose, reviewer, finance_p1, watcher):
+            await manager.connect(websocket)
+        manager.subscribe(reviewer, {"status": ["PENDING_REVIEW"]})
+        manager.subscribe(finance_p1, {"category": ["Finance & Billing"], "priority": ["P1"]})
+        manager.subscribe(watcher, {"ticket_ids": ["c"]})
+
+        manager.broadcast(json.dumps(_ticket("a", status="PENDING_REVIEW")))
+        # Reviewed into Finance: the final label is matched, not the prediction
+        manager.broadcast(json.dumps(_ticket("b", final_category="Finance & Billing", final_priority="P1")))
+        manager.broadcast(json.dumps(_ticket("c", predicted_category="Finance & Billing")))  # P2: not finance_p1
+        await _settle()
+
+        def received(websocket):
+            return [ticket["ticket_id"] for frame in websocket.frames for ticket in
+                    (json.loads(frame) if frame.startswith("[") else [json.loads(frame)])]
+
+        assert received(firehose) == ["a", "b", "c"]
+        assert received(reviewer) == ["a"]
+        assert received(finance_p1) == ["b"]
+        assert received(watcher) == ["c"]
+
+
+@pytest.mark.asyncio
+async def test_identical_filters_share_one_subscription_and_empty_ones_are_removed():
+    async with running_manager() as manager:
+        first, second = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(first)
+        await manager.connect(second)
+        manager.subscribe(first, {"status": ["PENDING_REVIEW"]})
+        manager.subscribe(second, {"status": ["PENDING_REVIEW"]})
+        assert len(manager._subscriptions) == 1
+
+        manager.disconnect(first)
+        manager.disconnect(second)
+        assert manager._subscriptions == {}
+        assert dict(manager._index["status"]) == {}
+
+
+@pytest.mark.asyncio
+async def test_delta_mode_sends_only_changed_fields():
+    async with running_manager() as manager:
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        manager.subscribe(websocket, {}, mode="delta")
+
+        manager.broadcast(json.dumps(_ticket("a", status="PENDING_REVIEW")))
+        await _settle()
+        manager.broadcast(json.dumps(_ticket("a", final_category="Sales", final_priority="P3")))
+        await _settle()
+
+        first, second = (json.loads(frame) for frame in websocket.frames)
+        # First time the client sees the ticket: its full (non-null) state
+        assert first == {"ticket_id": "a", "status": "PENDING_REVIEW", "predicted_category": "Sales",
+                         "predicted_priority": "P2", "subject": "Subject", "description": "Description"}
+        assert second == {"ticket_id": "a", "status": "COMPLETED", "final_category": "Sales", "final_priority": "P3"}
+
+
+@pytest.mark.asyncio
+async def test_filtered_delta_client_gets_full_state_for_updates_it_never_received():
+    async with running_manager() as manager:
+        completed_only = FakeWebSocket()
+        await manager.connect(completed_only)
+        manager.subscribe(completed_only, {"status": ["COMPLETED"]}, mode="delta")
+
+        # Filtered out for this client, so it must not become its baseline
+        manager.broadcast(json.dumps(_ticket("a", status="PENDING_REVIEW", prediction_confidence_category=0.4)))
+        await _settle()
+        manager.broadcast(json.dumps(_ticket("a", final_category="Sales", final_priority="P3", prediction_confidence_category=0.4)))
+        await _settle()
+
+        [update] = (json.loads(frame) for frame in completed_only.frames)
+        assert update == {"ticket_id": "a", "status": "COMPLETED", "predicted_category": "Sales", "predicted_priority": "P2",
+                          "final_category": "Sales", "final_priority": "P3", "prediction_confidence_category": 0.4,
+                          "subject": "Subject", "description": "Description"}
+
+
+@pytest.mark.asyncio
+async def test_delta_client_joining_later_starts_from_full_state():
+    async with running_manager() as manager:
+        early, late = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(early)
+        manager.subscribe(early, {}, mode="delta")
+        manager.broadcast(json.dumps(_ticket("a", status="PENDING_REVIEW")))
+        await _settle()
+
+        await manager.connect(late)
+        manager.subscribe(late, {}, mode="delta")
+        manager.broadcast(json.dumps(_ticket("a", final_category="Sales", final_priority="P3")))
+        await _settle()
+
+        assert json.loads(early.frames[-1]) == {"ticket_id": "a", "status": "COMPLETED", "final_category": "Sales", "final_priority": "P3"}
+        assert json.loads(late.frames[-1])["subject"] == "Subject"
+        assert json.loads(late.frames[-1])["predicted_category"] == "Sales"
@@ -0,0 +1,53 @@
+# tests/test_db_migrate.py
+
+from datetime import date
+from unittest.mock import MagicMock, patch
+from sqlalchemy.dialects import postgresql
+
+from db import migrate
+
+
+def test_monthly_partitions_cover_the_range_across_a_year_boundary():
+    connection = MagicMock()
+
+    with patch.object(migrate, "date", wraps=date) as mock_date:
+        mock_date.today.return_value = date(2025, 11, 20)
+        migrate.ensure_monthly_partitions(connection, date(2025, 10, 14), months_ahead=2)
+
+    statements = [str(call.args[0]) for call in connection.execute.call_args_list]
+    assert statements == [
+        "CREATE TABLE IF NOT EXISTS tickets_y2025m10 PARTITION OF tickets FOR VALUES FROM ('2025-10-01') TO ('2025-11-01')",
+        "CREATE TABLE IF NOT EXISTS tickets_y2025m11 PARTITION OF tickets FOR VALUES FROM ('2025-11-01') TO ('2025-12-01')",
+        "CREATE TABLE IF NOT EXISTS tickets_y2025m12 PARTITION OF tickets FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')",
+        "CREATE TABLE IF NOT EXISTS tickets_y2026m01 PARTITION OF tickets FOR VALUES FROM ('2026-01-01') TO ('2026-02-01')",
+    ]
+
+
+def test_valid_indexes_are_left_alone_and_missing_ones_are_built_concurrently():
+    index = sorted(migrate.tickets.indexes, key=lambda index: index.name)[0]
+    connection = MagicMock()
+    connection.dialect = postgresql.dialect()
+
+    connection.execute.return_value.scalar.return_value = True
+    assert migrate._create_index(connection, index, concurrently=True) is False
+    assert connection.execute.call_count == 1
+
+    connection.reset_mock()
+    connection.execute.return_value.scalar.return_value = None
+    assert migrate._create_index(connection, index, concurrently=True) is True
+    ddl = str(connection.execute.call_args.args[0])
+    assert ddl.startswith(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON tickets")
+
+
+def test_migration_seeds_ticket_stats_in_the_transaction_that_installs_the_triggers():
+    with patch.object(migrate, "engine") as mock_engine, \
+         patch.object(migrate, "metadata") as mock_metadata, \
+         patch.object(migrate, "_create_index", return_value=False):
+        connection = mock_engine.begin.return_value.__enter__.return_value
+        connection.execute.return_value.scalar.return_value = False
+        migrate.migrate()
+
+    mock_metadata.create_all.assert_called_once_with(connection)
+    statements = [str(call.args[0]) for call in connection.execute.call_args_list]
+    assert "DELETE FROM ticket_stats" in statements
+    assert any("INSERT INTO ticket_stats" in statement and "FROM tickets" in statement for statement in statements)
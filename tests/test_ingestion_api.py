@@ -2,11 +2,24 @@
 
 import pytest
 from httpx import AsyncClient, ASGITransport 
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 # Import the FastAPI app instance from your service
+from services.ingestion_api import app as ingestion_module
 from services.ingestion_api.app import app as ingestion_app
 
+@pytest.fixture(autouse=True)
+def stream_backlog():
+    """
+    Mocks the XINFO GROUPS / XLEN calls behind the backpressure check and forces a fresh
+    sample for every test. Tests can change the returned group info to simulate a backlog.
+    """
+    group_info = {"name": "ml_processing_group", "pending": 0, "lag": 0}
+    ingestion_module.backlog_sample["timestamp"] = 0.0
+    with patch.object(ingestion_module.r, 'xinfo_groups', AsyncMock(return_value=[group_info])), \
+         patch.object(ingestion_module.r, 'xlen', AsyncMock(return_value=0)):
+        yield group_info
+
 @pytest.mark.asyncio
 async def test_create_ticket_endpoint():
     """
@@ -14,7 +27,7 @@ async def test_create_ticket_endpoint():
     It should return a 200 OK status and a ticket_id.
     """
     # Arrange: Mock the Redis client's 'xadd' method so we don't need a real Redis server
-    with patch('services.ingestion_api.app.r.xadd', MagicMock()) as mock_xadd:
+    with patch('services.ingestion_api.app.r.xadd', AsyncMock()) as mock_xadd:
         async with AsyncClient(transport=ASGITransport(app=ingestion_app), base_url="http://test") as client:
             ticket_data = {
                 "subject": "My printer is on fire",
@@ -26,4 +39,118 @@ async def test_create_ticket_endpoint():
             response_json = response.json()
             assert "ticket_id" in response_json
             assert isinstance(response_json["ticket_id"], str)
-            mock_xadd.assert_called_once()
\ No newline at end of file
+            mock_xadd.assert_awaited_once()
+
+def _mock_pipeline():
+    """Builds a mock async Redis pipeline usable as `async with r.pipeline() as pipe`."""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    pipe.__aenter__.return_value = pipe
+    return pipe
+
+@pytest.mark.asyncio
+async def test_create_tickets_batch_json_array():
+    """
+    Tests POST /tickets/batch with a JSON array body.
+    All tickets should be enqueued through one pipeline, with IDs returned in order.
+    """
+    pipe = _mock_pipeline()
+    with patch('services.ingestion_api.app.r.pipeline', return_value=pipe):
+        async with AsyncClient(transport=ASGITransport(app=ingestion_app), base_url="http://test") as client:
+            tickets = [{"subject": f"Subject {i}", "description": f"Description {i}"} for i in range(3)]
+            response = await client.post("/tickets/batch", json=tickets)
+
+            assert response.status_code == 200
+            ticket_ids = response.json()["ticket_ids"]
+            assert len(ticket_ids) == 3
+            assert [call.args[1]["ticket_id"] for call in pipe.xadd.call_args_list] == ticket_ids
+            assert [call.args[1]["subject"] for call in pipe.xadd.call_args_list] == ["Subject 0", "Subject 1", "Subject 2"]
+            pipe.execute.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_create_tickets_batch_ndjson():
+    """Tests POST /tickets/batch with an NDJSON body."""
+    pipe = _mock_pipeline()
+    with patch('services.ingestion_api.app.r.pipeline', return_value=pipe):
+        async with AsyncClient(transport=ASGITransport(app=ingestion_app), base_url="http://test") as client:
+            body = '{"subject": "VPN down", "description": "Timeout"}\n\n{"subject": "Refund", "description": "Invoice"}\n'
+            response = await client.post("/tickets/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+            assert response.status_code == 200
+            assert len(response.json()["ticket_ids"]) == 2
+            assert pipe.xadd.call_count == 2
+
+@pytest.mark.asyncio
+async def test_create_tickets_batch_rejects_invalid_entries():
+    """A batch with an invalid entry should be rejected with 422 and nothing enqueued."""
+    pipe = _mock_pipeline()
+    with patch('services.ingestion_api.app.r.pipeline', return_value=pipe):
+        async with AsyncClient(transport=ASGITransport(app=ingestion_app), base_url="http://test") as client:
+            tickets = [{"subject": "Valid", "description": "Valid"}, {"subject": "Missing description"}]
+            response = await client.post("/tickets/batch", json=tickets)
+
+            assert response.status_code == 422
+            assert response.json()["detail"][0]["loc"] == ["body", 1, "description"]
+            pipe.xadd.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_create_ticket_applies_stream_maxlen():
+    """XADD should cap the stream with an approximate MAXLEN."""
+    with patch('services.ingestion_api.app.r.xadd', AsyncMock()) as mock_xadd:
+        async with AsyncClient(transport=ASGITransport(app=ingestion_app), base_url="http://test") as client:
+            response = await client.post("/tickets", json={"subject": "VPN", "description": "Down"})
+
+            assert response.status_code == 200
+            assert mock_xadd.await_args.kwargs == {"maxlen": ingestion_module.STREAM_MAXLEN, "approximate": True}
+
+@pytest.mark.asyncio
+async def test_create_ticket_returns_429_above_high_water_mark(stream_backlog):
+    """
+    When the consumer group backlog reaches the high-water mark, new tickets should be
+    rejected with 429 and a Retry-After header, without touching the stream.
+    """
+    stream_backlog.update({"pending": 10, "lag": ingestion_module.BACKLOG_HIGH_WATER_MARK})
+    with patch('services.ingestion_api.app.r.xadd', AsyncMock()) as mock_xadd:
+        async with AsyncClient(transport=ASGITransport(app=ingestion_app), base_url="http://test") as client:
+            response = await client.post("/tickets", json={"subject": "VPN", "description": "Down"})
+            batch_response = await client.post("/tickets/batch", json=[{"subject": "VPN", "description": "Down"}])
+
+            assert response.status_code == 429
+            assert response.headers["Retry-After"] == str(ingestion_module.BACKPRESSURE_RETRY_AFTER_SECONDS)
+            assert batch_response.status_code == 429
+            mock_xadd.assert_not_awaited()
+            assert ingestion_module.CONSUMER_GROUP_LAG._value.get() == ingestion_module.BACKLOG_HIGH_WATER_MARK
+
+@pytest.mark.asyncio
+async def test_batch_that_would_cross_the_high_water_mark_returns_429(stream_backlog):
+    """
+    A batch is rejected if its tickets would take the backlog past the mark, even though the
+    backlog itself is still below it. Accepted tickets count towards the cached sample at once,
+    so a second batch checked against the same sample is rejected too.
+    """
+    stream_backlog.update({"lag": ingestion_module.BACKLOG_HIGH_WATER_MARK - 5})
+    pipe = _mock_pipeline()
+    with patch('services.ingestion_api.app.r.pipeline', return_value=pipe):
+        async with AsyncClient(transport=ASGITransport(app=ingestion_app), base_url="http://test") as client:
+            tickets = [{"subject": f"Subject {i}", "description": f"Description {i}"} for i in range(6)]
+            too_large = await client.post("/tickets/batch", json=tickets)
+            accepted = await client.post("/tickets/batch", json=tickets[:3])
+            after_accepted = await client.post("/tickets/batch", json=tickets[:3])
+
+    assert too_large.status_code == 429
+    assert too_large.json()["backlog"] == ingestion_module.BACKLOG_HIGH_WATER_MARK - 5
+    assert accepted.status_code == 200
+    assert after_accepted.status_code == 429
+    assert pipe.xadd.call_count == 3
+
+
+def test_backpressure_config_keeps_the_backlog_well_below_stream_maxlen():
+    ingestion_module.check_backpressure_config()  # the defaults are consistent
+
+    with patch.object(ingestion_module, 'STREAM_MAXLEN', 30000):
+        with pytest.raises(ValueError, match="STREAM_MAXLEN"):
+            ingestion_module.check_backpressure_config()
+    with patch.object(ingestion_module, 'MAX_BATCH_SIZE', ingestion_module.BACKLOG_HIGH_WATER_MARK + 1):
+        with pytest.raises(ValueError, match="BACKLOG_HIGH_WATER_MARK"):
+            ingestion_module.check_backpressure_config()
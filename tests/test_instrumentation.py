@@ -0,0 +1,77 @@
+# tests/test_instrumentation.py
+
+import os
+import signal
+import pstats
+from unittest.mock import patch
+
+from instrumentation import stages
+
+
+def _stage_count(name, model_version=""):
+    """Returns how many observations the stage latency histogram holds for a label set."""
+    for metric in stages.STAGE_LATENCY.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_count") and sample.labels == {"stage": name, "model_version": model_version}:
+                return sample.value
+    return 0
+
+
+def test_stage_observes_latency_per_stage_and_version():
+    """The context manager records into the labelled histogram and exposes the elapsed time."""
+    before = _stage_count("unit_test_stage", "v7")
+
+    with stages.stage("unit_test_stage", "v7") as timer:
+        pass
+
+    assert timer.seconds >= 0
+    assert _stage_count("unit_test_stage", "v7") == before + 1
+
+
+def test_profile_signal_samples_the_next_sections(tmp_path):
+    """After SIGUSR1 the next PROFILE_SAMPLES_PER_SIGNAL profiled() sections are written as .prof files."""
+    previous_handlers = signal.getsignal(signal.SIGUSR1), signal.getsignal(signal.SIGUSR2)
+    try:
+        with patch.object(stages, 'PROFILE_OUTPUT_DIR', str(tmp_path)), \
+             patch.object(stages, 'PROFILE_SAMPLES_PER_SIGNAL', 2), \
+             patch.object(stages, 'PROFILE_SAMPLE_RATE', 0):
+            stages.install_profiling_hooks()
+            with stages.profiled("before_signal"):
+                sum(range(1000))
+
+            os.kill(os.getpid(), signal.SIGUSR1)
+            for _ in range(3):
+                with stages.profiled("after_signal"):
+                    sum(range(1000))
+    finally:
+        signal.signal(signal.SIGUSR1, previous_handlers[0])
+        signal.signal(signal.SIGUSR2, previous_handlers[1])
+
+    profiles = sorted(os.listdir(tmp_path))
+    assert len(profiles) == 2
+    assert all(name.startswith("after_signal-") for name in profiles)
+    pstats.Stats(str(tmp_path / profiles[0]))  # a readable cProfile dump
+
+
+def test_tracemalloc_snapshot_is_written_on_second_trigger(tmp_path):
+    with patch.object(stages, 'PROFILE_OUTPUT_DIR', str(tmp_path)):
+        assert stages.write_tracemalloc_snapshot() is None  # starts tracing
+        try:
+            blocks = [bytearray(1024) for _ in range(100)]
+            path = stages.write_tracemalloc_snapshot()
+        finally:
+            stages.tracemalloc.stop()
+
+    assert os.path.exists(path) and os.path.exists(path.replace(".txt", ".snapshot"))
+    assert len(blocks) == 100
+
+
+def test_discarded_profile_samples_are_not_written(tmp_path):
+    with patch.object(stages, 'PROFILE_OUTPUT_DIR', str(tmp_path)), \
+         patch.object(stages, 'PROFILE_SAMPLE_RATE', 1):
+        with stages.profiled("kept"):
+            sum(range(1000))
+        with stages.profiled("overlapped") as sample:
+            sample.discard = True
+
+    assert [name.split("-")[0] for name in os.listdir(tmp_path)] == ["kept"]
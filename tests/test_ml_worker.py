@@ -0,0 +1,349 @@
+# tests/test_ml_worker.py
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+from sklearn.pipeline import Pipeline
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+# The worker uses flat imports (e.g. `from preprocess import ...`), exactly as it does
+# when run inside its container, so its directory must be importable.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'services', 'ml_worker'))
+
+import worker
+import models
+from inference import predict_with_confidence
+
+
+def _make_model(classes, probas):
+    """Builds a mock sklearn pipeline returning fixed probabilities."""
+    model = MagicMock()
+    model.classes_ = np.array(classes)
+    model.predict_proba.return_value = np.array(probas)
+    model.predict.return_value = np.array(classes)[np.argmax(probas, axis=1)]
+    return model
+
+
+def test_read_batch_collects_until_batch_size():
+    """
+    read_batch should wait for the first message and then keep reading
+    until the batch is full.
+    """
+    # Arrange: The first read returns 2 messages, the follow-up read returns 1 more
+    first = [('ticket_stream', [('1-0', {'ticket_id': 'a'}), ('2-0', {'ticket_id': 'b'})])]
+    second = [('ticket_stream', [('3-0', {'ticket_id': 'c'})])]
+    with patch.object(worker, 'BATCH_SIZE', 3), \
+         patch.object(worker, 'BATCH_MAX_WAIT_MS', 1000), \
+         patch.object(worker.r, 'xreadgroup', side_effect=[first, second]) as mock_read:
+        # Act
+        messages = worker.read_batch()
+
+    # Assert
+    assert [message_id for message_id, _ in messages] == ['1-0', '2-0', '3-0']
+    assert mock_read.call_count == 2
+    assert mock_read.call_args_list[0].kwargs['block'] == worker.WORKER_BLOCK_MS
+    assert mock_read.call_args_list[1].kwargs['count'] == 1
+
+
+def test_read_batch_stops_when_stream_is_drained():
+    """read_batch should return a partial batch once no more messages arrive before the deadline."""
+    first = [('ticket_stream', [('1-0', {'ticket_id': 'a'})])]
+    with patch.object(worker, 'BATCH_SIZE', 10), \
+         patch.object(worker.r, 'xreadgroup', side_effect=[first, []]):
+        messages = worker.read_batch()
+
+    assert [message_id for message_id, _ in messages] == ['1-0']
+
+
+def test_process_batch_runs_models_once_and_acks_together():
+    """
+    A batch of tickets should be preprocessed and scored with a single call per model,
+    written with a single upsert whose returned rows are published without a read-back,
+    and acknowledged with a single XACK.
+    """
+    # Arrange
+    messages = [
+        ('1-0', {'ticket_id': 'id-1', 'subject': 'Refund', 'description': 'Please refund my invoice'}),
+        ('2-0', {'ticket_id': 'id-2', 'subject': 'Crash', 'description': 'The app crashes on login'}),
+    ]
+    cat_model = _make_model(['Billing', 'Bug'], [[0.95, 0.05], [0.40, 0.60]])
+    pri_model = _make_model(['high', 'low'], [[0.10, 0.90], [0.55, 0.45]])
+    cat_info = {"model": cat_model, "version": "1", "model_id": 1, "name": "cat"}
+    pri_info = {"model": pri_model, "version": "1", "model_id": 2, "name": "pri"}
+    processed_df = pd.DataFrame({'processed_text': ['refund invoice', 'app crash login']})
+
+    with patch.object(worker, 'load_champion_models', return_value=(cat_info, pri_info)), \
+         patch.object(worker, 'get_db_session', side_effect=lambda: iter([MagicMock()])), \
+         patch.object(worker, 'upsert_ticket_results', return_value=['row-1', 'row-2']) as mock_upsert, \
+         patch.object(worker, 'announce_processing') as mock_announce, \
+         patch.object(worker, 'publish_ticket_records') as mock_publish, \
+         patch.object(worker, 'preprocess_data', return_value=processed_df) as mock_preprocess, \
+         patch.object(worker.r, 'xack') as mock_xack:
+        # Act
+        worker.process_batch(messages)
+
+    # Assert
+    mock_preprocess.assert_called_once()
+    assert cat_model.predict_proba.call_count == 1
+    assert pri_model.predict_proba.call_count == 1
+    mock_announce.assert_called_once()
+    mock_upsert.assert_called_once()
+    assert mock_upsert.call_args.args[2:] == (1, 2)
+    results = mock_upsert.call_args.args[1]
+    assert [res['status'] for res in results] == ['COMPLETED', 'PENDING_REVIEW']
+    assert results[0]['category'] == 'Billing' and results[0]['priority'] == 'low'
+    assert results[1]['subject'] == 'Crash'
+    # created_at comes from the stream ID, so a redelivered ticket keeps its primary key
+    assert results[1]['created_at'] == worker.stream_id_to_datetime('2-0') == datetime.utcfromtimestamp(0.002)
+    mock_publish.assert_called_once_with(['row-1', 'row-2'])
+    mock_xack.assert_called_once_with(worker.STREAM_NAME, worker.GROUP_NAME, '1-0', '2-0')
+
+
+def _fit_pipeline(texts, labels):
+    """Fits a small TF-IDF + LogisticRegression pipeline like the ones in the registry."""
+    return Pipeline([('vect', TfidfVectorizer()), ('clf', LogisticRegression())]).fit(texts, labels)
+
+
+def test_predict_with_confidence_matches_predict():
+    """Labels and confidences from the helper should match predict() and max(predict_proba())."""
+    texts = ['refund invoice payment', 'app crash login error', 'invoice billing charge', 'server crash outage']
+    model = _fit_pipeline(texts, ['Billing', 'Bug', 'Billing', 'Bug'])
+
+    [(labels, confidences)] = predict_with_confidence([model], texts)
+
+    assert list(labels) == list(model.predict(texts))
+    assert np.allclose(confidences, model.predict_proba(texts).max(axis=1))
+
+
+def test_predict_with_confidence_shares_identical_vectorizers():
+    """Two models with identically fitted vectorizers should vectorize the input only once."""
+    texts = ['refund invoice payment', 'app crash login error', 'invoice billing charge', 'server crash outage']
+    cat_model = _fit_pipeline(texts, ['Billing', 'Bug', 'Billing', 'Bug'])
+    pri_model = _fit_pipeline(texts, ['low', 'high', 'low', 'high'])
+    other_model = _fit_pipeline(texts[:3], ['low', 'high', 'low'])
+
+    with patch.object(type(cat_model.named_steps['vect']), 'transform', autospec=True,
+                      side_effect=type(cat_model.named_steps['vect']).transform) as mock_transform:
+        predict_with_confidence([cat_model, pri_model], texts)
+        assert mock_transform.call_count == 1
+
+        mock_transform.reset_mock()
+        predict_with_confidence([cat_model, other_model], texts)
+        assert mock_transform.call_count == 2
+
+
+def _reset_model_cache():
+    for kind in models.model_cache:
+        models.model_cache[kind] = {"model": None, "version": None, "model_id": None, "timestamp": 0}
+
+
+def test_load_champion_models_resolves_model_id_once_per_load():
+    """
+    The 'models' table should only be touched when a champion version is (re)loaded;
+    calls served from the in-memory cache must not resolve the model_id again.
+    """
+    # Arrange: Reset the cache and fake the MLflow registry
+    _reset_model_cache()
+    champion = MagicMock(version="7", source="models:/fake/7")
+
+    with patch.object(models, 'artifact_cache', None), \
+         patch.object(models, 'get_mlflow_client') as mock_client, \
+         patch('mlflow.sklearn.load_model', return_value=MagicMock()), \
+         patch.object(models, 'resolve_model_id', side_effect=[11, 12]) as mock_resolve:
+        mock_alias = mock_client.return_value.get_model_version_by_alias
+        mock_alias.return_value = champion
+        # Act
+        first_cat, first_pri = models.load_champion_models()
+        second_cat, second_pri = models.load_champion_models()
+
+    # Assert
+    assert mock_resolve.call_count == 2  # once per model, not once per call
+    assert mock_alias.call_count == 2  # warm calls are a cache read, not a registry lookup
+    assert (first_cat["model_id"], first_pri["model_id"]) == (11, 12)
+    assert (second_cat["model_id"], second_pri["model_id"]) == (11, 12)
+
+
+def test_refresh_hot_swaps_new_champion_after_warm_up():
+    """
+    A new champion version should be loaded and warmed up by the refresher, then swapped in
+    as a whole; a version that fails to load must leave the current model in place.
+    """
+    # Arrange: Start from a loaded version 1
+    _reset_model_cache()
+    old_model, new_model, broken_model = MagicMock(), MagicMock(), MagicMock()
+    broken_model.predict_proba.side_effect = ValueError("corrupt artifact")
+    for kind in models.model_cache:
+        models.model_cache[kind] = {"model": old_model, "version": "1", "model_id": 1, "timestamp": 0}
+
+    # Act: The registry now points to version 2 for category only
+    versions = {models.CATEGORY_MODEL_NAME: "2", models.PRIORITY_MODEL_NAME: "1"}
+    with patch.object(models, 'artifact_cache', None), \
+         patch.object(models, 'get_mlflow_client') as mock_client, \
+         patch('mlflow.sklearn.load_model', return_value=new_model) as mock_load, \
+         patch.object(models, 'resolve_model_id', return_value=2):
+        mock_client.return_value.get_model_version_by_alias.side_effect = \
+            lambda name, alias: MagicMock(version=versions[name], source=f"models:/{name}")
+        models.refresh_champion_models()
+        cat_info, pri_info = models.load_champion_models()
+
+        # A later version that fails its warm-up is not swapped in
+        versions[models.CATEGORY_MODEL_NAME] = "3"
+        mock_load.return_value = broken_model
+        models.refresh_champion_models()
+        after_failure, _ = models.load_champion_models()
+
+    # Assert
+    new_model.predict_proba.assert_called_once_with([models.WARM_UP_TEXT])
+    assert (cat_info["model"], cat_info["version"], cat_info["model_id"]) == (new_model, "2", 2)
+    assert (pri_info["model"], pri_info["version"]) == (old_model, "1")
+    assert (after_failure["model"], after_failure["version"]) == (new_model, "2")
+
+
+def test_consume_forever_finishes_in_flight_batch_before_stopping():
+    """A stop request arriving mid-read must still process and ack that batch, then leave the loop."""
+    messages = [('1-0', {'ticket_id': 'a', 'subject': 's', 'description': 'd'})]
+
+    def read_then_stop():
+        worker.request_stop()
+        return messages
+
+    with patch.object(worker, '_stop_requested', False), \
+         patch.object(worker, 'reclaim_pending', return_value=[]), \
+         patch.object(worker, 'read_batch', side_effect=read_then_stop) as mock_read, \
+         patch.object(worker, 'process_batch') as mock_process:
+        worker.consume_forever()
+
+    mock_read.assert_called_once()
+    mock_process.assert_called_once_with(messages)
+
+
+def test_supervisor_restarts_crashed_consumers_until_shutdown():
+    """A crashed consumer is replaced in the same slot; after a shutdown request exits are not restarted."""
+    import supervisor
+
+    def waitpid(pid, options):
+        # 101 crashes, then a shutdown is requested and every remaining consumer drains
+        if 101 in supervisor.children:
+            return 101, 256
+        supervisor.shutdown_deadline = float('inf')
+        return next(iter(supervisor.children)), 0
+
+    with patch.object(supervisor, 'children', {101: 0, 102: 1}), \
+         patch.object(supervisor, 'shutdown_deadline', None), \
+         patch.object(supervisor, 'RESTART_DELAY_SECONDS', 0), \
+         patch.object(supervisor.os, 'fork', return_value=103) as mock_fork, \
+         patch.object(supervisor.os, 'waitpid', side_effect=waitpid) as mock_waitpid, \
+         patch.object(supervisor, 'spawn_consumer', wraps=supervisor.spawn_consumer) as mock_spawn, \
+         patch.object(supervisor, 'retired_consumers', set()), \
+         patch.object(worker.r, 'xinfo_consumers', return_value=[]):
+        supervisor.supervise()
+        remaining = dict(supervisor.children)
+
+    mock_spawn.assert_called_once_with(0)
+    mock_fork.assert_called_once()
+    assert mock_waitpid.call_count == 3  # the crash, then the drained 102 and 103
+    assert remaining == {}
+
+
+def test_exited_consumers_leave_the_group_once_nothing_is_pending_for_them():
+    """XGROUP DELCONSUMER would drop a consumer's pending entries, so it waits until they were reclaimed."""
+    import supervisor
+
+    consumers = [
+        {"name": "worker_101", "pending": 0, "idle": 60000},   # exited, its entries already reclaimed
+        {"name": "worker_102", "pending": 3, "idle": 60000},   # exited, entries not reclaimed yet
+        {"name": "worker_103", "pending": 1, "idle": 10},      # live
+    ]
+    with patch.object(supervisor, 'retired_consumers', {"worker_101", "worker_102", "worker_104"}), \
+         patch.object(worker.r, 'xinfo_consumers', return_value=consumers), \
+         patch.object(worker.r, 'xgroup_delconsumer') as mock_delete:
+        supervisor.remove_retired_consumers()
+        # worker_104 never joined the group; worker_102 waits for the next check
+        still_retired = set(supervisor.retired_consumers)
+
+    mock_delete.assert_called_once_with(worker.STREAM_NAME, worker.GROUP_NAME, "worker_101")
+    assert still_retired == {"worker_102"}
+
+
+def test_reclaim_pending_dead_letters_after_max_deliveries():
+    """Idle entries are claimed for another attempt until they exceed MAX_DELIVERIES, then dead-lettered."""
+    # Arrange: Two idle entries, one of which has already been delivered too often
+    claimed = [('1-0', {'ticket_id': 'a'}), ('2-0', {'ticket_id': 'b'})]
+    pending = [
+        {'message_id': '1-0', 'consumer': 'w', 'time_since_delivered': 0, 'times_delivered': 2},
+        {'message_id': '2-0', 'consumer': 'w', 'time_since_delivered': 0, 'times_delivered': 6},
+    ]
+    with patch.object(worker, '_reclaim_cursor', '0-0'), \
+         patch.object(worker, 'MAX_DELIVERIES', 5), \
+         patch.object(worker.r, 'xautoclaim', return_value=['0-0', claimed, []]) as mock_claim, \
+         patch.object(worker.r, 'xpending_range', return_value=pending), \
+         patch.object(worker, 'dead_letter') as mock_dead_letter:
+        # Act
+        retry = worker.reclaim_pending()
+
+    # Assert
+    assert retry == [('1-0', {'ticket_id': 'a'})]
+    assert mock_claim.call_args.args[3] == worker.RECLAIM_IDLE_MS
+    mock_dead_letter.assert_called_once_with('2-0', {'ticket_id': 'b'}, 'max_deliveries', 6)
+
+
+def test_process_messages_isolates_poison_ticket():
+    """
+    A malformed entry is dead-lettered immediately, and a ticket that fails processing
+    must not prevent the rest of its batch from being processed and acknowledged.
+    """
+    good = ('1-0', {'ticket_id': 'a', 'subject': 's', 'description': 'd'})
+    poison = ('2-0', {'ticket_id': 'b', 'subject': 's', 'description': 'boom'})
+    malformed = ('3-0', {'ticket_id': 'c'})
+
+    def process_batch(messages):
+        if poison in messages:
+            raise ValueError("cannot process ticket")
+
+    with patch.object(worker, 'process_batch', side_effect=process_batch) as mock_process, \
+         patch.object(worker, 'dead_letter') as mock_dead_letter:
+        worker.process_messages([good, poison, malformed])
+
+    mock_dead_letter.assert_called_once_with('3-0', {'ticket_id': 'c'}, 'malformed', 1)
+    assert [call.args[0] for call in mock_process.call_args_list] == [[good, poison], [good], [poison]]
+
+
+def test_consume_forever_pauses_reads_while_a_breaker_is_open():
+    """While the Postgres breaker is open the worker must not read (and fail) any messages."""
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        worker.request_stop()
+
+    with patch.object(worker, '_stop_requested', False), \
+         patch.object(worker.postgres_breaker, 'state', 'open'), \
+         patch.object(worker.postgres_breaker, 'retry_at', float('inf')), \
+         patch.object(worker.time, 'sleep', side_effect=sleep), \
+         patch.object(worker, 'reclaim_pending') as mock_reclaim, \
+         patch.object(worker, 'read_batch') as mock_read:
+        worker.consume_forever()
+
+    assert sleeps == [1.0]
+    mock_reclaim.assert_not_called()
+    mock_read.assert_not_called()
+
+
+def test_consume_forever_does_not_reclaim_during_a_breaker_trial():
+    """A half-open trial must only read new messages: reclaiming would count a delivery doomed to fail."""
+    def read_then_stop():
+        worker.request_stop()
+        return []
+
+    with patch.object(worker, '_stop_requested', False), \
+         patch.object(worker.postgres_breaker, 'state', 'half_open'), \
+         patch.object(worker, 'reclaim_pending') as mock_reclaim, \
+         patch.object(worker, 'read_batch', side_effect=read_then_stop) as mock_read:
+        worker.consume_forever()
+
+    mock_reclaim.assert_not_called()
+    mock_read.assert_called_once()
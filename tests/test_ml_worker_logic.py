@@ -28,4 +28,26 @@ def test_preprocess_data_cleaning():
     assert "123" not in actual_text
     assert "is" not in actual_text # 'is' is a stopword
     assert "test" in actual_text
-    assert "subject" in actual_text
\ No newline at end of file
+    assert "subject" in actual_text
+
+def test_preprocess_data_parallel_matches_serial():
+    """
+    The process-pool path should produce exactly the serial output, in the original row order.
+    """
+    # Arrange: Enough distinct rows to be split into several chunks
+    raw_data = {
+        'subject': [f'Ticket {i}' for i in range(25)],
+        'description': [
+            ['Refund my invoice please', 'The app keeps crashing on login', 'Server outage since morning',
+             'How do I reset my password?', 'Printer is not working'][i % 5] + f' case number {i}'
+            for i in range(25)
+        ],
+    }
+
+    # Act
+    serial_df = preprocess_data(pd.DataFrame(raw_data), n_jobs=1)
+    parallel_df = preprocess_data(pd.DataFrame(raw_data), n_jobs=2, chunk_size=4)
+
+    # Assert
+    assert parallel_df['processed_text'].tolist() == serial_df['processed_text'].tolist()
+    assert parallel_df.index.equals(serial_df.index)
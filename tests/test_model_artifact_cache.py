@@ -0,0 +1,128 @@
+# tests/test_model_artifact_cache.py
+
+import os
+import sys
+import time
+import multiprocessing
+import numpy as np
+import pytest
+import mlflow
+import mlflow.sklearn
+from mlflow.tracking import MlflowClient
+from unittest.mock import patch
+from sklearn.pipeline import Pipeline
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'services', 'ml_worker'))
+
+from artifact_cache import ModelArtifactCache, MODEL_FILE
+
+TEXTS = ["printer jam", "vpn down", "printer out of ink", "vpn very slow"]
+
+
+@pytest.fixture
+def registered_model(tmp_path):
+    """Registers a small text pipeline in a local file-based MLflow store, standing in for the real server."""
+    tracking_uri = f"file://{tmp_path / 'mlruns'}"
+    previous_uri = mlflow.get_tracking_uri()
+    mlflow.set_tracking_uri(tracking_uri)
+    model = Pipeline([("vect", TfidfVectorizer()), ("clf", LogisticRegression())]).fit(TEXTS, ["hw", "net", "hw", "net"])
+    with mlflow.start_run():
+        mlflow.sklearn.log_model(model, name="model", registered_model_name="ticket_category_classifier")
+    client = MlflowClient(tracking_uri=tracking_uri)
+    client.set_registered_model_alias("ticket_category_classifier", "champion", "1")
+    yield client.get_model_version_by_alias("ticket_category_classifier", "champion"), model
+    mlflow.set_tracking_uri(previous_uri)
+
+
+def test_restarted_worker_loads_from_disk_without_mlflow(tmp_path, registered_model):
+    """A second cache instance (a restarted worker) should load the model from disk, memory-mapped."""
+    # Arrange: The first worker downloads the model from MLflow
+    champion, original = registered_model
+    ModelArtifactCache(str(tmp_path / "model_cache"), 10 ** 9).load(champion.name, champion.version, champion.source)
+
+    # Act: MLflow is no longer reachable
+    with patch('mlflow.sklearn.load_model', side_effect=ConnectionError("MLflow is down")):
+        restarted = ModelArtifactCache(str(tmp_path / "model_cache"), 10 ** 9)
+        model = restarted.load(champion.name, champion.version, champion.source)
+        version, last_known = restarted.latest(champion.name)
+
+    # Assert
+    np.testing.assert_allclose(model.predict_proba(TEXTS), original.predict_proba(TEXTS))
+    assert isinstance(model.named_steps["clf"].coef_, np.memmap)
+    assert version == str(champion.version)
+    assert list(last_known.predict(TEXTS)) == list(original.predict(TEXTS))
+
+
+def test_corrupted_entry_is_downloaded_again(tmp_path, registered_model):
+    """An entry whose file no longer matches its digest must not be used."""
+    # Arrange
+    champion, original = registered_model
+    cache = ModelArtifactCache(str(tmp_path / "model_cache"), 10 ** 9)
+    cache.load(champion.name, champion.version, champion.source)
+    with open(os.path.join(cache._entry_dir(champion.name, champion.version), MODEL_FILE), "ab") as f:
+        f.write(b"corrupted")
+
+    # Act
+    with patch('mlflow.sklearn.load_model', wraps=mlflow.sklearn.load_model) as mock_load:
+        model = cache.load(champion.name, champion.version, champion.source)
+
+    # Assert
+    mock_load.assert_called_once_with(champion.source)
+    np.testing.assert_allclose(model.predict_proba(TEXTS), original.predict_proba(TEXTS))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, registered_model):
+    """Once the cache exceeds its size bound, the least recently used versions are removed."""
+    # Arrange: Room for roughly two copies of the model
+    champion, _ = registered_model
+    probe = ModelArtifactCache(str(tmp_path / "probe"), 10 ** 9)
+    probe.load(champion.name, "1", champion.source)
+    entry_size = os.path.getsize(os.path.join(probe._entry_dir(champion.name, "1"), MODEL_FILE))
+    cache = ModelArtifactCache(str(tmp_path / "model_cache"), int(entry_size * 2.5))
+
+    # Act: Versions 1 and 2 are cached, version 1 is used again, then version 3 arrives
+    cache.load(champion.name, "1", champion.source)
+    cache.load(champion.name, "2", champion.source)
+    os.utime(os.path.join(cache._entry_dir(champion.name, "2"), "manifest.json"), (0, 0))
+    cache.load(champion.name, "1", champion.source)
+    cache.load(champion.name, "3", champion.source)
+
+    # Assert
+    model_root = os.path.join(cache.root, champion.name)
+    assert sorted(name for name in os.listdir(model_root) if os.path.isdir(os.path.join(model_root, name))) == ["1", "3"]
+
+
+def test_forked_workers_download_a_missing_entry_once(tmp_path, registered_model):
+    """Workers forked from one supervisor that miss the same entry must not race on writing it."""
+    # Arrange: Every download is slow and leaves a marker, so overlapping downloads would show
+    champion, original = registered_model
+    cache = ModelArtifactCache(str(tmp_path / "model_cache"), 10 ** 9)
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+
+    def slow_download(source):
+        (downloads / str(os.getpid())).touch()
+        time.sleep(0.5)
+        return original
+
+    def worker(results):
+        model = cache.load(champion.name, champion.version, champion.source)
+        results.put(list(model.predict(TEXTS)))
+
+    # Act
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    with patch('mlflow.sklearn.load_model', side_effect=slow_download):
+        workers = [context.Process(target=worker, args=(results,)) for _ in range(4)]
+        for process in workers:
+            process.start()
+        predictions = [results.get(timeout=30) for _ in workers]
+        for process in workers:
+            process.join(timeout=30)
+
+    # Assert
+    assert len(os.listdir(downloads)) == 1
+    assert predictions == [list(original.predict(TEXTS))] * 4
+    assert all(process.exitcode == 0 for process in workers)
@@ -0,0 +1,52 @@
+# tests/test_preprocess_cache.py
+
+import pandas as pd
+from unittest.mock import patch
+
+from retraining_pipeline import preprocess
+from retraining_pipeline.preprocess_cache import PreprocessCache
+
+
+def test_cache_round_trip(tmp_path):
+    """Stored entries should be returned by key and survive reopening the cache file."""
+    path = str(tmp_path / "cache" / "preprocessed.sqlite")
+    key = PreprocessCache.make_key("Subject", "Description", "1")
+
+    cache = PreprocessCache(path)
+    cache.put_many({key: "subject description"})
+    cache.close()
+
+    reopened = PreprocessCache(path)
+    assert reopened.get_many([key, "missing"]) == {key: "subject description"}
+    assert len(reopened) == 1
+    reopened.close()
+
+
+def test_cache_key_depends_on_preprocessor_version():
+    """A new preprocessor version must not reuse entries produced by the old one."""
+    assert PreprocessCache.make_key("a", "b", "1") != PreprocessCache.make_key("a", "b", "2")
+    assert PreprocessCache.make_key("a b", "c", "1") != PreprocessCache.make_key("a", "b c", "1")
+
+
+def test_preprocess_data_only_processes_unseen_rows(tmp_path):
+    """
+    A second run over a mostly unchanged dataset should only preprocess the new rows,
+    while returning the same output in the original row order.
+    """
+    # Arrange
+    cache = PreprocessCache(str(tmp_path / "preprocessed.sqlite"))
+    first_df = pd.DataFrame({'subject': ['A', 'B', 'C'], 'description': ['one', 'two', 'three']})
+    second_df = pd.DataFrame({'subject': ['C', 'D', 'A'], 'description': ['three', 'four', 'one']})
+
+    with patch.object(preprocess, '_clean_and_lemmatize_text', side_effect=str.upper) as mock_clean:
+        # Act
+        preprocess.preprocess_data(first_df, cache=cache)
+        assert mock_clean.call_count == 3
+
+        mock_clean.reset_mock()
+        result = preprocess.preprocess_data(second_df, cache=cache)
+
+    # Assert
+    assert [call.args[0] for call in mock_clean.call_args_list] == ['D four']
+    assert result['processed_text'].tolist() == ['C THREE', 'D FOUR', 'A ONE']
+    cache.close()
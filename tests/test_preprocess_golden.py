@@ -0,0 +1,71 @@
+# tests/test_preprocess_golden.py
+
+import importlib.util
+import os
+import pytest
+import pandas as pd
+from sqlalchemy import select
+
+from retraining_pipeline import preprocess as retraining_preprocess
+
+# The ML worker keeps its own copy of the preprocessor; both must stay in lockstep.
+_spec = importlib.util.spec_from_file_location(
+    "ml_worker_preprocess",
+    os.path.join(os.path.dirname(__file__), '..', 'services', 'ml_worker', 'preprocess.py')
+)
+worker_preprocess = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(worker_preprocess)
+
+PREPROCESS_MODULES = [
+    pytest.param(retraining_preprocess, id="retraining_pipeline"),
+    pytest.param(worker_preprocess, id="ml_worker"),
+]
+
+# Hand-picked inputs covering every cleaning rule and the tokenizer's special cases.
+EDGE_CASES = [
+    "",
+    "   ",
+    None,
+    "<p>Hello team,</p> please check http://example.com. My number is 123-456-7890. This is a test.",
+    "<a href=http://example.com/login>Login page</a> is broken",
+    "Contact me at john.doe@example.com or <b>jane@corp.io</b>",
+    "Path C:\\Users\\admin\\file.txt cannot be opened, I wanna fix it, gonna try again",
+    "Transaction ID a1b2c3d4e5f6g7h8i9j0k1l2 failed; token=ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    "Order 1234567 and tracking 98 76 54 32 10 are delayed!!!",
+    "Gimme a refund, lemme know, we gotta sort the invoices' totals — ASAP…",
+    "Café résumé naïve İstanbul \u00a0 tabs\tand\nnewlines",
+    "The servers were running slower than the running average of previous weeks",
+]
+
+
+@pytest.mark.parametrize("module", PREPROCESS_MODULES)
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_fast_path_matches_reference_on_edge_cases(module, text):
+    """The compiled preprocessor must return exactly what the reference implementation returns."""
+    assert module._clean_and_lemmatize_text(text) == module._clean_and_lemmatize_text_reference(text)
+
+
+@pytest.mark.parametrize("module", PREPROCESS_MODULES)
+def test_fast_path_matches_reference_on_original_training_data(module):
+    """
+    Golden-output test over the full original training dataset.
+    Skipped when the database holding 'original_training_data' is not reachable.
+    """
+    from db.engine import engine
+    from db.database_setup import original_training_data
+
+    try:
+        with engine.connect() as connection:
+            df = pd.read_sql(
+                select(original_training_data.c.subject, original_training_data.c.description),
+                connection
+            )
+    except Exception as e:
+        pytest.skip(f"original_training_data is not available: {e}")
+
+    full_text = df['subject'] + ' ' + df['description']
+    mismatches = [
+        text for text in full_text
+        if module._clean_and_lemmatize_text(text) != module._clean_and_lemmatize_text_reference(text)
+    ]
+    assert not mismatches, f"{len(mismatches)} of {len(full_text)} tickets differ, e.g. {mismatches[:3]}"
@@ -0,0 +1,99 @@
+# tests/test_response_cache.py
+
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from services.results_api.response_cache import ResponseCache, RESPONSE_CACHE_REQUESTS
+from services.results_api import app as results_api
+
+
+def _requests(cache, result):
+    return RESPONSE_CACHE_REQUESTS.labels(cache=cache, result=result)._value.get()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load_and_later_requests_hit():
+    cache = ResponseCache("test_single_flight", ttl_seconds=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"total_tickets": 5}
+
+    results = await asyncio.gather(*[cache.get_or_load("stats", loader) for _ in range(10)])
+    assert results == [{"total_tickets": 5}] * 10
+    assert len(calls) == 1
+    assert _requests("test_single_flight", "miss") == 1
+    assert _requests("test_single_flight", "coalesced") == 9
+
+    assert await cache.get_or_load("stats", loader) == {"total_tickets": 5}
+    assert len(calls) == 1
+    assert _requests("test_single_flight", "hit") == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_the_ttl():
+    cache = ResponseCache("test_ttl", ttl_seconds=5)
+    values = iter([1, 2])
+
+    async def loader():
+        return next(values)
+
+    with patch("services.results_api.response_cache.time.monotonic", return_value=100):
+        assert await cache.get_or_load("key", loader) == 1
+    with patch("services.results_api.response_cache.time.monotonic", return_value=104):
+        assert await cache.get_or_load("key", loader) == 1
+    with patch("services.results_api.response_cache.time.monotonic", return_value=106):
+        assert await cache.get_or_load("key", loader) == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_a_load_is_not_overwritten_by_stale_data():
+    cache = ResponseCache("test_invalidate", ttl_seconds=60)
+    release_first_load = asyncio.Event()
+    values = iter(["stale", "fresh"])
+
+    async def loader():
+        value = next(values)
+        if value == "stale":
+            await release_first_load.wait()
+        return value
+
+    first = asyncio.ensure_future(cache.get_or_load("key", loader))
+    await asyncio.sleep(0)
+    cache.invalidate()
+
+    # A request after the invalidation doesn't join the stale in-flight load
+    assert await cache.get_or_load("key", loader) == "fresh"
+    release_first_load.set()
+    assert await first == "stale"
+    assert await cache.get_or_load("key", loader) == "fresh"
+
+
+@pytest.mark.asyncio
+async def test_failed_loads_are_not_cached():
+    cache = ResponseCache("test_errors", ttl_seconds=60)
+    outcomes = iter([ConnectionError("database unavailable"), "ok"])
+
+    async def loader():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    with pytest.raises(ConnectionError):
+        await cache.get_or_load("key", loader)
+    assert await cache.get_or_load("key", loader) == "ok"
+
+
+def test_processing_announcements_do_not_invalidate_the_caches():
+    with patch.object(results_api.stats_cache, "invalidate") as invalidate_stats, \
+         patch.object(results_api.recent_tickets_cache, "invalidate") as invalidate_recent:
+        results_api.invalidate_response_caches('{"ticket_id": "1", "status": "PROCESSING"}')
+        invalidate_stats.assert_not_called()
+
+        results_api.invalidate_response_caches('{"ticket_id": "1", "status": "COMPLETED"}')
+        invalidate_stats.assert_called_once()
+        invalidate_recent.assert_called_once()
@@ -1,11 +1,25 @@
 # tests/test_results_api.py
 
+import json
+import asyncio
 import pytest
 import uuid
+from contextlib import contextmanager
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
 from httpx import AsyncClient, ASGITransport 
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
-from services.results_api.app import app as results_app
+from services.results_api.app import (app as results_app, stats_cache, recent_tickets_cache, manager, redis_subscriber,
+                                     SUBSCRIBER_RECONNECTS, profile_sampled_requests, stats_reconciler)
+from instrumentation.stages import ProfileSample
+
+
+@pytest.fixture(autouse=True)
+def _empty_response_caches():
+    """Keeps cached responses from one test out of the next."""
+    stats_cache.invalidate()
+    recent_tickets_cache.invalidate()
 
 @pytest.mark.asyncio
 async def test_get_ticket_result_found():
@@ -31,12 +45,14 @@ async def test_get_ticket_result_found():
         "prediction_confidence_priority": 0.99
     }
 
-    # Patch the 'engine.connect' method to avoid a real database call
-    with patch('services.results_api.app.engine.connect') as mock_connect:
+    # Patch the async engine to avoid a real database call
+    with patch('services.results_api.app.engine') as mock_engine:
         # Configure the mock to return our fake data
         mock_connection = MagicMock()
-        mock_connection.execute.return_value.first.return_value = mock_db_row
-        mock_connect.return_value.__enter__.return_value = mock_connection
+        mock_result = MagicMock()
+        mock_result.first.return_value = mock_db_row
+        mock_connection.execute = AsyncMock(return_value=mock_result)
+        mock_engine.connect.return_value.__aenter__.return_value = mock_connection
 
         async with AsyncClient(transport=ASGITransport(app=results_app), base_url="http://test") as client:
             response = await client.get(f"/tickets/{test_ticket_id}")
@@ -44,4 +60,311 @@ async def test_get_ticket_result_found():
             assert response.status_code == 200
             response_json = response.json()
             assert response_json["status"] == "COMPLETED"
-            assert response_json["ticket_id"] == str(test_ticket_id)
\ No newline at end of file
+            assert response_json["ticket_id"] == str(test_ticket_id)
+
+
+@pytest.mark.asyncio
+async def test_submit_review_publishes_the_returned_row():
+    """
+    Tests POST /review/{ticket_id}: the row returned by UPDATE ... RETURNING * is published
+    as-is, without a second query.
+    """
+    test_ticket_id = uuid.uuid4()
+    mock_db_row = MagicMock()
+    mock_db_row._mapping = {"ticket_id": test_ticket_id, "status": "COMPLETED", "final_category": "Technical Support"}
+
+    with patch('services.results_api.app.engine') as mock_engine, \
+         patch('services.results_api.app.redis_client') as mock_redis:
+        mock_connection = MagicMock()
+        mock_result = MagicMock()
+        mock_result.first.return_value = mock_db_row
+        mock_connection.execute = AsyncMock(return_value=mock_result)
+        mock_engine.begin.return_value.__aenter__.return_value = mock_connection
+        mock_redis.xadd = AsyncMock(return_value="7-0")
+        mock_redis.publish = AsyncMock()
+
+        async with AsyncClient(transport=ASGITransport(app=results_app), base_url="http://test") as client:
+            response = await client.post(
+                f"/review/{test_ticket_id}",
+                json={"final_category": "Technical Support", "final_priority": "P1"}
+            )
+
+        assert response.status_code == 200
+        mock_connection.execute.assert_awaited_once()
+        # Appended to the updates stream first, then published with its entry id for subscribers to resume from
+        stream, fields = mock_redis.xadd.call_args.args
+        assert stream == "ticket_updates_log"
+        assert str(test_ticket_id) in fields["data"]
+        mock_redis.publish.assert_awaited_once_with("ticket_updates", f"7-0 {fields['data']}")
+
+
+@pytest.mark.asyncio
+async def test_get_stats_reads_the_maintained_counters():
+    """
+    Tests GET /stats: the response is built from the ticket_stats counters and the
+    throughput buckets, without aggregating the tickets table.
+    """
+    counters = [
+        MagicMock(dimension="total", value="", count=5),
+        MagicMock(dimension="status", value="COMPLETED", count=3),
+        MagicMock(dimension="status", value="PENDING_REVIEW", count=2),
+        MagicMock(dimension="final_category", value="Finance & Billing", count=3),
+        MagicMock(dimension="final_category", value="Technical Support", count=0),
+    ]
+    counters_result = MagicMock()
+    counters_result.fetchall.return_value = counters
+    throughput_result = MagicMock()
+    throughput_result.scalar_one.return_value = 4
+
+    with patch('services.results_api.app.engine') as mock_engine:
+        mock_connection = MagicMock()
+        mock_connection.execute = AsyncMock(side_effect=[counters_result, throughput_result])
+        mock_engine.connect.return_value.__aenter__.return_value = mock_connection
+
+        async with AsyncClient(transport=ASGITransport(app=results_app), base_url="http://test") as client:
+            response = await client.get("/stats")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "total_tickets": 5,
+        "status_breakdown": {"completed": 3, "pending_review": 2},
+        "throughput_last_minute": 4,
+        "category_breakdown": {"Finance & Billing": 3}
+    }
+    queries = [str(call.args[0]) for call in mock_connection.execute.await_args_list]
+    assert not any("FROM tickets" in query for query in queries)
+
+
+@pytest.mark.asyncio
+async def test_stats_are_right_straight_after_startup_on_a_table_that_already_has_rows():
+    """
+    The ticket_stats counters start out empty on a database that already has tickets. The replica
+    that takes the reconcile lock reconciles at once, not after its first interval, so /stats is
+    right as soon as the service is up.
+    """
+    counters = []  # ticket_stats before reconciliation
+
+    async def reconcile():
+        counters.extend([MagicMock(dimension="total", value="", count=7),
+                         MagicMock(dimension="status", value="COMPLETED", count=7)])
+        return 2
+
+    async def interval(seconds):
+        raise asyncio.CancelledError()
+
+    result = MagicMock()
+    result.scalar.return_value = True  # pg_try_advisory_lock
+    result.fetchall.return_value = counters
+    result.scalar_one.return_value = 0
+    mock_connection = MagicMock()
+    mock_connection.execute = AsyncMock(return_value=result)
+    mock_connection.commit = AsyncMock()
+
+    with patch('services.results_api.app.engine') as mock_engine, \
+         patch('services.results_api.app.reconcile_ticket_stats', side_effect=reconcile) as mock_reconcile, \
+         patch('services.results_api.app.asyncio.sleep', side_effect=interval):
+        mock_engine.connect.return_value.__aenter__.return_value = mock_connection
+        await stats_reconciler()
+
+        async with AsyncClient(transport=ASGITransport(app=results_app), base_url="http://test") as client:
+            response = await client.get("/stats")
+
+    mock_reconcile.assert_awaited_once()
+    assert response.json()["total_tickets"] == 7
+    assert response.json()["status_breakdown"]["completed"] == 7
+
+
+def _ticket_row(created_at, **fields):
+    row = MagicMock()
+    row.created_at = created_at
+    row.ticket_id = uuid.uuid4()
+    row._asdict.return_value = {"ticket_id": row.ticket_id, "created_at": created_at, **fields}
+    return row
+
+
+@pytest.mark.asyncio
+async def test_recent_tickets_are_keyset_paginated():
+    """
+    Tests GET /tickets/recent pagination: a full page returns the next cursor in X-Next-Cursor,
+    and the cursor turns into a (created_at, ticket_id) keyset condition instead of an OFFSET.
+    """
+    from datetime import datetime
+    rows = [_ticket_row(datetime(2025, 9, 19, 10, 0, second), status="COMPLETED") for second in (3, 2, 1)]
+    page_result = MagicMock()
+    page_result.fetchall.return_value = rows
+
+    with patch('services.results_api.app.engine') as mock_engine:
+        mock_connection = MagicMock()
+        mock_connection.execute = AsyncMock(return_value=page_result)
+        mock_engine.connect.return_value.__aenter__.return_value = mock_connection
+
+        async with AsyncClient(transport=ASGITransport(app=results_app), base_url="http://test") as client:
+            first_page = await client.get("/tickets/recent", params={"limit": 2, "status": "COMPLETED"})
+            cursor = first_page.headers["X-Next-Cursor"]
+            await client.get("/tickets/recent", params={"limit": 2, "cursor": cursor})
+
+    assert [ticket["ticket_id"] for ticket in first_page.json()] == [str(rows[0].ticket_id), str(rows[1].ticket_id)]
+    first_query, second_query = [call.args[0] for call in mock_connection.execute.await_args_list]
+    assert "LIMIT" in str(first_query) and "OFFSET" not in str(first_query)
+    assert "(tickets.created_at, tickets.ticket_id) <" in str(second_query)
+    assert second_query.compile().params["param_1"] == rows[1].created_at
+
+
+@pytest.mark.asyncio
+async def test_review_queue_returns_only_the_requested_fields():
+    """Tests GET /review-queue projection: only the requested fields (plus the cursor keys) are selected and returned."""
+    from datetime import datetime
+    page_result = MagicMock()
+    page_result.fetchall.return_value = [_ticket_row(datetime(2025, 9, 19), predicted_category="Technical Support")]
+
+    with patch('services.results_api.app.engine') as mock_engine:
+        mock_connection = MagicMock()
+        mock_connection.execute = AsyncMock(return_value=page_result)
+        mock_engine.connect.return_value.__aenter__.return_value = mock_connection
+
+        async with AsyncClient(transport=ASGITransport(app=results_app), base_url="http://test") as client:
+            response = await client.get("/review-queue", params={"fields": "predicted_category"})
+            invalid = await client.get("/review-queue", params={"fields": "password"})
+
+    assert response.status_code == 200
+    assert set(response.json()[0]) == {"ticket_id", "created_at", "predicted_category"}
+    assert "X-Next-Cursor" not in response.headers
+    query = mock_connection.execute.await_args.args[0]
+    assert [column.name for column in query.selected_columns] == ["created_at", "ticket_id", "predicted_category"]
+    assert invalid.status_code == 400
+
+
+def test_websocket_subscription_is_applied_and_invalid_ones_close_the_socket():
+    """Tests that a client's subscription message reaches the manager, and a malformed one closes the socket."""
+    client = TestClient(results_app)
+    ticket_id = str(uuid.uuid4())
+    with patch.object(manager, 'subscribe') as mock_subscribe:
+        with client.websocket_connect("/ws/ticket-updates") as websocket:
+            websocket.send_text(json.dumps({"status": ["PENDING_REVIEW"], "ticket_ids": [ticket_id], "mode": "delta"}))
+            websocket.send_text(json.dumps({"status": ["ARCHIVED"]}))
+            with pytest.raises(WebSocketDisconnect) as closed:
+                websocket.receive_text()
+
+    assert closed.value.code == 1008
+    criteria = mock_subscribe.call_args.args[1]
+    assert criteria["status"] == ["PENDING_REVIEW"] and criteria["ticket_ids"] == [ticket_id]
+    assert criteria["category"] is None
+    assert mock_subscribe.call_args.args[2] == "delta"
+    assert manager.active_connections == {}
+
+
+class FakeRedisConnection:
+    """
+    One connection to a fake Redis: reads the shared updates stream, and its pub/sub delivers
+    `deliveries` ((entry id, payload) pairs, appended to the stream first like the publishers do).
+    Once they run out it calls on_exhausted, then goes silent like a half-open connection.
+    """
+
+    def __init__(self, stream, deliveries, on_exhausted):
+        self.stream = stream
+        self.deliveries = deliveries
+        self.on_exhausted = on_exhausted
+        self.aclose = AsyncMock()
+
+    def _after(self, min):
+        def key(entry_id):
+            return tuple(int(part) for part in entry_id.split("-"))
+        return [entry for entry in self.stream if not min.startswith("(") or key(entry[0]) > key(min[1:])]
+
+    async def xrange(self, name, min="-", max="+", count=None):
+        return self._after(min)[:count]
+
+    async def xrevrange(self, name, max="+", min="-", count=None):
+        return list(reversed(self._after(min)))[:count]
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def subscribe(self, channel):
+        self.channel = channel
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=None):
+        if self.deliveries:
+            entry_id, payload = self.deliveries.pop(0)
+            if all(existing_id != entry_id for existing_id, _ in self.stream):
+                self.stream.append((entry_id, {"data": payload}))
+            return {"type": "message", "data": f"{entry_id} {payload}"}
+        if timeout:
+            on_exhausted, self.on_exhausted = self.on_exhausted, lambda: None
+            on_exhausted()
+            await asyncio.sleep(timeout)
+        return None
+
+
+@pytest.mark.asyncio
+async def test_subscriber_batches_bursts_and_resumes_from_the_last_stream_id_after_a_dead_connection():
+    """
+    Tests the Redis subscriber: updates waiting on the channel are relayed as one batch. When the
+    connection stops answering health checks it reconnects and replays the stream after the last
+    entry id it relayed, skipping updates that also arrive on the channel.
+    """
+    updates = [json.dumps({"ticket_id": str(n), "status": "COMPLETED"}) for n in range(7)]
+    # Identical payloads must not confuse the replay
+    updates[5] = updates[4]
+    stream = [("1-0", {"data": updates[1]})]
+
+    def miss_updates():
+        # Published while the connection is dead: only the stream has them
+        stream.extend([("4-0", {"data": updates[4]}), ("5-0", {"data": updates[5]})])
+
+    def stop():
+        raise asyncio.CancelledError()
+
+    connections = iter([
+        FakeRedisConnection(stream, [("2-0", updates[2]), ("3-0", updates[3])], miss_updates),
+        # 5-0 was published after the resubscribe, but before the replay read the stream
+        FakeRedisConnection(stream, [("5-0", updates[5]), ("6-0", updates[6])], stop),
+    ])
+    reconnects_before = SUBSCRIBER_RECONNECTS._value.get()
+    with patch('services.results_api.app.redis_async.Redis', side_effect=lambda **kwargs: next(connections)), \
+         patch('services.results_api.app.SUBSCRIBER_HEALTH_CHECK_SECONDS', 0.01), \
+         patch('services.results_api.app.SUBSCRIBER_RECONNECT_BASE_DELAY_SECONDS', 0), \
+         patch('services.results_api.app.relay_ticket_updates') as mock_relay:
+        await redis_subscriber()
+
+    # updates[1] predates the first subscription, so it isn't replayed
+    assert [call.args[0] for call in mock_relay.call_args_list] == [updates[2:4], updates[4:6], updates[6:7]]
+    assert SUBSCRIBER_RECONNECTS._value.get() - reconnects_before == 1
+
+
+@pytest.mark.asyncio
+async def test_only_requests_that_have_the_event_loop_to_themselves_are_profiled():
+    samples = []
+
+    @contextmanager
+    def recording_profiled(name):
+        samples.append(ProfileSample())
+        yield samples[-1]
+
+    release = asyncio.Event()
+
+    async def slow(request):
+        await release.wait()
+        return "response"
+
+    async def fast(request):
+        return "response"
+
+    request = MagicMock()
+    request.url.path = "/stats"
+    with patch('services.results_api.app.profiled', recording_profiled):
+        first = asyncio.create_task(profile_sampled_requests(request, slow))
+        await asyncio.sleep(0)
+        # Starts while the first one is in flight: not profiled, and the first sample is discarded
+        assert await profile_sampled_requests(request, fast) == "response"
+        release.set()
+        assert await first == "response"
+        await profile_sampled_requests(request, fast)
+
+    assert [sample.discard for sample in samples] == [True, False]